@@ -0,0 +1,182 @@
+""" This module runs the streaming mode of the pipeline (see streaming_pipeline.py) with asyncio, so the cleaning of the
+chunks and their upload overlap: while a chunk is uploaded, the next chunks of the same table (and the chunks of the
+other tables) are cleaned. The wall time of the load gets close to the longest of the cleaning and the upload, instead
+of their sum.
+
+Each table has a producer, which cleans its chunks in a pool of cleaning threads and puts them in a bounded queue, and a
+consumer, which uploads the chunks of the queue with COPY in a pool of upload threads, each one over its own connection.
+A full queue suspends its producer until a chunk is uploaded, so at most QUEUE_SIZE cleaned chunks wait per table. The
+consumer of a table starts once all the tables it references are loaded, its producer starts right away.
+
+The PostgreSQL drivers used (psycopg2, pg8000) have no asyncio interface, the COPY of a chunk runs in a thread and the
+event loop only schedules the threads. The overlap is of the cleaning with the I/O (reading the csv files, waiting for
+the database), not a parallel cleaning: the cleaning threads share the GIL with each other and with the upload threads,
+so the chunks aren't cleaned faster with more of them. The producers can't run in a pool of processes, the generator of
+the chunks of a table keeps the fingerprints of the rows already seen; only the text cleaning runs in processes, with
+text_workers.
+
+The progress is recorded in the checkpoint manifest like in streaming_pipeline.py, a table already uploaded by the run
+resumed isn't read again.
+"""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from csv_files_data_processing import data_processing_chunks
+from gcp_interactions import copy_df_to_psql
+from reconciliation import add_expected_values, expected_values
+from stage_metrics import stage
+from streaming_pipeline import DEFAULT_CHUNKSIZE
+from upload_orchestrator import table_dependencies
+
+
+# Number of cleaned chunks waiting for their upload in the queue of a table
+QUEUE_SIZE = 2
+
+
+def timed_call(function, *args):
+    """Calls a function in a thread of an executor, returns its result and the time it ran (not waiting for a thread)"""
+
+    start_time = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start_time
+
+
+async def produce_chunks(table_name, queue, clean_executor, chunksize, text_workers, timings):
+    """Cleans the chunks of a table in the cleaning threads and puts them in its queue, then None once they are all in"""
+
+    loop = asyncio.get_running_loop()
+    chunks = data_processing_chunks(table_name, chunksize, text_workers)
+    while True:
+        chunk, seconds = await loop.run_in_executor(clean_executor, timed_call, next, chunks, None)
+        timings["clean_seconds"] += seconds
+        if chunk is None:
+            break
+        await queue.put(chunk)
+    await queue.put(None)
+
+
+async def consume_chunks(pool, table_name, queue, upload_executor, referenced_tables_loaded, timings, start_row,
+                         checkpoint):
+    """
+    Uploads the chunks of the queue of a table once the tables it references are loaded, skipping its first start_row
+    rows, already uploaded by the run resumed.
+
+    Returns:
+        dict: figures of all the rows of the table to verify it, as returned by expected_values
+    """
+
+    await asyncio.gather(*(loaded.wait() for loaded in referenced_tables_loaded))
+
+    loop = asyncio.get_running_loop()
+    position = 0
+    expected = {(None, "rows"): 0}
+    with stage(f"stream {table_name}", rows_out=0, bytes_uploaded=0, chunks=0) as metrics:
+        while True:
+            chunk = await queue.get()
+            if chunk is None:
+                break
+            pending_rows = chunk.iloc[max(0, start_row - position):]
+            if len(pending_rows):
+                bytes_uploaded, seconds = await loop.run_in_executor(
+                    upload_executor, timed_call, copy_df_to_psql, pending_rows, table_name, pool
+                )
+                timings["upload_seconds"] += seconds
+                metrics["bytes_uploaded"] += bytes_uploaded
+                metrics["rows_out"] += len(pending_rows)
+                metrics["chunks"] += 1
+            position += len(chunk)
+            expected = add_expected_values(expected, expected_values(table_name, chunk))
+            if checkpoint is not None:
+                checkpoint.record_upload(table_name, position)
+
+    if checkpoint is not None:
+        checkpoint.record_upload(table_name, position, done=True, expected=expected)
+    return expected
+
+
+async def stream_overlapped(pool, chunksize, clean_workers, upload_workers, create_table_queries, text_workers,
+                            checkpoint):
+    """Runs the producer and the consumer of each table, see run_overlapped_pipeline"""
+
+    dependencies = table_dependencies(create_table_queries)
+    loaded = {table_name: asyncio.Event() for table_name in dependencies}
+    timings = {"clean_seconds": 0.0, "upload_seconds": 0.0}
+
+    async def stream_table(table_name, clean_executor, upload_executor):
+        start_row = 0
+        if checkpoint is not None:
+            start_row = await asyncio.get_running_loop().run_in_executor(
+                upload_executor, checkpoint.resume_table, pool, table_name, True
+            )
+            if start_row is None:
+                loaded[table_name].set()
+                return checkpoint.table_expected(table_name)
+
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        producer = asyncio.ensure_future(
+            produce_chunks(table_name, queue, clean_executor, chunksize, text_workers, timings)
+        )
+        consumer = asyncio.ensure_future(consume_chunks(
+            pool, table_name, queue, upload_executor,
+            [loaded[referenced_table] for referenced_table in dependencies[table_name]], timings, start_row, checkpoint,
+        ))
+        try:
+            _, expected = await asyncio.gather(producer, consumer)
+        except BaseException:
+            # A failed producer never puts the final None, its consumer would wait for it forever
+            producer.cancel()
+            consumer.cancel()
+            raise
+        loaded[table_name].set()
+        return expected
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clean_workers) as clean_executor, \
+            ThreadPoolExecutor(max_workers=upload_workers) as upload_executor:
+        tasks = {
+            table_name: asyncio.ensure_future(stream_table(table_name, clean_executor, upload_executor))
+            for table_name in dependencies
+        }
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            # The tables referencing a failed table would wait for it forever
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+
+    logging.info(
+        f"Cleaning {timings['clean_seconds']:.1f}s and upload {timings['upload_seconds']:.1f}s (summed over the threads) "
+        f"overlapped in {time.perf_counter() - start_time:.1f}s"
+    )
+    return {table_name: task.result() for table_name, task in tasks.items()}
+
+
+def run_overlapped_pipeline(pool, chunksize=DEFAULT_CHUNKSIZE, clean_workers=None, upload_workers=8,
+                            create_table_queries=None, text_workers=1, checkpoint=None):
+    """
+    Streams all the tables chunk by chunk, cleaning the next chunks while the previous ones are uploaded.
+
+    Args:
+        pool (sqlalchemy.engine.Engine): engine returned by conn_to_psql, its pool must allow upload_workers connections
+        chunksize (int): number of rows read from the csv files at a time
+        clean_workers (int): number of cleaning threads, None for the ThreadPoolExecutor default. They share the GIL,
+            more threads let more tables read their csv files at the same time but don't clean faster
+        upload_workers (int): maximum number of chunks uploaded at the same time
+        create_table_queries (dict): CREATE TABLE queries the tables were created with, CREATE_TABLE_QUERIES by default.
+            Tables created without foreign keys (see fast_load.py) are all uploaded at the same time.
+        text_workers (int): processes used to clean the text columns of each chunk
+        checkpoint (CheckpointManifest): manifest recording the progress of the upload, None to not record it
+
+    Returns:
+        dict: figures of the uploaded rows of each table, keyed by table name, to be passed to reconcile
+    """
+
+    return asyncio.run(
+        stream_overlapped(
+            pool, chunksize, clean_workers, upload_workers, create_table_queries, text_workers, checkpoint
+        )
+    )
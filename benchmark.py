@@ -0,0 +1,190 @@
+""" This module benchmarks the pipeline on a synthetic dataset generated by synthetic_dataset.py, to compare the speed of
+the data processing and of the upload before and after a change. Each data processing function, the text cleaner and
+the load into a local PostgreSQL database (schema creation and COPY of all the tables) are timed, and their throughput
+and peak memory are reported. The report is saved as JSON and can be compared with the report of a previous run.
+
+The load step drops the tables of the pipeline first, it must be run against a throwaway database.
+"""
+
+import argparse
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+import pandas as pd
+import sqlalchemy
+from csv_files_data_processing import (
+    CSV_FILES, DATA_PROCESSING_FUNCTIONS, clean_text_series, process_csv_file, read_csv_selected,
+)
+from gcp_interactions import close_conn_to_sql, conn_to_psql
+from sql_queries_vars import CREATE_ENUM_QUERIES, CREATE_TABLE_QUERIES
+from synthetic_dataset import generate_dataset
+from upload_orchestrator import create_schema_concurrently, upload_concurrently
+
+
+@contextmanager
+def working_directory(path):
+    """Runs the block from another directory, the csv files paths of CSV_FILES being relative"""
+
+    previous_path = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous_path)
+
+
+def measure(step, repeat=1, measure_memory=True):
+    """
+    Times a step, and measures its peak memory in a separate run as tracing the allocations slows it down.
+
+    Args:
+        step (callable): function called without arguments
+        repeat (int): number of timed runs, the fastest one is kept
+        measure_memory (bool): if False, the peak memory isn't measured
+
+    Returns:
+        tuple: value returned by the step, duration in seconds, peak memory allocated by Python in bytes (or None)
+    """
+
+    durations = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        result = step()
+        durations.append(time.perf_counter() - start_time)
+
+    peak_memory = None
+    if measure_memory:
+        tracemalloc.start()
+        try:
+            step()
+            _, peak_memory = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    return result, min(durations), peak_memory
+
+
+def drop_pipeline_tables(pool):
+    """Drops the tables and the enumerated types of the pipeline, so the load step starts from an empty database"""
+
+    with pool.begin() as connection:
+        connection.execute(sqlalchemy.text(f"DROP TABLE IF EXISTS {', '.join(CREATE_TABLE_QUERIES)} CASCADE;"))
+        connection.execute(sqlalchemy.text(f"DROP TYPE IF EXISTS {', '.join(CREATE_ENUM_QUERIES)};"))
+
+
+def run_benchmark(dataset_dir, dsn=None, repeat=1, text_workers=1, measure_memory=True):
+    """
+    Runs the benchmark steps on a dataset.
+
+    Args:
+        dataset_dir (str): directory holding the glassdoor_dataset directory
+        dsn (str): SQLAlchemy URL of a throwaway local PostgreSQL database, the load step is skipped if None
+        repeat (int): number of timed runs of each step, the fastest one is kept
+        text_workers (int): number of processes used by the text cleaner
+        measure_memory (bool): if False, the peak memory isn't measured (faster)
+
+    Returns:
+        pd.DataFrame: rows, duration, throughput and peak memory of each step
+    """
+
+    results = []
+
+    def add_result(step_name, rows, duration, peak_memory):
+        results.append({
+            "step": step_name,
+            "rows": rows,
+            "seconds": duration,
+            "rows_per_sec": rows / duration if duration else None,
+            "peak_memory_mb": peak_memory / 1024 ** 2 if peak_memory is not None else None,
+        })
+
+    dataframes = {}
+    with working_directory(dataset_dir):
+        for table_name in DATA_PROCESSING_FUNCTIONS:
+            processed, duration, peak_memory = measure(lambda: process_csv_file(table_name), repeat, measure_memory)
+            dataframes.update(processed)
+            add_result(f"processing {table_name}", sum(len(df) for df in processed.values()), duration, peak_memory)
+
+        job_descriptions = read_csv_selected(CSV_FILES["glassdoor"], ["job_description"])["job_description"]
+    _, duration, peak_memory = measure(
+        lambda: clean_text_series(job_descriptions, n_workers=text_workers), repeat, measure_memory
+    )
+    add_result("text cleaning job_description", len(job_descriptions), duration, peak_memory)
+
+    if dsn is not None:
+        pool, connector = conn_to_psql(backend="local", dsn=dsn)
+        try:
+            def load():
+                drop_pipeline_tables(pool)
+                create_schema_concurrently(pool)
+                return upload_concurrently(pool, dataframes)
+
+            _, duration, peak_memory = measure(load, repeat, measure_memory)
+            add_result("load", sum(len(df) for df in dataframes.values()), duration, peak_memory)
+        finally:
+            close_conn_to_sql(pool, connector)
+
+    return pd.DataFrame(results)
+
+
+def compare_with_baseline(report, baseline):
+    """
+    Compares the results of a run with those of a previous run.
+
+    Args:
+        report (pd.DataFrame): results returned by run_benchmark
+        baseline (pd.DataFrame): results of the previous run
+
+    Returns:
+        pd.DataFrame: duration and peak memory of each step in both runs, and their ratio (below 1 is an improvement)
+    """
+
+    comparison = baseline[["step", "seconds", "peak_memory_mb"]].merge(
+        report[["step", "seconds", "peak_memory_mb"]], on="step", suffixes=("_baseline", "")
+    )
+    comparison["seconds_ratio"] = comparison["seconds"] / comparison["seconds_baseline"]
+    comparison["peak_memory_ratio"] = comparison["peak_memory_mb"] / comparison["peak_memory_mb_baseline"]
+    return comparison
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline on a synthetic Glassdoor-shaped dataset")
+    parser.add_argument("--rows", type=int, default=10000, help="number of rows of the glassdoor table (default: 10000)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the dataset generator (default: 0)")
+    parser.add_argument(
+        "--dataset-dir", default="benchmark_data",
+        help="directory of the generated dataset (default: benchmark_data)",
+    )
+    parser.add_argument(
+        "--reuse-dataset", action="store_true", help="benchmark the dataset already in --dataset-dir without generating it",
+    )
+    parser.add_argument(
+        "--dsn", default=None,
+        help="SQLAlchemy URL of a throwaway local PostgreSQL database for the load step, whose tables are dropped",
+    )
+    parser.add_argument("--repeat", type=int, default=1, help="number of timed runs of each step (default: 1)")
+    parser.add_argument("--text-workers", type=int, default=1, help="processes used by the text cleaner (default: 1)")
+    parser.add_argument("--no-memory", action="store_true", help="don't measure the peak memory of the steps")
+    parser.add_argument(
+        "--output", default="logs/benchmark.json", help="path of the JSON report (default: logs/benchmark.json)",
+    )
+    parser.add_argument("--baseline", default=None, help="JSON report of a previous run to compare with")
+    args = parser.parse_args()
+
+    if not args.reuse_dataset:
+        generate_dataset(args.dataset_dir, args.rows, args.seed)
+
+    report = run_benchmark(args.dataset_dir, args.dsn, args.repeat, args.text_workers, not args.no_memory)
+    print(report.to_string(index=False))
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as report_file:
+        json.dump({"rows": args.rows, "seed": args.seed, "results": report.to_dict(orient="records")}, report_file, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline) as baseline_file:
+            baseline = pd.DataFrame(json.load(baseline_file)["results"])
+        print(f"\nComparison with {args.baseline}:")
+        print(compare_with_baseline(report, baseline).to_string(index=False))
@@ -6,17 +6,19 @@ These queries are not used in the main.py script.
 To ensure security, the original connection ID was replaced with a "CONNECTION_ID" placeholder.
 The salaries originally in British pounds have been converted to US dollars using the GBP/USD exchange rate (0.78154) on 
 the day the dataset was webscrapped.
+
+The queries read the summary tables (materialized views) built by main.py after each load, see SUMMARY_VIEW_QUERIES in 
+sql_queries_vars.py: each one is already aggregated by the grouping columns of the query, so only a few KB are sent 
+through the connection instead of the whole glassdoor table.
 */
 
 
 -- Job Postings Count by Title
 SELECT 
     header_jobtitle, 
-    COUNT(header_jobtitle) AS count
+    job_count AS count
 FROM 
-    EXTERNAL_QUERY("CONNECTION_ID", "SELECT header_jobtitle FROM glassdoor;")
-GROUP BY 
-    header_jobtitle 
+    EXTERNAL_QUERY("CONNECTION_ID", "SELECT header_jobtitle, job_count FROM glassdoor_summary_title;")
 ORDER BY 
     count DESC;
 
@@ -24,13 +26,9 @@ ORDER BY
 -- Job Postings Count by Location
 SELECT 
     map_location, 
-    COUNT(*) AS job_count
+    job_count
 FROM 
-    EXTERNAL_QUERY("CONNECTION_ID", "SELECT * FROM glassdoor;")
-WHERE 
-    map_location != ''
-GROUP BY 
-    map_location 
+    EXTERNAL_QUERY("CONNECTION_ID", "SELECT map_location, job_count FROM glassdoor_summary_location;")
 ORDER BY 
     job_count DESC;
 
@@ -38,13 +36,9 @@ ORDER BY
 -- Job Postings Count by Industry
 SELECT 
     overview_industry, 
-    COUNT(*) AS job_count
+    job_count
 FROM 
-    EXTERNAL_QUERY("CONNECTION_ID", "SELECT * FROM glassdoor;")
-WHERE 
-    overview_industry != ''
-GROUP BY 
-    overview_industry 
+    EXTERNAL_QUERY("CONNECTION_ID", "SELECT overview_industry, job_count FROM glassdoor_summary_industry;")
 ORDER BY 
     job_count DESC;
 
@@ -54,13 +48,9 @@ SELECT
     map_location, 
     map_lat, 
     map_lng, 
-    COUNT(*) AS job_count
+    job_count
 FROM 
-    EXTERNAL_QUERY("CONNECTION_ID", "SELECT * FROM glassdoor;")
-GROUP BY 
-    map_location, 
-    map_lat, 
-    map_lng 
+    EXTERNAL_QUERY("CONNECTION_ID", "SELECT map_location, map_lat, map_lng, job_count FROM glassdoor_summary_map;")
 ORDER BY 
     job_count DESC;
 
@@ -68,15 +58,11 @@ ORDER BY
 -- Best median salary by city
 SELECT 
     map_location, 
-    COUNT(*) AS job_count, 
-    AVG(header_paymed) AS avg_pay_med
+    job_count, 
+    avg_pay_med
 FROM 
-    EXTERNAL_QUERY("CONNECTION_ID", "SELECT * FROM glassdoor;")
+    EXTERNAL_QUERY("CONNECTION_ID", "SELECT map_location, job_count, avg_pay_med FROM glassdoor_summary_location;")
 WHERE 
-    map_location != ''
-GROUP BY 
-    map_location
-HAVING 
     job_count > 20
 ORDER BY 
     avg_pay_med DESC 
@@ -86,17 +72,15 @@ LIMIT 100;
 -- Best cities by highest number of job posting company ratings above 4.0 
 SELECT 
     map_location, 
-    COUNT(*) AS job_count, 
-    AVG(header_rating) AS avg_rating
+    job_count_rating_above_4 AS job_count, 
+    avg_rating_above_4 AS avg_rating
 FROM 
-    EXTERNAL_QUERY("CONNECTION_ID", "SELECT * FROM glassdoor;")
+    EXTERNAL_QUERY(
+        "CONNECTION_ID", 
+        "SELECT map_location, job_count_rating_above_4, avg_rating_above_4 FROM glassdoor_summary_location;"
+    )
 WHERE 
-    map_location != '' 
-    AND header_rating >= 4
-GROUP BY 
-    map_location
-HAVING 
-    job_count > 50
+    job_count_rating_above_4 > 50
 ORDER BY 
     job_count DESC 
 LIMIT 100;
@@ -105,18 +89,14 @@ LIMIT 100;
 -- Best small cities by average company ratings
 SELECT 
     map_location, 
-    COUNT(*) AS job_count, 
-    AVG(header_rating) AS avg_rating, 
-    AVG(rating_recommendtofriend) AS avg_recommend_to_friend, 
-    COUNT(header_urgencylabel) AS best_workplaces_awards, 
-    AVG(rating_starrating) AS avg_star_rating
+    job_count, 
+    avg_rating, 
+    avg_recommend_to_friend, 
+    best_workplaces_awards, 
+    avg_star_rating
 FROM 
-    EXTERNAL_QUERY("CONNECTION_ID", "SELECT * FROM glassdoor;")
+    EXTERNAL_QUERY("CONNECTION_ID", "SELECT * FROM glassdoor_summary_location;")
 WHERE 
-    map_location != ''
-GROUP BY 
-    map_location
-HAVING 
     job_count > 150
 ORDER BY 
     avg_rating DESC, 
@@ -129,18 +109,14 @@ LIMIT 50;
 -- Best big cities by average company ratings
 SELECT 
     map_location,
-    COUNT(*) AS job_count,
-    AVG(header_rating) AS avg_rating,
-    AVG(rating_recommendtofriend) AS avg_recommend_to_friend,
-    COUNT(header_urgencylabel) AS best_workplaces_awards,
-    AVG(rating_starrating) AS avg_star_rating
+    job_count,
+    avg_rating,
+    avg_recommend_to_friend,
+    best_workplaces_awards,
+    avg_star_rating
 FROM 
-    EXTERNAL_QUERY("CONNECTION_ID", "SELECT * FROM glassdoor;")
+    EXTERNAL_QUERY("CONNECTION_ID", "SELECT * FROM glassdoor_summary_location;")
 WHERE 
-    map_location != ''
-GROUP BY 
-    map_location
-HAVING 
     job_count > 1500
 ORDER BY 
     avg_rating DESC,
@@ -153,17 +129,13 @@ LIMIT 50;
 -- Best industries by average pay, job postings and ratings, ordered by average pay by default
 SELECT 
     overview_industry,
-    COUNT(*) AS job_count,
-    ROUND(AVG(header_paymed) / 0.7815448626756474) AS avg_salary_usd,
-    ROUND(AVG(header_rating), 1) AS avg_rating
+    job_count,
+    ROUND(avg_pay_med / 0.7815448626756474) AS avg_salary_usd,
+    ROUND(avg_rating, 1) AS avg_rating
 FROM 
-    EXTERNAL_QUERY("CONNECTION_ID", "SELECT * FROM glassdoor;")
+    EXTERNAL_QUERY("CONNECTION_ID", "SELECT * FROM glassdoor_summary_industry;")
 WHERE 
-    overview_industry != ''
-GROUP BY 
-    overview_industry
-HAVING 
-    COUNT(*) > 200
+    job_count > 200
 ORDER BY 
     avg_salary_usd DESC;
 
@@ -173,19 +145,13 @@ SELECT
     header_employername,
     overview_hq,
     overview_revenue,
-    COUNT(*) AS job_count,
-    ROUND(AVG(header_paymed)/0.7815448626756474) AS avg_salary_usd,
-    ROUND(AVG(header_rating), 1) AS avg_rating
+    job_count,
+    ROUND(avg_pay_med / 0.7815448626756474) AS avg_salary_usd,
+    ROUND(avg_rating, 1) AS avg_rating
 FROM 
-    EXTERNAL_QUERY("CONNECTION_ID", "SELECT * FROM glassdoor;")
+    EXTERNAL_QUERY("CONNECTION_ID", "SELECT * FROM glassdoor_summary_company;")
 WHERE 
-    header_employername != ''
-GROUP BY 
-    header_employername,
-    overview_hq,
-    overview_revenue
-HAVING 
-    COUNT(*) > 5
+    job_count > 5
 ORDER BY 
     avg_salary_usd DESC;
 
@@ -195,19 +161,13 @@ SELECT
     header_employername,
     overview_hq,
     overview_revenue,
-    COUNT(*) AS job_count,
-    ROUND(AVG(header_paymed)/0.7815448626756474) AS avg_salary_usd,
-    ROUND(AVG(header_rating), 1) AS avg_rating
+    job_count,
+    ROUND(avg_pay_med / 0.7815448626756474) AS avg_salary_usd,
+    ROUND(avg_rating, 1) AS avg_rating
 FROM 
-    EXTERNAL_QUERY("CONNECTION_ID", "SELECT * FROM glassdoor;")
+    EXTERNAL_QUERY("CONNECTION_ID", "SELECT * FROM glassdoor_summary_company;")
 WHERE 
-    header_employername != ''
-GROUP BY 
-    header_employername,
-    overview_hq,
-    overview_revenue
-HAVING 
-    COUNT(*) > 200
+    job_count > 200
 ORDER BY 
     avg_salary_usd DESC;
 
@@ -215,19 +175,8 @@ ORDER BY
 -- Best Median Salary by Company Revenue Bracket
 SELECT 
     overview_revenue,
-    AVG(header_paymed) AS avg_salary
+    avg_pay_med AS avg_salary
 FROM 
-    EXTERNAL_QUERY("CONNECTION_ID", "SELECT * FROM glassdoor;")
-WHERE 
-    header_jobtitle != ''
-    AND overview_revenue != ''
-GROUP BY 
-    overview_revenue
+    EXTERNAL_QUERY("CONNECTION_ID", "SELECT overview_revenue, avg_pay_med FROM glassdoor_summary_revenue;")
 ORDER BY 
     avg_salary DESC;
-
-
-
-
-
-
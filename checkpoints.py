@@ -0,0 +1,223 @@
+""" This module records the progress of a run in a checkpoint manifest (a JSON file), so a run that failed (a foreign key
+violation, a dropped connection...) can be resumed with main.py --resume instead of being started over: the stages
+already done are skipped, the tables already uploaded are not uploaded again and a partially uploaded table continues
+after its last committed batch.
+
+Checkpoints are opt-in (main.py --checkpoint), since with a manifest the tables are uploaded in batches committed one
+at a time instead of a single transaction per table, the number of rows uploaded in each table being recorded after
+each batch. A resumed run continues a table from its number of rows in the database rather than
+from the manifest: a batch and its record in the manifest aren't written in the same transaction, the database count
+is always the number of rows of the committed batches, so no batch is uploaded twice or skipped. This relies on the
+rows being uploaded in the same order at each run, which the cleaning guarantees for the same csv files and cleaning
+code: a manifest can only be resumed by a run with the same csv files, the same cleaning code and the same load options.
+
+The data processing isn't checkpointed, the cleaned data cached by the previous run (see processing_cache.py) is read
+instead.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import sqlalchemy
+from csv_files_data_processing import CSV_FILES
+from gcp_interactions import copy_df_to_psql
+from processing_cache import cleaning_code_version, file_hash
+
+
+CHECKPOINT_FILE = "logs/checkpoint.json"
+
+# Number of rows uploaded per committed batch, at most this many rows are uploaded again when a run is resumed
+CHECKPOINT_BATCH_ROWS = 50000
+
+
+def run_key(options):
+    """
+    Key of the data loaded by a run: hash of the csv files, of the cleaning code and of the load options.
+
+    Args:
+        options (dict): options of the run that change the loaded data or the schema
+
+    Returns:
+        str: hexadecimal key, a manifest can only be resumed by a run with the same key
+    """
+
+    # Several tables are read from the same csv file (glassdoor.csv), each file is hashed once
+    source = json.dumps({
+        "options": options,
+        "csv_files": {csv_path: file_hash(csv_path) for csv_path in sorted(set(CSV_FILES.values()))},
+        "cleaning_code": cleaning_code_version(),
+    }, sort_keys=True)
+    return hashlib.sha256(source.encode("UTF-8")).hexdigest()
+
+
+class CheckpointManifest:
+    """
+    Progress of a run, saved to its JSON file after each change. The uploads of the tables record their progress from
+    several threads at the same time.
+
+    Attributes:
+        path (str): path of the JSON file
+        key (str): key of the run, see run_key
+        resumed (bool): True if the manifest was written by a previous run, which is resumed
+        stages (list): names of the stages done
+        tables (dict): progress of the upload of each table, a dict with the number of rows uploaded, whether the table
+            is done, and the figures of the uploaded rows in streaming mode (see expected_values)
+    """
+
+    def __init__(self, path, key, resumed=False, stages=None, tables=None):
+        self.path = path
+        self.key = key
+        self.resumed = resumed
+        self.stages = stages or []
+        self.tables = tables or {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def start(cls, path, options):
+        """Starts the manifest of a new run, replacing the manifest of the previous run"""
+
+        manifest = cls(path, run_key(options))
+        manifest.save()
+        return manifest
+
+    @classmethod
+    def resume(cls, path, options):
+        """
+        Reads the manifest of the previous run to resume it.
+
+        Raises:
+            ValueError: if there is no manifest, or if the csv files, the cleaning code or the options changed since
+        """
+
+        try:
+            with open(path) as manifest_file:
+                content = json.load(manifest_file)
+        except FileNotFoundError:
+            raise ValueError(f"No checkpoint manifest {path} to resume, run without --resume") from None
+
+        if content["key"] != run_key(options):
+            raise ValueError(
+                f"The run of {path} can't be resumed, the csv files, the cleaning code or the options "
+                f"({', '.join(sorted(options))}) changed since, run without --resume"
+            )
+
+        logging.info(f"Resuming the run of {path}, stages already done: {content['stages']}")
+        return cls(path, content["key"], resumed=True, stages=content["stages"], tables=content["tables"])
+
+    @staticmethod
+    def discard(path):
+        """Deletes the manifest of the previous run, which a run without checkpoints makes impossible to resume"""
+
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def save(self):
+        with self._lock:
+            self._write()
+
+    def _write(self):
+        """Writes the manifest to its file, replaced at once so it is never left half written"""
+
+        content = json.dumps({"key": self.key, "stages": self.stages, "tables": self.tables}, indent=2, default=str)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as manifest_file:
+            manifest_file.write(content)
+        os.replace(temp_path, self.path)
+
+    def stage_done(self, stage_name):
+        """True if a stage was done by the run resumed"""
+
+        return stage_name in self.stages
+
+    def mark_stage_done(self, stage_name):
+        with self._lock:
+            if stage_name not in self.stages:
+                self.stages.append(stage_name)
+            self._write()
+
+    def record_upload(self, table_name, rows_uploaded, done=False, expected=None):
+        """
+        Records the number of rows uploaded in a table so far.
+
+        Args:
+            table_name (str): name of the table
+            rows_uploaded (int): number of rows of the table committed
+            done (bool): True once all the rows of the table are uploaded
+            expected (dict): figures of the uploaded rows (see expected_values), stored when the table is done
+        """
+
+        with self._lock:
+            self.tables[table_name] = {
+                "rows_uploaded": rows_uploaded,
+                "done": done,
+                "expected": None if expected is None else [[*key, value] for key, value in expected.items()],
+            }
+            self._write()
+
+    def table_expected(self, table_name):
+        """Figures of the rows uploaded in a table, as recorded with record_upload"""
+
+        return {(column, check): value for column, check, value in self.tables[table_name]["expected"]}
+
+    def resume_table(self, pool, table_name, require_expected=False):
+        """
+        Finds where the upload of a table starts.
+
+        Args:
+            pool (sqlalchemy.engine.Engine): engine returned by conn_to_psql
+            table_name (str): name of the table
+            require_expected (bool): if True, a table done without its figures recorded is uploaded again
+
+        Returns:
+            int: number of rows already in the table, from which the upload continues (0 for a new run), or None if the
+            table was fully uploaded by the run resumed
+        """
+
+        if not self.resumed:
+            return 0
+
+        with pool.connect() as connection:
+            rows_in_table = connection.execute(sqlalchemy.text(f"SELECT COUNT(*) FROM {table_name};")).scalar()
+
+        progress = self.tables.get(table_name)
+        if progress is not None and progress["done"] and progress["rows_uploaded"] == rows_in_table \
+                and (progress["expected"] is not None or not require_expected):
+            logging.info(f"{table_name} already uploaded ({rows_in_table} rows), skipped")
+            return None
+
+        if rows_in_table:
+            logging.info(f"{table_name} partially uploaded, continuing after its first {rows_in_table} rows")
+        return rows_in_table
+
+    def upload_df(self, pool, table_name, df, batch_rows=CHECKPOINT_BATCH_ROWS):
+        """
+        Uploads a DataFrame into its table in batches committed one at a time, recording the progress after each one,
+        and starting after the rows already in the table when the run is resumed.
+
+        Args:
+            pool (sqlalchemy.engine.Engine): engine returned by conn_to_psql
+            table_name (str): name of the table
+            df (pd.DataFrame): all the rows of the table
+            batch_rows (int): number of rows per committed batch
+
+        Returns:
+            int: number of CSV bytes uploaded by this run
+        """
+
+        start_row = self.resume_table(pool, table_name)
+        if start_row is None:
+            return 0
+
+        bytes_uploaded = 0
+        for start in range(start_row, len(df), batch_rows):
+            batch = df.iloc[start:start + batch_rows]
+            bytes_uploaded += copy_df_to_psql(batch, table_name, pool)
+            self.record_upload(table_name, start + len(batch))
+        self.record_upload(table_name, len(df), done=True)
+
+        return bytes_uploaded
@@ -2,9 +2,29 @@
 utility functions.
 """
 
-import pandas as pd
-import numpy as np
+import itertools
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from table_schemas import SQL_TYPE_DTYPES, TABLE_SCHEMAS, cast_columns, csv_columns, read_dtypes
+
+
+# Source csv file of each table of the database, the companies being extracted from the main glassdoor.csv file
+CSV_FILES = {
+    "glassdoor": "glassdoor_dataset/glassdoor.csv",
+    "glassdoor_companies": "glassdoor_dataset/glassdoor.csv",
+    "glassdoor_overview_competitors": "glassdoor_dataset/glassdoor_overview_competitors.csv",
+    "glassdoor_benefits_comments": "glassdoor_dataset/glassdoor_benefits_comments.csv",
+    "glassdoor_benefits_highlights": "glassdoor_dataset/glassdoor_benefits_highlights.csv",
+    "glassdoor_reviews": "glassdoor_dataset/glassdoor_reviews.csv",
+    "glassdoor_salary_salaries": "glassdoor_dataset/glassdoor_salary_salaries.csv",
+    "glassdoor_wwfu": "glassdoor_dataset/glassdoor_wwfu.csv",
+    "glassdoor_wwfu_val_captions": "glassdoor_dataset/glassdoor_wwfu_val_captions.csv",
+    "glassdoor_wwfu_val_photos": "glassdoor_dataset/glassdoor_wwfu_val_photos.csv",
+    "glassdoor_wwfu_val_videos": "glassdoor_dataset/glassdoor_wwfu_val_videos.csv",
+}
 
 
 def replace_dots(df):
@@ -15,6 +35,16 @@ def replace_dots(df):
     return df
 
 
+# Patterns used to clean the HTML text columns, compiled once instead of at each call
+HTML_TAG_PATTERN = re.compile("<[^>]+>")
+HTML_ENTITY_PATTERN = re.compile(r"&\w+;|&#\d+;")
+NON_WORD_PATTERN = re.compile(r"[^\w\s]+")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+# Below this number of values, sending the text to other processes costs more than cleaning it directly
+MIN_VALUES_PER_TEXT_WORKER = 10000
+
+
 def clean_job_description(text):
     """Removes all the HTML/CSS tags and other random junk from the text, only keeping words"""
     
@@ -22,15 +52,15 @@ def clean_job_description(text):
         return text
 
     # Remove HTML tags
-    text = re.sub("<[^>]+>", "", text)
-    text = re.sub("&\w+;|&#\d+;", "", text)
-    text = re.sub("[^\w\s]+", " ", text)
+    text = HTML_TAG_PATTERN.sub("", text)
+    text = HTML_ENTITY_PATTERN.sub("", text)
+    text = NON_WORD_PATTERN.sub(" ", text)
 
     # Convert text to lowercase
     text = text.lower()
 
     # Remove extra spaces
-    text = re.sub("\s+", " ", text)
+    text = WHITESPACE_PATTERN.sub(" ", text)
 
     # Strip leading/trailing spaces
     text = text.strip()
@@ -38,138 +68,552 @@ def clean_job_description(text):
     return text
 
 
-def data_processing_glassdoor_csv():
-    """Filter, clean and validate the glassdoor.csv file, the main file/table of the dataset."""
-    
-    df_glassdoor = pd.read_csv("glassdoor_dataset/glassdoor.csv")
-
-    df_glassdoor = replace_dots(df_glassdoor)
-
-    # Filtering the main glassdoor.csv file, a lot of columns are HTML or URL related elements that are not very relevant for our purpose.
-    filtered_df_glassdoor = df_glassdoor.loc[
-        :,
-        [
-            "header_easyApply", # Presence of Easy Apply button on job posting
-            "header_employerName", # Company's name
-            "header_jobTitle", # Job posting title
-            "header_posted",  # Date job was posted
-            "header_rating",  # Company rating by employees
-            "header_urgencyLabel",  # Misleading column name, it actually indicates the presence of the "2019 Glassdoor Best Place to Work" award on the job posting
-            "header_payHigh", # Payment at 90th percentile
-            "header_payMed", # Payment at 50th percentile
-            "header_payLow", # Payment at 10th percentile
-            "job_description", # Job description (html)
-            "job_jobSource", # Original website origin of job posting
-            "map_country",  # do something with country_names_2_digit_codes
-            "map_lat",  # Geographical latitude of job posting, 0 for NaN
-            "map_lng",  # Geographical longitude of job posting, 0 for NaN
-            "map_location", # Location of job posting (variable, city or country), can be different from the company's headquarters
-            "overview_foundedYear",  # Year of company's foundation, 0 for NaN
-            "overview_hq", # Company's headquarters location
-            "overview_industry", # Company's industry, sub-sector
-            "overview_revenue", # Company's revenue
-            "overview_sector", # Company's sector
-            "overview_size", # Company's number of employees bracket
-            "overview_stock", # Company's stock
-            "overview_type", # Public or private company
-            "overview_description", # Company's description
-            "overview_mission", # Company's mission
-            "overview_competitors",  # id for company's competitor, foreign key to glassdoor_overview_competitors
-            "rating_ceo_name", # Company's CEO Name
-            "rating_ceoApproval",  # Company's CEO approval rating, <0 or NaN for missing data
-            "rating_recommendToFriend",  # Rating from employees for recommendations to friends, <0 or NaN for missing data
-            "rating_starRating", # Rating of company from glassdoor users
-            "benefits_comments",  # Comments about company's benefits, foreign key to glassdoor_benefits_comments
-            "benefits_highlights",  # Highlighted comments & data about company's benefits, foreign key to glassdoor_benefits_highlights
-            "reviews",  # Reviews from glassdoor users, foreign key to glassdoor_reviews
-            "salary_salaries",  # Data about salaries reported by employees, foreign key to glassdoor_salary_salaries
-            "wwfu",  # Data related to company's mission, foreign key to glassdoor_wwfu
-        ],
-    ]
-
-
-    # Transform columns with floats having zero decimal value into integers
-    columns_to_int = [
-        "header_payHigh",
-        "header_payMed",
-        "header_payLow",
-        "overview_foundedYear",
-        "overview_competitors",
-        "benefits_comments",
-        "benefits_highlights",
-        "wwfu",
-    ]
-    for column in columns_to_int:
-        filtered_df_glassdoor[column] = filtered_df_glassdoor[column].astype(pd.Int64Dtype())
-
-
-    # Replace negative values with NaN
-    columns_to_replace_neg = [
-        "header_rating",
-        "rating_starRating",
-        "rating_ceoApproval",
-        "rating_recommendToFriend",
-    ]
-    for column in columns_to_replace_neg:
-        filtered_df_glassdoor[column] = filtered_df_glassdoor[column].apply(lambda x: np.nan if x < 0 else x)
-
-    # Replace zero values with NaN
-    columns_to_replace_zero = [
-        "map_lat",
-        "map_lng",
-    ]
-    for column in columns_to_replace_zero:
-        filtered_df_glassdoor[column] = filtered_df_glassdoor[column].apply(lambda x: np.nan if x == 0 else x)
-
-    # Replace outlier/erroneous low salaries values with NaN
-    columns_to_replace_outlier_salaries = [
-        "header_payHigh",
-        "header_payMed",
-        "header_payLow",
-        "salary_salaries",
-    ]
-    for column in columns_to_replace_outlier_salaries:
-        filtered_df_glassdoor[column] = filtered_df_glassdoor[column].apply(lambda x: np.nan if pd.isna(x) or x < 10000 else x)
-
-    # Replace outlier/erroneous years values with NaN
-    columns_to_replace_outlier_years = [
-        "overview_foundedYear",
-    ]
-    for column in columns_to_replace_outlier_years:
-        filtered_df_glassdoor[column] = filtered_df_glassdoor[column].apply(lambda x: np.nan if x < 1000 else x)
+def _clean_text_values(values):
+    """
+    Batch version of clean_job_description, applying the same steps in the same order to a list of values with the 
+    pattern methods bound once. Non-string values (missing values) go through clean_job_description itself, so the 
+    output is identical value by value.
+    """
+
+    remove_tags = HTML_TAG_PATTERN.sub
+    remove_entities = HTML_ENTITY_PATTERN.sub
+    replace_non_words = NON_WORD_PATTERN.sub
+    squash_spaces = WHITESPACE_PATTERN.sub
+
+    cleaned_values = []
+    for text in values:
+        if isinstance(text, str):
+            text = squash_spaces(" ", replace_non_words(" ", remove_entities("", remove_tags("", text))).lower()).strip()
+        else:
+            text = clean_job_description(text)
+        cleaned_values.append(text)
+
+    return cleaned_values
+
+
+def clean_text_series(series, n_workers=1):
+    """
+    Cleans a whole text column with clean_job_description rules, producing the same output as 
+    series.apply(clean_job_description).
+
+    Args:
+        series (pd.Series): text column to clean
+        n_workers (int): number of processes to split the column across, None to use all CPU cores. The fan-out is only 
+            used when each worker gets at least MIN_VALUES_PER_TEXT_WORKER values.
+
+    Returns:
+        pd.Series: the cleaned column, with the same index and name
+    """
+
+    values = series.tolist()
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    n_workers = min(n_workers, len(values) // MIN_VALUES_PER_TEXT_WORKER)
+
+    if n_workers <= 1:
+        cleaned_values = _clean_text_values(values)
+    else:
+        # Several batches per worker so a batch of unusually long texts doesn't hold back the others
+        batch_size = -(-len(values) // (n_workers * 4))
+        batches = [values[start:start + batch_size] for start in range(0, len(values), batch_size)]
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            cleaned_values = list(itertools.chain.from_iterable(executor.map(_clean_text_values, batches)))
+
+    return pd.Series(cleaned_values, index=series.index, name=series.name)
+
+
+# Cleaning rules of each table, executed in order by apply_cleaning_rules once the columns are cast to the types of their
+# table schema (see table_schemas.cast_columns). The rules of a dimension table are also executed on the csv file of the
+# tables it is extracted from, before the extraction. Each rule is a (kind, columns, value) tuple:
+# - "below_to_nan": replace values strictly lower than value with NaN
+# - "equal_to_nan": replace values equal to value with NaN
+# - "fill_na": replace missing values with value
+CLEANING_RULES = {
+    "glassdoor": [
+        # Replace negative values with NaN
+        ("below_to_nan", [
+            "header_rating",
+        ], 0),
+        # Replace zero values with NaN
+        ("equal_to_nan", [
+            "map_lat",
+            "map_lng",
+        ], 0),
+        # Replace outlier/erroneous low salaries values with NaN
+        ("below_to_nan", [
+            "header_payHigh",
+            "header_payMed",
+            "header_payLow",
+            "salary_salaries",
+        ], 10000),
+    ],
+    "glassdoor_companies": [
+        # Replace negative values with NaN
+        ("below_to_nan", [
+            "rating_starRating",
+            "rating_ceoApproval",
+            "rating_recommendToFriend",
+        ], 0),
+        # Replace outlier/erroneous years values with NaN
+        ("below_to_nan", [
+            "overview_foundedYear",
+        ], 1000),
+    ],
+    "glassdoor_overview_competitors": [],
+    "glassdoor_benefits_comments": [],
+    "glassdoor_benefits_highlights": [],
+    "glassdoor_reviews": [
+        ("fill_na", [
+            "reviews_val_reviewResponses",
+        ], -1),
+    ],
+    "glassdoor_salary_salaries": [],
+    "glassdoor_wwfu": [],
+    "glassdoor_wwfu_val_captions": [],
+    "glassdoor_wwfu_val_photos": [],
+    "glassdoor_wwfu_val_videos": [],
+}
+
+
+def csv_cleaning_rules(table_name):
+    """Cleaning rules of the csv file of a table, including the rules of its dimensions (see TABLE_SCHEMAS)"""
+
+    dimensions = TABLE_SCHEMAS[table_name].get("dimensions", {}).values()
+    return CLEANING_RULES[table_name] + [rule for dimension in dimensions for rule in CLEANING_RULES[dimension]]
+
+
+def apply_cleaning_rules(df, rules):
+    """
+    Executes cleaning rules (see CLEANING_RULES) on a DataFrame, each rule being applied at once on its whole group
+    of columns with vectorized mask operations instead of a Python function call per value.
+
+    Args:
+        df (pd.DataFrame): DataFrame to clean, with underscored column names
+        rules (list): (kind, columns, value) tuples, executed in order
+
+    Returns:
+        pd.DataFrame: the cleaned DataFrame
+    """
+
+    for kind, columns, value in rules:
+        block = df[columns]
+        if kind == "below_to_nan":
+            df[columns] = block.mask((block < value).fillna(False))
+        elif kind == "equal_to_nan":
+            df[columns] = block.mask((block == value).fillna(False))
+        elif kind == "fill_na":
+            df[columns] = block.fillna(value)
+        else:
+            raise ValueError(f"Unknown cleaning rule kind: {kind}")
 
-    # Remove only rows with all missing values
-    filtered_df_glassdoor.dropna(how="all", inplace=True)
+    return df
+
+
+# Text columns whose number of distinct values is at most this ratio of their number of values are stored as categories
+MAX_CATEGORY_RATIO = 0.5
+
+
+def optimize_dtypes(df, table_name, max_category_ratio=MAX_CATEGORY_RATIO):
+    """
+    Converts the columns of a cleaned DataFrame to memory-compact dtypes, without changing any value:
+    - numeric columns to the dtype of their SQL type (see SQL_TYPE_DTYPES), so their width is fixed by the table schema
+      rather than by the values of a load: the row fingerprints of the incremental mode and the checksums of the
+      verification don't change with the data, and FLOAT (double precision) columns are never narrowed to float32
+    - low-cardinality text columns to category, whose values are hashed and uploaded like the same text
+
+    Args:
+        df (pd.DataFrame): the cleaned DataFrame, with lowercase column names
+        table_name (str): name of the table, key of TABLE_SCHEMAS
+        max_category_ratio (float): text columns with at most this ratio of distinct values are converted to category
+
+    Returns:
+        pd.DataFrame: the DataFrame with optimized dtypes
+    """
+
+    sql_types = {column.lower(): sql_type for column, sql_type in TABLE_SCHEMAS[table_name]["columns"].items()}
+
+    dtypes = {}
+    for column in df.columns:
+        values = df[column]
+
+        if pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values):
+            if values.nunique(dropna=True) <= max_category_ratio * len(values):
+                dtypes[column] = "category"
+
+        elif pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            dtypes[column] = SQL_TYPE_DTYPES[sql_types[column]]
+
+    return df.astype(dtypes)
+
+
+def memory_report(dataframes):
+    """
+    Reports the memory used by DataFrames, and the memory they would use with the default dtypes of pandas (object 
+    text, 64-bit numbers) to show the gain of the dtypes declared or optimized by the data processing.
+
+    Args:
+        dataframes (dict): DataFrames keyed by table name
+
+    Returns:
+        pd.DataFrame: rows, memory and memory with default dtypes (in MB) of each table, and a total row
+    """
+
+    def default_dtype(dtype):
+        if isinstance(dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(dtype):
+            return "object"
+        if pd.api.types.is_bool_dtype(dtype) or not pd.api.types.is_numeric_dtype(dtype):
+            return dtype
+        if pd.api.types.is_integer_dtype(dtype):
+            return "Int64" if pd.api.types.is_extension_array_dtype(dtype) else "int64"
+        return "Float64" if pd.api.types.is_extension_array_dtype(dtype) else "float64"
+
+    report = []
+    for table_name, df in dataframes.items():
+        default_df = df.astype({column: default_dtype(dtype) for column, dtype in df.dtypes.items()})
+        report.append({
+            "table_name": table_name,
+            "rows": len(df),
+            "memory_mb": df.memory_usage(deep=True).sum() / 1024 ** 2,
+            "default_dtypes_memory_mb": default_df.memory_usage(deep=True).sum() / 1024 ** 2,
+        })
+
+    report = pd.DataFrame(report)
+    report.loc[len(report)] = ["total", report["rows"].sum(), report["memory_mb"].sum(),
+                               report["default_dtypes_memory_mb"].sum()]
+    report["ratio"] = report["memory_mb"] / report["default_dtypes_memory_mb"]
+    return report
+
+
+def drop_duplicate_rows(df, subset=None):
+    """
+    Drops the duplicate rows of a whole DataFrame with drop_duplicates(keep="first"), storing the number of rows dropped
+    in df.attrs["duplicates_dropped"] to be reported with the DataFrame.
+
+    Args:
+        df (pd.DataFrame): the DataFrame
+        subset (list): columns compared to detect duplicates, all the columns if None
+
+    Returns:
+        pd.DataFrame: the rows seen for the first time
+    """
+
+    deduplicated_df = df.drop_duplicates(subset=subset)
+    deduplicated_df.attrs["duplicates_dropped"] = len(df) - len(deduplicated_df)
+    return deduplicated_df
+
+
+class RowFingerprintDeduplicator:
+    """
+    Drops the duplicate rows of a file read chunk by chunk, with the same result as drop_duplicates(keep="first") on
+    the whole file: a row is dropped if the same row was seen before, in the same chunk or in a previous one. Only the
+    fingerprints of the rows already seen (64-bit hashes of all their values) are kept from one chunk to the next, in a
+    numpy array, and each chunk is compared with them at once with np.isin. A whole DataFrame is deduplicated faster by
+    drop_duplicates itself (see drop_duplicate_rows).
+
+    The probability that two different rows get the same fingerprint is around 1e-9 for 200,000 distinct rows.
+
+    Attributes:
+        subset (list): columns compared to detect duplicates, all the columns if None
+        dropped_rows (int): number of duplicate rows dropped so far
+    """
+
+    def __init__(self, subset=None):
+        self.subset = subset
+        self.dropped_rows = 0
+        self._seen_fingerprints = np.empty(0, dtype=np.uint64)
+
+    def fingerprints(self, df):
+        """Fingerprints of the rows of a DataFrame, as a uint64 numpy array"""
+
+        values = df if self.subset is None else df[self.subset]
+        # Nullable integers are much slower to hash than numpy floats, they are hashed as floats when the conversion is 
+        # exact (all the values below 2**53), missing values becoming NaN
+        exact_float_columns = {
+            column: "float64" for column, dtype in values.dtypes.items()
+            if pd.api.types.is_extension_array_dtype(dtype) and pd.api.types.is_integer_dtype(dtype)
+            and not (values[column].abs() >= 2 ** 53).any()
+        }
+        if exact_float_columns:
+            values = values.astype(exact_float_columns)
+
+        return pd.util.hash_pandas_object(values, index=False).to_numpy()
+
+    def drop_duplicates(self, df):
+        """
+        Drops the rows of a chunk of a file that were already seen.
+
+        Args:
+            df (pd.DataFrame): the chunk, with the same columns as the previous ones
+
+        Returns:
+            pd.DataFrame: the rows seen for the first time, the number of rows dropped so far is stored in
+            df.attrs["duplicates_dropped"] to be reported with the DataFrame
+        """
+
+        fingerprints = self.fingerprints(df)
+        is_first = ~np.isin(fingerprints, self._seen_fingerprints) & ~pd.Series(fingerprints).duplicated().to_numpy()
+        self._seen_fingerprints = np.concatenate([self._seen_fingerprints, fingerprints[is_first]])
+
+        deduplicated_df = df[is_first]
+        self.dropped_rows += len(df) - len(deduplicated_df)
+        deduplicated_df.attrs["duplicates_dropped"] = self.dropped_rows
+        return deduplicated_df
+
+
+class SurrogateKeys:
+    """
+    Keys of the distinct values of a group of columns (the company columns of a job posting), derived from the
+    fingerprint of the values (see RowFingerprintDeduplicator) rather than numbered in the order they appear: the same
+    values get the same key in every chunk and at every run, whatever the other rows of the file: an incremental load of
+    a newer file (main.py --incremental) keeps the keys of the values already loaded, and in streaming mode the table
+    holding the values and the dimension table storing them once, read in separate passes over the file, get matching
+    keys without sharing any state.
+
+    The keys are the 64-bit fingerprints shifted to the positive BIGINT range. A collision isn't detected, it is an
+    accepted risk: two different values with the same key would be stored as a single row of the dimension table, the
+    first one seen, and the rows holding the other value would reference it. Its probability is around 1e-9 for
+    100,000 distinct values (in the file and in the previous loads of an incremental load).
+
+    Attributes:
+        columns (list): columns of the values keyed
+    """
+
+    def __init__(self, columns):
+        self.columns = columns
+        self._deduplicator = RowFingerprintDeduplicator(subset=columns)
 
-    # Remove duplicates
-    filtered_df_glassdoor.drop_duplicates(inplace=True)
+    def keys(self, df):
+        """
+        Keys of the values of the rows of a DataFrame.
+
+        Args:
+            df (pd.DataFrame): the DataFrame, with the columns cast to their SQL types (see table_schemas.cast_columns)
+
+        Returns:
+            pd.arrays.IntegerArray: the key of each row, missing for the rows whose columns are all missing
+        """
+
+        keys = pd.array(self._deduplicator.fingerprints(df) >> np.uint64(1), dtype="Int64")
+        keys[df[self.columns].isna().all(axis=1).to_numpy()] = pd.NA
+        return keys
+
+    def dimension_rows(self, df, key_column):
+        """
+        Selects the rows of the dimension table in a DataFrame: the first row of each value not seen before.
+
+        Args:
+            df (pd.DataFrame): the DataFrame, with the columns cast to their SQL types
+            key_column (str): name of the surrogate key column of the dimension table
+
+        Returns:
+            pd.DataFrame: the columns of the values of the selected rows, after their key, in the order of the file
+        """
+
+        dimension_df = self._deduplicator.drop_duplicates(df.loc[~df[self.columns].isna().all(axis=1), self.columns])
+        dimension_df.insert(0, key_column, self.keys(dimension_df))
+        return dimension_df
+
+
+def dimension_keys(table_name):
+    """Returns new SurrogateKeys for each dimension of a table (see TABLE_SCHEMAS), keyed by foreign key column"""
+
+    return {
+        column: SurrogateKeys(csv_columns(dimension))
+        for column, dimension in TABLE_SCHEMAS[table_name].get("dimensions", {}).items()
+    }
+
+
+def new_dimension_rows(df, table_name, keys_by_column):
+    """
+    Selects the rows of the dimension tables of a table in a DataFrame, the values not seen before (see
+    SurrogateKeys.dimension_rows).
+
+    Args:
+        df (pd.DataFrame): cleaned rows of the csv file of the table, in the order of the file
+        table_name (str): name of the table, key of TABLE_SCHEMAS
+        keys_by_column (dict): SurrogateKeys of each dimension, keyed by foreign key column (see dimension_keys)
+
+    Returns:
+        dict: rows of each dimension table, keyed by dimension table name
+    """
+
+    dimensions = TABLE_SCHEMAS[table_name]["dimensions"]
+    return {
+        dimensions[column]: keys.dimension_rows(df, TABLE_SCHEMAS[dimensions[column]]["surrogate_key"])
+        for column, keys in keys_by_column.items()
+    }
+
+
+def replace_dimensions(df, keys_by_column):
+    """
+    Replaces the columns of the dimensions of a table with the foreign keys to the rows of the dimension tables.
+
+    Args:
+        df (pd.DataFrame): cleaned rows of the csv file of the table, in the order of the file
+        keys_by_column (dict): SurrogateKeys of each dimension, keyed by foreign key column (see dimension_keys)
+
+    Returns:
+        pd.DataFrame: the DataFrame with a foreign key column in place of the columns of each dimension
+    """
+
+    for column, keys in keys_by_column.items():
+        position = df.columns.get_loc(keys.columns[0])
+        foreign_keys = keys.keys(df)
+        df = df.drop(columns=keys.columns)
+        df.insert(position, column, foreign_keys)
+
+    return df
+
+
+def read_csv_selected(csv_path, columns, dtypes=None, chunksize=None, engine=None):
+    """
+    Reads only the selected columns of a csv file, with their dtypes declared up front, instead of parsing every
+    column and filtering them afterwards.
+
+    Column names are given with underscores (as returned by replace_dots), they are matched against the dotted names
+    of the csv header, which is read on its own first. The match ignores the case, the columns are returned with the
+    names given.
+
+    Args:
+        csv_path (str): path of the csv file
+        columns (list): names of the columns to keep, in the order they should be returned
+        dtypes (dict): optional dtypes of the columns, keyed by the same names as columns
+        chunksize (int): if set, the file is read in chunks of this many rows to keep memory bounded
+        engine (str): pandas csv parser engine, "pyarrow" can be used for a faster (multithreaded) parsing
+
+    Returns:
+        pd.DataFrame or iterator of pd.DataFrame: the selected columns with underscored names, or an iterator of
+        DataFrames if chunksize is set
+    """
+
+    if chunksize is not None and engine == "pyarrow":
+        raise ValueError("The pyarrow engine doesn't support chunked reading, use the default engine with chunksize")
+
+    header = pd.read_csv(csv_path, nrows=0).columns
+    raw_names = {col.replace('.', '_').lower(): col for col in header}
+
+    missing_columns = [col for col in columns if col.lower() not in raw_names]
+    if missing_columns:
+        raise KeyError(f"Columns not found in {csv_path}: {missing_columns}")
+
+    usecols = [raw_names[col.lower()] for col in columns]
+    dtype = {raw_names[col.lower()]: col_dtype for col, col_dtype in (dtypes or {}).items() if col.lower() in raw_names}
+    names = {raw_names[col.lower()]: col for col in columns}
+
+    reader = pd.read_csv(csv_path, usecols=usecols, dtype=dtype, chunksize=chunksize, engine=engine)
+
+    # usecols doesn't keep the requested order, columns are reordered after renaming
+    if chunksize is None:
+        return reader.rename(columns=names)[columns]
+    return (chunk.rename(columns=names)[columns] for chunk in reader)
+
+
+def read_table_csv(table_name, chunksize=None, engine=None):
+    """
+    Reads the columns of a table (see TABLE_SCHEMAS) from its csv file, with the dtypes of their SQL types. Only those
+    columns are parsed, a lot of columns of the main glassdoor.csv file are HTML or URL related elements that are not
+    very relevant for our purpose.
+    """
+
+    return read_csv_selected(CSV_FILES[table_name], csv_columns(table_name), read_dtypes(table_name), chunksize, engine)
+
+
+def data_processing_glassdoor_csv(chunksize=None, engine=None, text_workers=1):
+    """
+    Filter, clean and validate the glassdoor.csv file, the main file/table of the dataset, and extract the companies of
+    the job postings from the same read of the file: the distinct values of the company columns, repeated in each
+    posting of a company, are the rows of the glassdoor_companies table, keyed by a fingerprint of their values (see
+    SurrogateKeys), and replaced by that key in the glassdoor table.
+
+    Only the selected columns are parsed. With chunksize, the file is read and cleaned chunk by chunk so the full
+    163-column file is never held in memory at once; engine="pyarrow" parses the whole file with the pyarrow engine.
+    text_workers is the number of processes used to clean the job descriptions (see clean_text_series).
+
+    Returns:
+        dict: cleaned DataFrames of the glassdoor and glassdoor_companies tables, keyed by table name
+    """
+
+    # Remove duplicates. With chunksize, each chunk is deduplicated against the fingerprints of the rows of the previous
+    # ones as it is read.
+    deduplicator = RowFingerprintDeduplicator()
+
+    # The company columns are replaced by the key of the company, the companies not seen before are kept for the
+    # glassdoor_companies table
+    company_keys = dimension_keys("glassdoor")
+
+    if chunksize is None:
+        filtered_df_glassdoor = drop_duplicate_rows(_clean_glassdoor_chunk(read_table_csv("glassdoor", engine=engine)))
+        df_c = new_dimension_rows(filtered_df_glassdoor, "glassdoor", company_keys)["glassdoor_companies"]
+        filtered_df_glassdoor = replace_dimensions(filtered_df_glassdoor, company_keys)
+    else:
+        glassdoor_chunks = []
+        company_chunks = []
+        for chunk in read_table_csv("glassdoor", chunksize=chunksize):
+            chunk = deduplicator.drop_duplicates(_clean_glassdoor_chunk(chunk))
+            company_chunks.append(new_dimension_rows(chunk, "glassdoor", company_keys)["glassdoor_companies"])
+            glassdoor_chunks.append(replace_dimensions(chunk, company_keys))
+
+        # Chunks don't share the same categories, concatenating them falls back to object dtype (the enumerated types
+        # have the same categories in all the chunks)
+        filtered_df_glassdoor = pd.concat(glassdoor_chunks, ignore_index=True)
+        category_columns = TABLE_SCHEMAS["glassdoor"]["category_columns"]
+        filtered_df_glassdoor = filtered_df_glassdoor.astype({col: "category" for col in category_columns})
+        filtered_df_glassdoor.attrs["duplicates_dropped"] = deduplicator.dropped_rows
+        df_c = pd.concat(company_chunks, ignore_index=True)
+        df_c = df_c.astype({col: "category" for col in TABLE_SCHEMAS["glassdoor_companies"]["category_columns"]})
 
     # Removes all the HTML/CSS tags and other random junk from the text, only keeping words
-    filtered_df_glassdoor["job_description"] = filtered_df_glassdoor["job_description"].apply(clean_job_description)
+    filtered_df_glassdoor["job_description"] = clean_text_series(
+        filtered_df_glassdoor["job_description"], n_workers=text_workers
+    )
 
     # Discrepancies between the use of camelCase for some df columns names and PostgreSQL autoconverting all of 
     # them to lowercase automatically would cause errors when uploading, so we convert everything to lowercase.
     filtered_df_glassdoor = filtered_df_glassdoor.rename(columns=lambda x: x.lower())
 
+    # Memory-compact dtypes, the values are unchanged
+    filtered_df_glassdoor = optimize_dtypes(filtered_df_glassdoor, "glassdoor")
+
+    df_c = optimize_dtypes(df_c.rename(columns=lambda x: x.lower()), "glassdoor_companies")
+
     """ #FIME: DEBUGGING LENGTH CUT
     new_length = len(filtered_df_glassdoor) // 100
     filtered_df_glassdoor = filtered_df_glassdoor.iloc[:new_length] """
 
+    return {"glassdoor": filtered_df_glassdoor, "glassdoor_companies": df_c}
+
+
+def _clean_glassdoor_chunk(filtered_df_glassdoor):
+    """Row-wise cleaning of the main file, that can be applied to the whole file or to each chunk independently."""
+
+    # Columns cast to the types of the database, values that don't fit them are reported here instead of at the upload
+    filtered_df_glassdoor = cast_columns(filtered_df_glassdoor, "glassdoor")
+
+    filtered_df_glassdoor = apply_cleaning_rules(filtered_df_glassdoor, csv_cleaning_rules("glassdoor"))
+
+    # Remove only rows with all missing values
+    filtered_df_glassdoor.dropna(how="all", inplace=True)
+
     return filtered_df_glassdoor
 
 
 def data_processing_glassdoor_overview_competitors_csv():
     """Clean and validate the glassdoor_overview_competitors.csv file."""
     
-    df_oc = pd.read_csv("glassdoor_dataset/glassdoor_overview_competitors.csv")
-
-    df_oc = replace_dots(df_oc)
+    df_oc = read_table_csv("glassdoor_overview_competitors")
     
-    df_oc = df_oc.drop_duplicates(subset='id', keep='first')
+    df_oc = drop_duplicate_rows(df_oc, subset=['id'])
+
+    df_oc = cast_columns(df_oc, "glassdoor_overview_competitors")
+
+    df_oc = apply_cleaning_rules(df_oc, CLEANING_RULES["glassdoor_overview_competitors"])
     
     # Discrepancies between the use of camelCase for some df columns names and PostgreSQL autoconverting all of 
     # them to lowercase automatically would cause errors when uploading, so we convert everything to lowercase.
     df_oc = df_oc.rename(columns=lambda x: x.lower())
+
+    # Memory-compact dtypes, the values are unchanged
+    df_oc = optimize_dtypes(df_oc, "glassdoor_overview_competitors")
     
     """ #FIME: DEBUGGING LENGTH CUT
     new_length = len(df_oc) // 100
@@ -181,24 +625,20 @@ def data_processing_glassdoor_overview_competitors_csv():
 def data_processing_glassdoor_benefits_comments_csv():
     """Clean and validate the glassdoor_benefits_comments.csv file."""
 
-    df_bc = pd.read_csv("glassdoor_dataset/glassdoor_benefits_comments.csv")
-
-    df_bc = replace_dots(df_bc)
-    
-    df_bc = df_bc.drop_duplicates(subset='id', keep='first')
+    df_bc = read_table_csv("glassdoor_benefits_comments")
     
+    df_bc = drop_duplicate_rows(df_bc, subset=['id'])
+
+    df_bc = cast_columns(df_bc, "glassdoor_benefits_comments")
 
-    # Transform floats with zero decimal values to integers
-    columns_to_int = [
-        "index",
-        "benefits_comments_val_rating",
-    ]
-    for column in columns_to_int:
-        df_bc[column] = df_bc[column].astype(pd.Int64Dtype())
+    df_bc = apply_cleaning_rules(df_bc, CLEANING_RULES["glassdoor_benefits_comments"])
     
     # Discrepancies between the use of camelCase for some df columns names and PostgreSQL autoconverting all of 
     # them to lowercase automatically would cause errors when uploading, so we convert everything to lowercase.
     df_bc = df_bc.rename(columns=lambda x: x.lower())
+
+    # Memory-compact dtypes, the values are unchanged
+    df_bc = optimize_dtypes(df_bc, "glassdoor_benefits_comments")
     
     """ #FIME: DEBUGGING LENGTH CUT
     new_length = len(df_bc) // 100
@@ -210,24 +650,21 @@ def data_processing_glassdoor_benefits_comments_csv():
 def data_processing_glassdoor_benefits_highlights_csv():
     """Clean and validate the glassdoor_benefits_highlights.csv file."""
 
-    df_bh = pd.read_csv("glassdoor_dataset/glassdoor_benefits_highlights.csv")
-
-    df_bh = replace_dots(df_bh)
-    
-    df_bh = df_bh.drop_duplicates(subset='id', keep='first')
+    df_bh = read_table_csv("glassdoor_benefits_highlights")
     
-    # Transform floats with zero decimal values to integers
-    columns_to_int = [
-        "index",
-        "benefits_highlights_val_commentCount",
-    ]
-    for column in columns_to_int:
-        df_bh[column] = df_bh[column].astype(pd.Int64Dtype())
+    df_bh = drop_duplicate_rows(df_bh, subset=['id'])
+
+    df_bh = cast_columns(df_bh, "glassdoor_benefits_highlights")
+
+    df_bh = apply_cleaning_rules(df_bh, CLEANING_RULES["glassdoor_benefits_highlights"])
 
     # Discrepancies between the use of camelCase for some df columns names and PostgreSQL autoconverting all of 
     # them to lowercase automatically would cause errors when uploading, so we convert everything to lowercase.
     df_bh = df_bh.rename(columns=lambda x: x.lower())
 
+    # Memory-compact dtypes, the values are unchanged
+    df_bh = optimize_dtypes(df_bh, "glassdoor_benefits_highlights")
+
     """ #FIME: DEBUGGING LENGTH CUT
     new_length = len(df_bh) // 100
     df_bh = df_bh.iloc[:new_length] """
@@ -238,39 +675,20 @@ def data_processing_glassdoor_benefits_highlights_csv():
 def data_processing_glassdoor_reviews_csv():
     """Clean and validate the glassdoor_reviews.csv file."""
 
-    df_r = pd.read_csv("glassdoor_dataset/glassdoor_reviews.csv")
-
-    df_r = replace_dots(df_r)
-    
-    df_r = df_r.drop_duplicates(subset='id', keep='first')
+    df_r = read_table_csv("glassdoor_reviews")
     
+    df_r = drop_duplicate_rows(df_r, subset=['id'])
 
-    # Transform floats with zero decimal values to integers
-    # I found that in some columns, some rare values actually contain decimals (3.5/5 rating for example), I chose to keep those columns as floats
-    columns_to_int = [
-        "index",
-        "reviews_val_helpfulCount",
-        "reviews_val_id",
-        # "reviews_val_reviewRatings_careerOpportunities", # Some rare decimals are hidden in this column, keeping as floats
-        # "reviews_val_reviewRatings_compBenefits",  # Some decimals are hidden in this column, keeping as floats
-        "reviews_val_reviewRatings_cultureValues",
-        "reviews_val_reviewRatings_overall", 
-        # "reviews_val_reviewRatings_seniorManagement",  # Some decimals are hidden in this column, keeping as floats
-        # "reviews_val_reviewRatings_worklifeBalance",  # Some decimals are hidden in this column, keeping as floats
-        "reviews_val_summaryPoints_ceoApproval",
-        "reviews_val_summaryPoints_outlook",
-        "reviews_val_summaryPoints_recommend",
-        "reviews_val_reviewResponses",
-    ]
-    for column in columns_to_int:
-        df_r[column] = df_r[column].astype(pd.Int64Dtype())
+    df_r = cast_columns(df_r, "glassdoor_reviews")
+
+    df_r = apply_cleaning_rules(df_r, CLEANING_RULES["glassdoor_reviews"])
 
     # Discrepancies between the use of camelCase for some df columns names and PostgreSQL autoconverting all of 
     # them to lowercase automatically would cause errors when uploading, so we convert everything to lowercase.
     df_r = df_r.rename(columns=lambda x: x.lower())
 
-    temp_value = -1
-    df_r['reviews_val_reviewresponses'].fillna(temp_value, inplace=True)
+    # Memory-compact dtypes, the values are unchanged
+    df_r = optimize_dtypes(df_r, "glassdoor_reviews")
 
     """ #FIME: DEBUGGING LENGTH CUT
     new_length = len(df_r) // 100
@@ -282,23 +700,20 @@ def data_processing_glassdoor_reviews_csv():
 def data_processing_glassdoor_salary_salaries_csv():
     """Clean and validate the glassdoor_salary_salaries.csv file."""
 
-    df_ss = pd.read_csv("glassdoor_dataset/glassdoor_salary_salaries.csv")
+    df_ss = read_table_csv("glassdoor_salary_salaries")
 
-    df_ss = replace_dots(df_ss)
+    df_ss = drop_duplicate_rows(df_ss, subset=['id'])
 
-    df_ss = df_ss.drop_duplicates(subset='id', keep='first')
-    
-    # Transform floats with zero decimal values to integers
-    columns_to_int = [
-        "index",
-        "salary_salaries_val_basePayCount",
-    ]
-    for column in columns_to_int:
-        df_ss[column] = df_ss[column].astype(pd.Int64Dtype())
+    df_ss = cast_columns(df_ss, "glassdoor_salary_salaries")
+
+    df_ss = apply_cleaning_rules(df_ss, CLEANING_RULES["glassdoor_salary_salaries"])
     
     # Discrepancies between the use of camelCase for some df columns names and PostgreSQL autoconverting all of 
     # them to lowercase automatically would cause errors when uploading, so we convert everything to lowercase.
     df_ss = df_ss.rename(columns=lambda x: x.lower())
+
+    # Memory-compact dtypes, the values are unchanged
+    df_ss = optimize_dtypes(df_ss, "glassdoor_salary_salaries")
     
     """ #FIME: DEBUGGING LENGTH CUT
     new_length = len(df_ss) // 100
@@ -307,32 +722,27 @@ def data_processing_glassdoor_salary_salaries_csv():
     return df_ss
 
 
-def data_processing_glassdoor_wwfu_csv():
+def data_processing_glassdoor_wwfu_csv(text_workers=1):
     """Clean and validate the glassdoor_wwfu.csv file."""
 
-    df_w = pd.read_csv("glassdoor_dataset/glassdoor_wwfu.csv")
-
-    df_w = replace_dots(df_w)
-    
-    df_w = df_w.drop_duplicates(subset='id', keep='first')
+    df_w = read_table_csv("glassdoor_wwfu")
     
+    df_w = drop_duplicate_rows(df_w, subset=['id'])
 
-    # Transform floats with zero decimal values to integers
-    columns_to_int = [
-        "wwfu_val_videos",
-        "wwfu_val_photos",
-        "wwfu_val_captions",
-    ]
-    for column in columns_to_int:
-        df_w[column] = df_w[column].astype(pd.Int64Dtype())
+    df_w = cast_columns(df_w, "glassdoor_wwfu")
+
+    df_w = apply_cleaning_rules(df_w, CLEANING_RULES["glassdoor_wwfu"])
 
     # Cleaning HTML/CSS tags
-    df_w["wwfu_val_body"] = df_w["wwfu_val_body"].apply(clean_job_description)
+    df_w["wwfu_val_body"] = clean_text_series(df_w["wwfu_val_body"], n_workers=text_workers)
 
     # Discrepancies between the use of camelCase for some df columns names and PostgreSQL autoconverting all of 
     # them to lowercase automatically would cause errors when uploading, so we convert everything to lowercase.
     df_w = df_w.rename(columns=lambda x: x.lower())
 
+    # Memory-compact dtypes, the values are unchanged
+    df_w = optimize_dtypes(df_w, "glassdoor_wwfu")
+
     
     """ #FIME: DEBUGGING LENGTH CUT
     new_length = len(df_w) // 100
@@ -344,15 +754,20 @@ def data_processing_glassdoor_wwfu_csv():
 def data_processing_glassdoor_wwfu_val_captions_csv():
     """Clean and validate the glassdoor_wwfu_val_captions.csv file."""
 
-    df_wvc = pd.read_csv("glassdoor_dataset/glassdoor_wwfu_val_captions.csv")
-    
-    df_wvc = replace_dots(df_wvc)
+    df_wvc = read_table_csv("glassdoor_wwfu_val_captions")
     
-    df_wvc = df_wvc.drop_duplicates(subset='id', keep='first')
+    df_wvc = drop_duplicate_rows(df_wvc, subset=['id'])
+
+    df_wvc = cast_columns(df_wvc, "glassdoor_wwfu_val_captions")
+
+    df_wvc = apply_cleaning_rules(df_wvc, CLEANING_RULES["glassdoor_wwfu_val_captions"])
     
     # Discrepancies between the use of camelCase for some df columns names and PostgreSQL autoconverting all of 
     # them to lowercase automatically would cause errors when uploading, so we convert everything to lowercase.
     df_wvc = df_wvc.rename(columns=lambda x: x.lower())
+
+    # Memory-compact dtypes, the values are unchanged
+    df_wvc = optimize_dtypes(df_wvc, "glassdoor_wwfu_val_captions")
     
     """ #FIME: DEBUGGING LENGTH CUT
     new_length = len(df_wvc) // 100
@@ -364,16 +779,21 @@ def data_processing_glassdoor_wwfu_val_captions_csv():
 def data_processing_glassdoor_wwfu_val_photos_csv():
     """Clean and validate the glassdoor_wwfu_val_photos.csv file."""
 
-    df_wvp = pd.read_csv("glassdoor_dataset/glassdoor_wwfu_val_photos.csv")
-    
-    df_wvp = replace_dots(df_wvp)
+    df_wvp = read_table_csv("glassdoor_wwfu_val_photos")
     
-    df_wvp = df_wvp.drop_duplicates(subset='id', keep='first')
+    df_wvp = drop_duplicate_rows(df_wvp, subset=['id'])
+
+    df_wvp = cast_columns(df_wvp, "glassdoor_wwfu_val_photos")
+
+    df_wvp = apply_cleaning_rules(df_wvp, CLEANING_RULES["glassdoor_wwfu_val_photos"])
 
     # Discrepancies between the use of camelCase for some df columns names and PostgreSQL autoconverting all of 
     # them to lowercase automatically would cause errors when uploading, so we convert everything to lowercase.
     df_wvp = df_wvp.rename(columns=lambda x: x.lower())
 
+    # Memory-compact dtypes, the values are unchanged
+    df_wvp = optimize_dtypes(df_wvp, "glassdoor_wwfu_val_photos")
+
     """ #FIME: DEBUGGING LENGTH CUT
     new_length = len(df_wvp) // 100
     df_wvp = df_wvp.iloc[:new_length] """
@@ -384,16 +804,21 @@ def data_processing_glassdoor_wwfu_val_photos_csv():
 def data_processing_glassdoor_wwfu_val_videos_csv():
     """Clean and validate the glassdoor_wwfu_val_videos.csv file."""    
 
-    df_wvv = pd.read_csv("glassdoor_dataset/glassdoor_wwfu_val_videos.csv")
-    
-    df_wvv = replace_dots(df_wvv)
+    df_wvv = read_table_csv("glassdoor_wwfu_val_videos")
     
     # Certain id duplicates would cause errors when uploading
-    df_wvv = df_wvv.drop_duplicates(subset='id', keep='first')
+    df_wvv = drop_duplicate_rows(df_wvv, subset=['id'])
+
+    df_wvv = cast_columns(df_wvv, "glassdoor_wwfu_val_videos")
+
+    df_wvv = apply_cleaning_rules(df_wvv, CLEANING_RULES["glassdoor_wwfu_val_videos"])
     
     # Discrepancies between the use of camelCase for some df columns names and PostgreSQL autoconverting all of 
     # them to lowercase automatically would cause errors when uploading, so we convert everything to lowercase.
     df_wvv = df_wvv.rename(columns=lambda x: x.lower())
+
+    # Memory-compact dtypes, the values are unchanged
+    df_wvv = optimize_dtypes(df_wvv, "glassdoor_wwfu_val_videos")
     
     """ #FIME: DEBUGGING LENGTH CUT
     new_length = len(df_wvv) // 100
@@ -401,3 +826,89 @@ def data_processing_glassdoor_wwfu_val_videos_csv():
     
     return df_wvv
 
+
+
+# Text columns cleaned with clean_job_description, by table
+CLEANED_TEXT_COLUMNS = {
+    "glassdoor": ["job_description"],
+    "glassdoor_wwfu": ["wwfu_val_body"],
+}
+
+
+def data_processing_chunks(table_name, chunksize, text_workers=1):
+    """
+    Reads, cleans and validates the csv file of a table chunk by chunk, with the same steps and the same result as its
+    function of DATA_PROCESSING_FUNCTIONS, yielding each chunk once it is cleaned so it can be uploaded before the next
+    one is read. A dimension table (glassdoor_companies) is read in a pass of its own over the csv file of its table,
+    parsing only its columns: the rows of each table are uploaded before those of the tables referencing it. Only the
+    fingerprints of the rows already seen are kept from one chunk to the next, to drop the duplicates of the previous
+    chunks: the full rows for glassdoor, the ids for the other files, and the values of the dimension tables (see
+    SurrogateKeys).
+
+    The dtypes aren't optimized (see optimize_dtypes), a chunk is only held until it is uploaded.
+
+    Args:
+        table_name (str): name of the table, key of CSV_FILES
+        chunksize (int): number of rows read from the csv file at a time
+        text_workers (int): processes used to clean the text columns (see clean_text_series)
+
+    Yields:
+        pd.DataFrame: the cleaned rows of each chunk, with lowercase column names, empty chunks are skipped
+    """
+
+    schema = TABLE_SCHEMAS[table_name]
+    deduplicator = RowFingerprintDeduplicator(subset=None if table_name == "glassdoor" else ["id"])
+    keys_by_column = dimension_keys(table_name)
+    surrogate_keys = SurrogateKeys(csv_columns(table_name)) if "surrogate_key" in schema else None
+
+    for chunk in read_table_csv(table_name, chunksize=chunksize):
+        if table_name == "glassdoor":
+            chunk = replace_dimensions(deduplicator.drop_duplicates(_clean_glassdoor_chunk(chunk)), keys_by_column)
+        elif surrogate_keys is not None:
+            chunk = cast_columns(chunk, table_name)
+            chunk = apply_cleaning_rules(chunk, CLEANING_RULES[table_name])
+            chunk = surrogate_keys.dimension_rows(chunk, schema["surrogate_key"])
+        else:
+            chunk = deduplicator.drop_duplicates(chunk)
+            chunk = cast_columns(chunk, table_name)
+            chunk = apply_cleaning_rules(chunk, CLEANING_RULES[table_name])
+
+        if chunk.empty:
+            continue
+
+        for column in CLEANED_TEXT_COLUMNS.get(table_name, []):
+            chunk[column] = clean_text_series(chunk[column], n_workers=text_workers)
+
+        yield chunk.rename(columns=lambda x: x.lower())
+
+
+# Processing function of each csv file, keyed by the table filled from it, the files are independent and can be
+# processed in any order. The function of a table with dimensions fills them from the same read of the file, and
+# returns the DataFrames of all these tables keyed by table name (see process_csv_file).
+DATA_PROCESSING_FUNCTIONS = {
+    "glassdoor": data_processing_glassdoor_csv,
+    "glassdoor_overview_competitors": data_processing_glassdoor_overview_competitors_csv,
+    "glassdoor_benefits_comments": data_processing_glassdoor_benefits_comments_csv,
+    "glassdoor_benefits_highlights": data_processing_glassdoor_benefits_highlights_csv,
+    "glassdoor_reviews": data_processing_glassdoor_reviews_csv,
+    "glassdoor_salary_salaries": data_processing_glassdoor_salary_salaries_csv,
+    "glassdoor_wwfu": data_processing_glassdoor_wwfu_csv,
+    "glassdoor_wwfu_val_captions": data_processing_glassdoor_wwfu_val_captions_csv,
+    "glassdoor_wwfu_val_photos": data_processing_glassdoor_wwfu_val_photos_csv,
+    "glassdoor_wwfu_val_videos": data_processing_glassdoor_wwfu_val_videos_csv,
+}
+
+
+def process_csv_file(table_name):
+    """
+    Runs the processing function of a csv file.
+
+    Args:
+        table_name (str): name of the table filled from the file, key of DATA_PROCESSING_FUNCTIONS
+
+    Returns:
+        dict: cleaned DataFrame of the table, and of its dimension tables, keyed by table name
+    """
+
+    dataframes = DATA_PROCESSING_FUNCTIONS[table_name]()
+    return dataframes if isinstance(dataframes, dict) else {table_name: dataframes}
@@ -0,0 +1,344 @@
+""" This module holds the queries of the Looker dashboard (see bigquery_sql_queries/bigquery_sql_queries.sql) and its
+summary tables as parameterized specs, the only definition of their SQL: it generates from them the federated SQL run by
+BigQuery, and the PostgreSQL queries of sql_queries_vars.py (DASHBOARD_QUERIES, SUMMARY_VIEW_QUERIES). The projection,
+the WHERE predicates, the aggregation, the HAVING filter and the LIMIT of each query are all pushed down into the inner
+query sent to PostgreSQL through EXTERNAL_QUERY, so only the aggregated rows cross the connection instead of the whole
+glassdoor table.
+
+A spec is a dict with the following keys, whose values may hold {parameter} placeholders:
+- columns: output column names, mapped to their SQL expression
+- where: predicates combined with AND
+- group_by: grouping columns
+- having: predicates on the groups combined with AND
+- order_by: ordering of the output columns
+- limit: maximum number of rows
+- params: default values of the parameters, which can be overridden when generating the SQL
+
+The specs read the glassdoor_with_companies view, PostgreSQL skips its join for the specs not using the company columns.
+"""
+
+import math
+import pandas as pd
+import sqlalchemy
+
+
+GBP_USD_RATE = 0.7815448626756474
+
+
+DASHBOARD_QUERY_SPECS = {
+    "job_count_by_title": {
+        "columns": {"header_jobtitle": "header_jobtitle", "count": "COUNT(header_jobtitle)"},
+        "group_by": ["header_jobtitle"],
+        "order_by": ["count DESC"],
+    },
+    "job_count_by_location": {
+        "columns": {"map_location": "map_location", "job_count": "COUNT(*)"},
+        "where": ["map_location != ''"],
+        "group_by": ["map_location"],
+        "order_by": ["job_count DESC"],
+    },
+    "job_count_by_industry": {
+        "columns": {"overview_industry": "overview_industry", "job_count": "COUNT(*)"},
+        "where": ["overview_industry != ''"],
+        "group_by": ["overview_industry"],
+        "order_by": ["job_count DESC"],
+    },
+    "job_map": {
+        "columns": {"map_location": "map_location", "map_lat": "map_lat", "map_lng": "map_lng", "job_count": "COUNT(*)"},
+        "group_by": ["map_location", "map_lat", "map_lng"],
+        "order_by": ["job_count DESC"],
+    },
+    "median_salary_by_city": {
+        "columns": {"map_location": "map_location", "job_count": "COUNT(*)", "avg_pay_med": "AVG(header_paymed)"},
+        "where": ["map_location != ''"],
+        "group_by": ["map_location"],
+        "having": ["COUNT(*) > {min_job_count}"],
+        "order_by": ["avg_pay_med DESC"],
+        "limit": "{limit}",
+        "params": {"min_job_count": 20, "limit": 100},
+    },
+    "cities_by_high_ratings": {
+        "columns": {"map_location": "map_location", "job_count": "COUNT(*)", "avg_rating": "AVG(header_rating)"},
+        "where": ["map_location != ''", "header_rating >= {min_rating}"],
+        "group_by": ["map_location"],
+        "having": ["COUNT(*) > {min_job_count}"],
+        "order_by": ["job_count DESC"],
+        "limit": "{limit}",
+        "params": {"min_rating": 4, "min_job_count": 50, "limit": 100},
+    },
+    "cities_by_ratings": {
+        "columns": {
+            "map_location": "map_location",
+            "job_count": "COUNT(*)",
+            "avg_rating": "AVG(header_rating)",
+            "avg_recommend_to_friend": "AVG(rating_recommendtofriend)",
+            "best_workplaces_awards": "COUNT(header_urgencylabel)",
+            "avg_star_rating": "AVG(rating_starrating)",
+        },
+        "where": ["map_location != ''"],
+        "group_by": ["map_location"],
+        "having": ["COUNT(*) > {min_job_count}"],
+        "order_by": ["avg_rating DESC", "avg_recommend_to_friend DESC", "best_workplaces_awards DESC", "avg_star_rating DESC"],
+        "limit": "{limit}",
+        # Small cities by default, min_job_count=1500 for the big cities
+        "params": {"min_job_count": 150, "limit": 50},
+    },
+    "industries_by_pay": {
+        "columns": {
+            "overview_industry": "overview_industry",
+            "job_count": "COUNT(*)",
+            "avg_salary_usd": f"ROUND(AVG(header_paymed) / {GBP_USD_RATE})",
+            "avg_rating": "ROUND(AVG(header_rating)::NUMERIC, 1)",
+        },
+        "where": ["overview_industry != ''"],
+        "group_by": ["overview_industry"],
+        "having": ["COUNT(*) > {min_job_count}"],
+        "order_by": ["avg_salary_usd DESC"],
+        "params": {"min_job_count": 200},
+    },
+    "companies_by_pay": {
+        "columns": {
+            "header_employername": "header_employername",
+            "overview_hq": "overview_hq",
+            "overview_revenue": "overview_revenue",
+            "job_count": "COUNT(*)",
+            "avg_salary_usd": f"ROUND(AVG(header_paymed) / {GBP_USD_RATE})",
+            "avg_rating": "ROUND(AVG(header_rating)::NUMERIC, 1)",
+        },
+        "where": ["header_employername != ''"],
+        "group_by": ["header_employername", "overview_hq", "overview_revenue"],
+        "having": ["COUNT(*) > {min_job_count}"],
+        "order_by": ["avg_salary_usd DESC"],
+        # Small companies by default, min_job_count=200 for the big companies
+        "params": {"min_job_count": 5},
+    },
+    "salary_by_revenue": {
+        "columns": {"overview_revenue": "overview_revenue", "avg_salary": "AVG(header_paymed)"},
+        "where": ["header_jobtitle != ''", "overview_revenue != ''"],
+        "group_by": ["overview_revenue"],
+        "order_by": ["avg_salary DESC"],
+    },
+}
+
+
+# Summary tables of the dashboard (see summary_views.py), with the same spec format, unique on their grouping columns
+SUMMARY_VIEW_SPECS = {
+    "glassdoor_summary_title": {
+        "columns": {"header_jobtitle": "header_jobtitle", "job_count": "COUNT(header_jobtitle)"},
+        "group_by": ["header_jobtitle"],
+    },
+    "glassdoor_summary_location": {
+        "columns": {
+            "map_location": "map_location",
+            "job_count": "COUNT(*)",
+            "avg_pay_med": "AVG(header_paymed)",
+            "avg_rating": "AVG(header_rating)",
+            "avg_recommend_to_friend": "AVG(rating_recommendtofriend)",
+            "best_workplaces_awards": "COUNT(header_urgencylabel)",
+            "avg_star_rating": "AVG(rating_starrating)",
+            "job_count_rating_above_4": "COUNT(*) FILTER (WHERE header_rating >= 4)",
+            "avg_rating_above_4": "AVG(header_rating) FILTER (WHERE header_rating >= 4)",
+        },
+        "where": ["map_location != ''"],
+        "group_by": ["map_location"],
+    },
+    "glassdoor_summary_map": {
+        "columns": {
+            "map_location": "map_location", "map_lat": "map_lat", "map_lng": "map_lng", "job_count": "COUNT(*)",
+        },
+        "group_by": ["map_location", "map_lat", "map_lng"],
+    },
+    "glassdoor_summary_industry": {
+        "columns": {
+            "overview_industry": "overview_industry",
+            "job_count": "COUNT(*)",
+            "avg_pay_med": "AVG(header_paymed)",
+            "avg_rating": "AVG(header_rating)",
+        },
+        "where": ["overview_industry != ''"],
+        "group_by": ["overview_industry"],
+    },
+    "glassdoor_summary_company": {
+        "columns": {
+            "header_employername": "header_employername",
+            "overview_hq": "overview_hq",
+            "overview_revenue": "overview_revenue",
+            "job_count": "COUNT(*)",
+            "avg_pay_med": "AVG(header_paymed)",
+            "avg_rating": "AVG(header_rating)",
+        },
+        "where": ["header_employername != ''"],
+        "group_by": ["header_employername", "overview_hq", "overview_revenue"],
+    },
+    "glassdoor_summary_revenue": {
+        "columns": {"overview_revenue": "overview_revenue", "avg_pay_med": "AVG(header_paymed)"},
+        "where": ["header_jobtitle != ''", "overview_revenue != ''"],
+        "group_by": ["overview_revenue"],
+    },
+}
+
+
+def sql_literal(value):
+    """
+    Formats a parameter value as a SQL literal.
+
+    Args:
+        value (int, float, str or bool): the value
+
+    Returns:
+        str: the SQL literal, strings being quoted with their single quotes doubled
+    """
+
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, float) and math.isfinite(value):
+        return repr(value)
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    raise ValueError(f"Unsupported SQL parameter value: {value!r}")
+
+
+def pushdown_query(query_name, table_name="glassdoor_with_companies", **params):
+    """
+    Generates the PostgreSQL query of a dashboard query spec, with the projection, the filters, the aggregation and the
+    limit all applied by PostgreSQL.
+
+    Args:
+        query_name (str): name of the spec, key of DASHBOARD_QUERY_SPECS
+        table_name (str): table (or view) queried, the glassdoor table with its company columns by default
+        **params: values of the parameters of the spec, overriding its defaults
+
+    Returns:
+        str: the query, on a single line
+    """
+
+    spec = DASHBOARD_QUERY_SPECS[query_name]
+    params = {**spec.get("params", {}), **params}
+    unknown_params = set(params) - set(spec.get("params", {}))
+    if unknown_params:
+        raise ValueError(f"Unknown parameters for {query_name}: {sorted(unknown_params)}")
+
+    return select_query(spec, table_name, params)
+
+
+def select_query(spec, table_name, params=None):
+    """
+    Generates the SELECT query of a spec.
+
+    Args:
+        spec (dict): the spec, see the module docstring
+        table_name (str): table (or view) queried
+        params (dict): values of all the parameters of the spec
+
+    Returns:
+        str: the query, on a single line
+    """
+
+    literals = {param_name: sql_literal(value) for param_name, value in (params or {}).items()}
+
+    def render(clause):
+        return clause.format(**literals)
+
+    columns = ", ".join(
+        column if expression == column else f"{render(expression)} AS {column}"
+        for column, expression in spec["columns"].items()
+    )
+    query = f"SELECT {columns} FROM {table_name}"
+    if spec.get("where"):
+        query += " WHERE " + " AND ".join(f"({render(predicate)})" for predicate in spec["where"])
+    if spec.get("group_by"):
+        query += " GROUP BY " + ", ".join(spec["group_by"])
+    if spec.get("having"):
+        query += " HAVING " + " AND ".join(f"({render(predicate)})" for predicate in spec["having"])
+    if spec.get("order_by"):
+        query += " ORDER BY " + ", ".join(spec["order_by"])
+    if spec.get("limit") is not None:
+        query += f" LIMIT {render(str(spec['limit']))}"
+
+    return query
+
+
+def summary_view_query(view_name, table_name="glassdoor_with_companies"):
+    """
+    Generates the queries creating a summary table of the dashboard (a materialized view of its spec) and its unique
+    index on the grouping columns, required to refresh it without blocking its readers (CONCURRENTLY).
+
+    Args:
+        view_name (str): name of the view, key of SUMMARY_VIEW_SPECS
+        table_name (str): table (or view) aggregated, the glassdoor table with its company columns by default
+
+    Returns:
+        str: the CREATE MATERIALIZED VIEW and CREATE UNIQUE INDEX queries, which do nothing if the view exists
+    """
+
+    spec = SUMMARY_VIEW_SPECS[view_name]
+    return (
+        f"CREATE MATERIALIZED VIEW IF NOT EXISTS {view_name} AS {select_query(spec, table_name)};\n"
+        f"CREATE UNIQUE INDEX IF NOT EXISTS {view_name}_key ON {view_name} ({', '.join(spec['group_by'])});"
+    )
+
+
+def federated_query(query_name, connection_id="CONNECTION_ID", table_name="glassdoor_with_companies", **params):
+    """
+    Generates the BigQuery query of a dashboard query spec, running the whole query in PostgreSQL through EXTERNAL_QUERY.
+    BigQuery only restores the order of the rows, which isn't guaranteed to be kept by EXTERNAL_QUERY.
+
+    Args:
+        query_name (str): name of the spec, key of DASHBOARD_QUERY_SPECS
+        connection_id (str): BigQuery connection to the Cloud SQL database
+        table_name (str): table (or view) queried, the glassdoor table with its company columns by default
+        **params: values of the parameters of the spec, overriding its defaults
+
+    Returns:
+        str: the BigQuery query
+    """
+
+    inner_query = pushdown_query(query_name, table_name, **params)
+    # Escaped for a BigQuery double-quoted string literal
+    inner_query = inner_query.replace("\\", "\\\\").replace('"', '\\"')
+
+    query = f'SELECT * FROM EXTERNAL_QUERY("{connection_id}", "{inner_query};")'
+    order_by = DASHBOARD_QUERY_SPECS[query_name].get("order_by")
+    if order_by:
+        query += " ORDER BY " + ", ".join(order_by)
+
+    return query + ";"
+
+
+def transfer_report(pool, query_names=None, table_name="glassdoor_with_companies"):
+    """
+    Compares, for each dashboard query, the size of the rows returned by its pushed down query with the size of the
+    whole table that SELECT * sends through EXTERNAL_QUERY.
+
+    Args:
+        pool (sqlalchemy.engine.Engine): engine returned by conn_to_psql
+        query_names (list): names of the specs, all the specs of DASHBOARD_QUERY_SPECS by default
+        table_name (str): table (or view) queried, the glassdoor table with its company columns by default
+
+    Returns:
+        pd.DataFrame: rows and bytes returned by each pushed down query, and the reduction factor
+    """
+
+    query_names = list(DASHBOARD_QUERY_SPECS) if query_names is None else query_names
+
+    def result_size(connection, query):
+        return connection.execute(
+            sqlalchemy.text(f"SELECT COUNT(*), COALESCE(SUM(pg_column_size(q.*)), 0) FROM ({query}) AS q;")
+        ).fetchone()
+
+    report = []
+    with pool.connect() as connection:
+        _, table_bytes = result_size(connection, f"SELECT * FROM {table_name}")
+        for query_name in query_names:
+            rows, query_bytes = result_size(connection, pushdown_query(query_name, table_name))
+            report.append({
+                "query_name": query_name,
+                "rows": rows,
+                "bytes": query_bytes,
+                "select_star_bytes": table_bytes,
+                "reduction": table_bytes / max(query_bytes, 1),
+            })
+
+    return pd.DataFrame(report)
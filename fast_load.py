@@ -0,0 +1,123 @@
+""" This module implements the fast-load mode of the upload into an empty database. The tables are created from the
+queries of sql_queries_vars.py without their PRIMARY KEY and FOREIGN KEY constraints, optionally as UNLOGGED tables
+(not written to the write-ahead log), so PostgreSQL doesn't maintain indexes or check foreign keys row by row during the
+upload. Once all the data is loaded, the tables are switched to LOGGED and the primary keys, foreign keys and indexes are
+added in a single transaction: if a constraint can't be created (duplicate id, missing referenced row...), everything is
+rolled back and the tables are left loaded but without constraints.
+"""
+
+import logging
+import re
+import time
+import sqlalchemy
+from index_management import create_index_queries
+from sql_queries_vars import CREATE_TABLE_QUERIES
+from upload_orchestrator import (
+    CREATE_TABLE_PATTERN,
+    FOREIGN_KEY_PATTERN,
+    create_schema_concurrently,
+    parse_foreign_keys,
+)
+
+
+INLINE_PRIMARY_KEY_PATTERN = re.compile(r"^(\s*(\w+)\s+\w+)\s+PRIMARY\s+KEY", re.IGNORECASE | re.MULTILINE)
+TABLE_PRIMARY_KEY_PATTERN = re.compile(r",\s*PRIMARY\s+KEY\s*\(([^)]*)\)", re.IGNORECASE)
+FOREIGN_KEY_CLAUSE_PATTERN = re.compile(r",\s*" + FOREIGN_KEY_PATTERN.pattern, re.IGNORECASE)
+
+
+def split_constraints(create_table_query, unlogged=False):
+    """
+    Splits a CREATE TABLE query into a query creating the table without constraints and the queries adding them.
+
+    Args:
+        create_table_query (str): the CREATE TABLE query
+        unlogged (bool): if True, the table is created as UNLOGGED
+
+    Returns:
+        tuple: CREATE TABLE query without constraints, ALTER TABLE query adding the primary key (None if the table has
+        none), list of the ALTER TABLE queries adding the foreign keys
+    """
+
+    table_name = CREATE_TABLE_PATTERN.search(create_table_query).group(1)
+    primary_key = [match.group(2) for match in INLINE_PRIMARY_KEY_PATTERN.finditer(create_table_query)]
+    for match in TABLE_PRIMARY_KEY_PATTERN.finditer(create_table_query):
+        primary_key.extend(column.strip() for column in match.group(1).split(","))
+
+    unconstrained_query = INLINE_PRIMARY_KEY_PATTERN.sub(r"\1", create_table_query)
+    unconstrained_query = TABLE_PRIMARY_KEY_PATTERN.sub("", unconstrained_query)
+    unconstrained_query = FOREIGN_KEY_CLAUSE_PATTERN.sub("", unconstrained_query)
+    if unlogged:
+        unconstrained_query = re.sub(
+            r"CREATE\s+TABLE", "CREATE UNLOGGED TABLE", unconstrained_query, count=1, flags=re.IGNORECASE
+        )
+
+    primary_key_query = f"ALTER TABLE {table_name} ADD PRIMARY KEY ({', '.join(primary_key)});" if primary_key else None
+    foreign_key_queries = [
+        f"ALTER TABLE {table_name} ADD FOREIGN KEY ({column}) REFERENCES {referenced_table}({referenced_column});"
+        for column, referenced_table, referenced_column in parse_foreign_keys(create_table_query)
+    ]
+
+    return unconstrained_query, primary_key_query, foreign_key_queries
+
+
+def unconstrained_create_table_queries(unlogged=False):
+    """Returns the CREATE TABLE query without constraints of each table, keyed by table name"""
+
+    return {
+        table_name: split_constraints(create_table_query, unlogged)[0]
+        for table_name, create_table_query in CREATE_TABLE_QUERIES.items()
+    }
+
+
+def create_unconstrained_schema(pool, unlogged=False, max_workers=None):
+    """
+    Creates the tables without constraints, all at the same time since they don't reference each other anymore.
+
+    Args:
+        pool (sqlalchemy.engine.Engine): engine returned by conn_to_psql
+        unlogged (bool): if True, the tables are created as UNLOGGED
+        max_workers (int): maximum number of tables created at the same time
+    """
+
+    create_schema_concurrently(pool, unconstrained_create_table_queries(unlogged), max_workers)
+
+
+def add_constraints(pool, unlogged=False):
+    """
+    Switches the tables to LOGGED (if they were created UNLOGGED), then adds their primary keys, their foreign keys and
+    the indexes of index_management.py, in a single transaction rolled back if any of them fails.
+
+    Args:
+        pool (sqlalchemy.engine.Engine): engine returned by conn_to_psql
+        unlogged (bool): True if the tables were created as UNLOGGED
+    """
+
+    primary_key_queries = []
+    foreign_key_queries = []
+    for create_table_query in CREATE_TABLE_QUERIES.values():
+        _, primary_key_query, table_foreign_key_queries = split_constraints(create_table_query)
+        if primary_key_query is not None:
+            primary_key_queries.append(primary_key_query)
+        foreign_key_queries.extend(table_foreign_key_queries)
+
+    # Switched before the foreign keys are added, a logged table can't reference an unlogged one
+    set_logged_queries = [f"ALTER TABLE {table_name} SET LOGGED;" for table_name in CREATE_TABLE_QUERIES if unlogged]
+
+    queries = set_logged_queries + primary_key_queries + foreign_key_queries + list(create_index_queries().values())
+
+    start_time = time.perf_counter()
+    try:
+        with pool.begin() as connection:
+            for query in queries:
+                query_start_time = time.perf_counter()
+                connection.execute(sqlalchemy.text(query))
+                logging.info(f"{query} done in {time.perf_counter() - query_start_time:.1f}s")
+    except Exception:
+        logging.error("Adding the constraints failed, all rolled back: the tables are loaded but without constraints")
+        raise
+
+    with pool.begin() as connection:
+        for table_name in CREATE_TABLE_QUERIES:
+            connection.execute(sqlalchemy.text(f"ANALYZE {table_name};"))
+
+    logging.info(f"{len(queries)} constraints and indexes added in {time.perf_counter() - start_time:.1f}s")
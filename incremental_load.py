@@ -0,0 +1,233 @@
+""" This module loads the data incrementally into a database that already holds a previous load, instead of requiring an
+empty database. A 64-bit fingerprint is computed for each row of each table, keyed by its id, and compared with the
+fingerprints stored in PostgreSQL at the previous load: only the new or changed rows are sent, and they are applied
+with INSERT ... ON CONFLICT (id) DO UPDATE.
+
+Rows that disappeared from the csv files are not deleted from the database, except the job postings. The companies are
+keyed by a fingerprint of their columns (see SurrogateKeys), and the job postings, which have no id in the csv file, by
+the stored fingerprint of their row (see with_glassdoor_ids): a company or a posting keeps its id in a refreshed file
+whatever the rows inserted or removed before it.
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+import sqlalchemy
+from gcp_interactions import copy_df_with_cursor
+from sql_queries_vars import CREATE_TABLE_QUERIES, create_table_row_fingerprints
+from stage_metrics import stage
+from upload_orchestrator import create_schema_concurrently, run_in_dependency_order, table_dependencies
+
+
+FINGERPRINTS_TABLE = "row_fingerprints"
+
+
+def row_fingerprints(df):
+    """
+    Computes a 64-bit fingerprint of each row of a DataFrame, from the values of all its columns but its id, so the
+    fingerprint of a glassdoor row can be computed before its id is known (see with_glassdoor_ids).
+
+    Args:
+        df (pd.DataFrame): the DataFrame
+
+    Returns:
+        np.ndarray: int64 fingerprints (BIGINT in PostgreSQL), in the order of the rows
+    """
+
+    df = df.drop(columns="id", errors="ignore")
+    return pd.util.hash_pandas_object(df, index=False).to_numpy().view("int64")
+
+
+def stored_fingerprints(table_name, pool):
+    """Fingerprints of the rows of a table stored at the previous load, as an Int64 Series indexed by id"""
+
+    with pool.connect() as connection:
+        stored_rows = connection.execute(
+            sqlalchemy.text(f"SELECT id, fingerprint FROM {FINGERPRINTS_TABLE} WHERE table_name = :table_name"),
+            {"table_name": table_name},
+        ).fetchall()
+    return pd.Series(
+        [fingerprint for _, fingerprint in stored_rows], index=[row_id for row_id, _ in stored_rows], dtype="Int64"
+    )
+
+
+def with_glassdoor_ids(df_glassdoor, pool):
+    """
+    Sets the ids of the rows of the glassdoor table, which get them from a SERIAL column in a full load. The csv file has
+    no id of the job postings, the rows are matched with the ones of the previous load by their fingerprint (see
+    row_fingerprints): a row already loaded keeps the id stored with its fingerprint, and the new rows get ids after the
+    largest id of the table. An id always refers to the same posting, the rows inserted or removed before it in a
+    refreshed file don't shift it; a changed posting is a new row, its previous version is deleted with the postings
+    that disappeared from the file (see upsert_df_to_psql).
+
+    A table loaded in full has no stored fingerprints, its rows are matched by position (the SERIAL column numbered them
+    1 to n in upload order) at its first incremental load.
+
+    Args:
+        df_glassdoor (pd.DataFrame): cleaned glassdoor DataFrame, without id column
+        pool (sqlalchemy.engine.Engine): engine returned by conn_to_psql
+
+    Returns:
+        pd.DataFrame: the DataFrame with an id column first
+    """
+
+    if "id" in df_glassdoor.columns:
+        return df_glassdoor
+    df_glassdoor = df_glassdoor.reset_index(drop=True)
+
+    stored = stored_fingerprints("glassdoor", pool)
+    if stored.empty:
+        ids = np.arange(1, len(df_glassdoor) + 1)
+    else:
+        id_by_fingerprint = pd.Series(stored.index, index=stored.to_numpy())
+        id_by_fingerprint = id_by_fingerprint[~id_by_fingerprint.index.duplicated()]
+        ids = pd.Series(row_fingerprints(df_glassdoor)).map(id_by_fingerprint)
+        with pool.connect() as connection:
+            max_id = connection.execute(sqlalchemy.text("SELECT COALESCE(MAX(id), 0) FROM glassdoor")).scalar()
+        is_new = ids.isna()
+        ids[is_new] = max_id + np.arange(1, is_new.sum() + 1)
+        ids = ids.to_numpy(dtype="int64")
+
+    df_glassdoor.insert(0, "id", ids)
+    return df_glassdoor
+
+
+def create_schema_if_not_exists(pool, max_workers=None):
+    """Creates the tables that don't exist yet, as well as the table storing the row fingerprints"""
+
+    with pool.begin() as connection:
+        connection.execute(sqlalchemy.text(create_table_row_fingerprints))
+
+    create_table_queries = {
+        table_name: create_table_query.replace("CREATE TABLE ", "CREATE TABLE IF NOT EXISTS ", 1)
+        for table_name, create_table_query in CREATE_TABLE_QUERIES.items()
+    }
+    create_schema_concurrently(pool, create_table_queries, max_workers)
+
+
+def changed_rows(df, table_name, pool):
+    """
+    Selects the rows of a DataFrame that are new or changed since the previous load of its table.
+
+    Args:
+        df (pd.DataFrame): DataFrame with an id column
+        table_name (str): name of the table
+        pool (sqlalchemy.engine.Engine): engine returned by conn_to_psql
+
+    Returns:
+        tuple: the new or changed rows, their fingerprints, and the ids stored at the previous load that aren't in the
+        DataFrame anymore
+    """
+
+    fingerprints = pd.Series(row_fingerprints(df), index=df["id"].to_numpy())
+
+    stored = stored_fingerprints(table_name, pool)
+    is_changed = stored.reindex(fingerprints.index).ne(fingerprints).fillna(True).to_numpy(dtype=bool)
+    return df[is_changed], fingerprints[is_changed], stored.index.difference(fingerprints.index).tolist()
+
+
+def upsert_df_to_psql(df, table_name, pool, batch_size=50000):
+    """
+    Sends the new or changed rows of a DataFrame to its table: they are copied into a temporary staging table with COPY,
+    then inserted with INSERT ... ON CONFLICT (id) DO UPDATE, and their fingerprints are updated in the same
+    transaction. The rows of the glassdoor table that aren't in the DataFrame anymore are deleted, their ids are
+    fingerprints of postings that disappeared or changed (see with_glassdoor_ids).
+
+    Args:
+        df (pd.DataFrame): DataFrame with an id column
+        table_name (str): name of the table
+        pool (sqlalchemy.engine.Engine): engine returned by conn_to_psql
+        batch_size (int): number of rows sent per COPY statement
+
+    Returns:
+        int: number of rows inserted or updated
+    """
+
+    df_changed, fingerprints, removed_ids = changed_rows(df, table_name, pool)
+    removed_ids = removed_ids if table_name == "glassdoor" else []
+    logging.info(
+        f"{table_name}: {len(df_changed)} new or changed rows out of {len(df)}"
+        + (f", {len(removed_ids)} removed" if removed_ids else "")
+    )
+    if df_changed.empty and not removed_ids:
+        return 0
+
+    columns = ", ".join(df_changed.columns)
+    updated_columns = ", ".join(f"{column} = EXCLUDED.{column}" for column in df_changed.columns if column != "id")
+    df_fingerprints = pd.DataFrame({
+        "table_name": table_name,
+        "id": fingerprints.index,
+        "fingerprint": fingerprints.to_numpy(),
+    })
+
+    connection = pool.raw_connection()
+    try:
+        cursor = connection.cursor()
+
+        if removed_ids:
+            cursor.execute(f"DELETE FROM {table_name} WHERE id = ANY(%s)", (removed_ids,))
+            cursor.execute(
+                f"DELETE FROM {FINGERPRINTS_TABLE} WHERE table_name = %s AND id = ANY(%s)", (table_name, removed_ids)
+            )
+
+        cursor.execute(f"CREATE TEMPORARY TABLE staging_{table_name} (LIKE {table_name}) ON COMMIT DROP")
+        copy_df_with_cursor(cursor, df_changed, f"staging_{table_name}", batch_size)
+        cursor.execute(f"""
+            INSERT INTO {table_name} ({columns})
+            SELECT {columns} FROM staging_{table_name}
+            ON CONFLICT (id) DO UPDATE SET {updated_columns}
+        """)
+
+        cursor.execute(
+            f"CREATE TEMPORARY TABLE staging_{FINGERPRINTS_TABLE}_{table_name} (LIKE {FINGERPRINTS_TABLE}) ON COMMIT DROP"
+        )
+        copy_df_with_cursor(cursor, df_fingerprints, f"staging_{FINGERPRINTS_TABLE}_{table_name}", batch_size)
+        cursor.execute(f"""
+            INSERT INTO {FINGERPRINTS_TABLE} (table_name, id, fingerprint)
+            SELECT table_name, id, fingerprint FROM staging_{FINGERPRINTS_TABLE}_{table_name}
+            ON CONFLICT (table_name, id) DO UPDATE SET fingerprint = EXCLUDED.fingerprint
+        """)
+
+        # Explicit ids don't advance the SERIAL sequence of the glassdoor table
+        if table_name == "glassdoor":
+            cursor.execute("SELECT setval(pg_get_serial_sequence('glassdoor', 'id'), (SELECT max(id) FROM glassdoor))")
+
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close() # Returns the connection to the pool
+
+    return len(df_changed)
+
+
+def upsert_concurrently(pool, dataframes, max_workers=None):
+    """
+    Applies the new or changed rows of all the DataFrames to the database, following the foreign keys order like
+    upload_orchestrator.upload_concurrently.
+
+    Args:
+        pool (sqlalchemy.engine.Engine): engine returned by conn_to_psql
+        dataframes (dict): DataFrame of each table, keyed by table name
+        max_workers (int): maximum number of tables loaded at the same time
+
+    Returns:
+        dict: number of rows inserted or updated in each table
+    """
+
+    dataframes = dict(dataframes)
+    if "glassdoor" in dataframes:
+        dataframes["glassdoor"] = with_glassdoor_ids(dataframes["glassdoor"], pool)
+
+    dependencies = {
+        table_name: depends_on & set(dataframes)
+        for table_name, depends_on in table_dependencies().items() if table_name in dataframes
+    }
+
+    def upsert_table(table_name):
+        with stage(f"upsert {table_name}", rows_in=len(dataframes[table_name])) as metrics:
+            metrics["rows_out"] = upsert_df_to_psql(dataframes[table_name], table_name, pool)
+        return metrics["rows_out"]
+
+    return run_in_dependency_order(dependencies, upsert_table, "Incremental load of", max_workers)
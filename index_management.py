@@ -0,0 +1,175 @@
+""" This module generates and builds the indexes of the database: B-tree indexes for the analytical queries of the
+dashboard and for the joins through the foreign keys, which PostgreSQL doesn't index by itself, and GIN indexes on the
+search vectors of the tables with search_columns (see table_schemas.py and text_search.py). The indexes are built after
+the bulk load (building an index once is much faster than maintaining it row by row during the upload), and their size
+and their effect on the queries, with EXPLAIN ANALYZE, can be reported.
+"""
+
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import sqlalchemy
+from sql_queries_vars import CREATE_TABLE_QUERIES, DASHBOARD_QUERIES
+from table_schemas import SEARCH_VECTOR_COLUMN, TABLE_SCHEMAS
+from upload_orchestrator import parse_foreign_keys
+
+
+# Columns grouped, filtered or aggregated by the dashboard queries. An aggregated column placed after a grouped column
+# lets PostgreSQL answer from the index alone (index-only scan) instead of reading the wide rows of the table. The
+# queries grouping the postings by industry group them by company_id before joining glassdoor_companies.
+DASHBOARD_INDEXES = {
+    "glassdoor": [
+        ["header_jobtitle"],
+        ["map_location", "header_paymed"],
+        ["company_id", "header_paymed"],
+        ["header_paymed"],
+    ],
+}
+
+
+def index_definitions():
+    """
+    Lists the indexes to build: the dashboard indexes, one index per foreign key column, and one GIN index per search
+    vector column. A foreign key column leading a dashboard index of its table gets no index of its own, the joins use
+    the dashboard index.
+
+    Returns:
+        list: (index name, table name, list of columns, index method) tuples
+    """
+
+    indexes = {}
+    for table_name, indexed_columns in DASHBOARD_INDEXES.items():
+        for columns in indexed_columns:
+            indexes[(table_name, tuple(columns))] = "btree"
+    leading_columns = {(table_name, columns[0]) for table_name, columns in indexes}
+    for table_name, create_table_query in CREATE_TABLE_QUERIES.items():
+        for column, _, _ in parse_foreign_keys(create_table_query):
+            if (table_name, column.lower()) not in leading_columns:
+                indexes[(table_name, (column.lower(),))] = "btree"
+    for table_name, schema in TABLE_SCHEMAS.items():
+        if "search_columns" in schema:
+            indexes[(table_name, (SEARCH_VECTOR_COLUMN,))] = "gin"
+
+    return [
+        (f"idx_{table_name}_{'_'.join(columns)}", table_name, list(columns), method)
+        for (table_name, columns), method in indexes.items()
+    ]
+
+
+def create_index_queries():
+    """Returns the CREATE INDEX query of each index, keyed by index name"""
+
+    return {
+        index_name: f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} USING {method} ({', '.join(columns)});"
+        for index_name, table_name, columns, method in index_definitions()
+    }
+
+
+def create_indexes(pool, max_workers=4):
+    """
+    Builds the indexes, several at a time over separate connections, then updates the statistics of the indexed tables
+    so the query planner takes the new indexes into account.
+
+    Args:
+        pool (sqlalchemy.engine.Engine): engine returned by conn_to_psql
+        max_workers (int): maximum number of indexes built at the same time
+    """
+
+    def create_index(create_index_query):
+        with pool.begin() as connection:
+            connection.execute(sqlalchemy.text(create_index_query))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(create_index, create_index_queries().values()))
+
+    with pool.begin() as connection:
+        for table_name in sorted({table_name for _, table_name, _, _ in index_definitions()}):
+            connection.execute(sqlalchemy.text(f"ANALYZE {table_name};"))
+
+    logging.info(f"{len(index_definitions())} indexes built")
+
+
+def index_size_report(pool):
+    """
+    Reports the size of the indexes built by create_indexes.
+
+    Args:
+        pool (sqlalchemy.engine.Engine): engine returned by conn_to_psql
+
+    Returns:
+        pd.DataFrame: table name, index name and size in bytes of each index
+    """
+
+    index_names = [index_name for index_name, _, _, _ in index_definitions()]
+    with pool.connect() as connection:
+        rows = connection.execute(
+            sqlalchemy.text("""
+                SELECT relname AS table_name, indexrelname AS index_name, pg_relation_size(indexrelid) AS size_bytes
+                FROM pg_stat_user_indexes
+                ORDER BY relname, indexrelname;
+            """)
+        ).fetchall()
+
+    report = pd.DataFrame(rows, columns=["table_name", "index_name", "size_bytes"])
+    return report[report["index_name"].isin(index_names)].reset_index(drop=True)
+
+
+def explain_analyze(pool, queries=None):
+    """
+    Runs each query with EXPLAIN ANALYZE and reports its execution time and the scan used by the plan.
+
+    Args:
+        pool (sqlalchemy.engine.Engine): engine returned by conn_to_psql
+        queries (dict): queries keyed by name, DASHBOARD_QUERIES by default
+
+    Returns:
+        pd.DataFrame: query name, execution time in milliseconds and plan node types of each query
+    """
+
+    queries = DASHBOARD_QUERIES if queries is None else queries
+
+    report = []
+    with pool.connect() as connection:
+        for query_name, query in queries.items():
+            plan = connection.execute(
+                sqlalchemy.text(f"EXPLAIN (ANALYZE, FORMAT JSON) {query.strip().rstrip(';')}")
+            ).scalar()
+            plan = json.loads(plan) if isinstance(plan, str) else plan
+
+            node_types = []
+            nodes = [plan[0]["Plan"]]
+            while nodes:
+                node = nodes.pop()
+                node_types.append(node["Node Type"])
+                nodes.extend(node.get("Plans", []))
+
+            report.append({
+                "query_name": query_name,
+                "execution_time_ms": plan[0]["Execution Time"],
+                "scans": ", ".join(sorted({node_type for node_type in node_types if "Scan" in node_type})),
+            })
+
+    return pd.DataFrame(report)
+
+
+def create_indexes_with_report(pool, max_workers=4, queries=None):
+    """
+    Builds the indexes and compares the EXPLAIN ANALYZE of the queries before and after.
+
+    Args:
+        pool (sqlalchemy.engine.Engine): engine returned by conn_to_psql
+        max_workers (int): maximum number of indexes built at the same time
+        queries (dict): queries keyed by name, DASHBOARD_QUERIES by default
+
+    Returns:
+        pd.DataFrame: execution time and scans of each query before and after the indexes, and the speedup
+    """
+
+    before = explain_analyze(pool, queries)
+    create_indexes(pool, max_workers)
+    after = explain_analyze(pool, queries)
+
+    report = before.merge(after, on="query_name", suffixes=("_before", "_after"))
+    report["speedup"] = report["execution_time_ms_before"] / report["execution_time_ms_after"]
+    return report
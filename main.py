@@ -1,164 +1,317 @@
-""" The main script performs the following steps with an empty database:
+""" The main script performs the following steps with an empty database (or, with --incremental, a database holding a 
+previous load):
 - Configure logging settings
-- Process selected CSV files by cleaning and validating the data
+- Process selected CSV files by cleaning and validating the data, concurrently in a pool of processes (with --stream,
+the files are read, cleaned and uploaded chunk by chunk in the upload step instead, see streaming_pipeline.py, and with
+--overlap the next chunks are cleaned while the previous ones are uploaded, see async_pipeline.py)
 - Establish a connection to the GCP Cloud SQL PostgreSQL database
-- Create the database schema, including tables and data constraints, using a "SQL heavy" approach with stored SQL queries (instead of the more Pythonic SQLAlchemy API)
-- Upload data into each table
-- Execute sample queries to verify the proper insertion of data
+- Create the database schema, including tables and data constraints, using a "SQL heavy" approach with stored SQL queries (instead of the more Pythonic SQLAlchemy API), generated from the table schemas of table_schemas.py.
+The company columns of the job postings are stored once per company in glassdoor_companies, the glassdoor_with_companies
+view joins them back for the dashboard queries
+- Upload data into each table, independent tables being created and uploaded concurrently (with --fast-load, the tables
+are created without their constraints, optionally UNLOGGED, and all uploaded at the same time, see fast_load.py)
+- Build the indexes of the analytical queries, of the foreign keys and of the full-text search (see text_search.py), 
+once the data is loaded
+- Build or refresh the summary tables read by the Looker dashboard
+- Verify the proper insertion of data, by reconciling the row counts, missing values and checksums of each table with 
+the cleaned data, computed by PostgreSQL without reading the rows back
 - Close the database connection
+With --checkpoint, the progress of the run is recorded in a checkpoint manifest (logs/checkpoint.json) and a failed run
+can be continued with --resume: the stages and tables done are skipped, and a partially uploaded table continues after
+its last committed batch, see checkpoints.py. The tables are then uploaded in batches committed one at a time, without
+--checkpoint each table is uploaded in a single transaction.
+Each step is recorded as a stage (duration, CPU time, rows, memory, bytes uploaded) in logs/metrics.jsonl, see 
+stage_metrics.py.
 """
 
+import argparse
 import logging
-import pandas as pd
-from csv_files_data_processing import (
-    data_processing_glassdoor_csv, 
-    data_processing_glassdoor_overview_competitors_csv,
-    data_processing_glassdoor_benefits_comments_csv,
-    data_processing_glassdoor_benefits_highlights_csv,
-    data_processing_glassdoor_reviews_csv,
-    data_processing_glassdoor_salary_salaries_csv,
-    data_processing_glassdoor_wwfu_csv,
-    data_processing_glassdoor_wwfu_val_captions_csv,
-    data_processing_glassdoor_wwfu_val_photos_csv,
-    data_processing_glassdoor_wwfu_val_videos_csv
-    )
-from sql_queries_vars import (
-    create_table_glassdoor,
-    create_table_glassdoor_oc,
-    create_table_glassdoor_bc,
-    create_table_glassdoor_bh,
-    create_table_glassdoor_r,
-    create_table_glassdoor_ss,
-    create_table_glassdoor_w,
-    create_table_glassdoor_wvc,
-    create_table_glassdoor_wvp,
-    create_table_glassdoor_wvv,
-    query_verify_glassdoor,
-    query_verify_bh,
-    query_verify_r,
-    query_verify_w,
-    query_verify_wvv,
-    query_verify_wvc,
-)
+from csv_files_data_processing import memory_report
+from parallel_processing import run_data_processing_parallel
 from gcp_interactions import conn_to_psql, close_conn_to_sql
+from upload_orchestrator import create_schema_concurrently, upload_concurrently
+from fast_load import add_constraints, create_unconstrained_schema, unconstrained_create_table_queries
+from incremental_load import create_schema_if_not_exists, upsert_concurrently
+from index_management import create_indexes, create_indexes_with_report, index_size_report
+from summary_views import build_summary_views
+from reconciliation import reconcile
+from streaming_pipeline import DEFAULT_CHUNKSIZE, stream_concurrently
+from async_pipeline import run_overlapped_pipeline
+from checkpoints import CHECKPOINT_FILE, CheckpointManifest
+from stage_metrics import configure_stages, stage
 
-# Logging configuration
-logging.basicConfig(
-        # filename="logs/app.log",
-        handlers=[logging.FileHandler("logs/app.log"), logging.StreamHandler()],
-        format="%(asctime)s - %(levelname)s - %(message)s",
-        level=logging.INFO,
-    )
-logging.info("SCRIPT STARTED")
-
-
-# Data processing (filtering, cleaning, validating) of 11/15 csv files containing useful data, the other files are not used.
-logging.info("Data processing started")
-df_glassdoor = data_processing_glassdoor_csv()
-logging.info("glassdoor.csv processing done")
-df_oc = data_processing_glassdoor_overview_competitors_csv()
-logging.info("glassdoor_overview_competitors.csv processing done")
-df_bc = data_processing_glassdoor_benefits_comments_csv()
-logging.info("glassdoor_benefits_comments.csv processing done")
-df_bh = data_processing_glassdoor_benefits_highlights_csv()
-logging.info("glassdoor_benefits_highlights.csv processing done")
-df_r = data_processing_glassdoor_reviews_csv()
-logging.info("glassdoor_reviews.csv processing done")
-df_ss = data_processing_glassdoor_salary_salaries_csv()
-logging.info("glassdoor_salary_salaries.csv processing done")
-df_w = data_processing_glassdoor_wwfu_csv()
-logging.info("glassdoor_wwfu.csv processing done")
-df_wvc = data_processing_glassdoor_wwfu_val_captions_csv()
-logging.info("glassdoor_wwfu_val_captions.csv processing done")
-df_wvp = data_processing_glassdoor_wwfu_val_photos_csv()
-logging.info("glassdoor_wwfu_val_photos.csv processing done")
-df_wvv = data_processing_glassdoor_wwfu_val_videos_csv()
-logging.info("glassdoor_wwfu_val_videos.csv processing done")
-logging.info("All data processing done")
-
-
-# Connection to PostgreSQL database in GCP
-logging.info("Connecting to GCP database")
-pool, connector = conn_to_psql()
-logging.info("Connection established")
-
-
-# Variables containing the SQL queries are initialized in sql_queries_vars.py
-# The SQL queries are used to create the database schema, tables & data type constraints, executed in reverse order from 
-# outermost to innermost tables to allow foreign keys creation in one step
-logging.info("SQL Queries execution started, creating database schema...")
-pool.execute(create_table_glassdoor_wvv)  # Table referenced in glassdoor_w
-logging.info("Table glassdoor_wwfu_val_videos correctly created")
-pool.execute(create_table_glassdoor_wvp)  # Table referenced in glassdoor_w
-logging.info("Table glassdoor_wwfu_val_photos correctly created")
-pool.execute(create_table_glassdoor_wvc)  # Table referenced in glassdoor_w
-logging.info("Table glassdoor_wwfu_val_captions correctly created")
-pool.execute(create_table_glassdoor_w)    # Table referenced in glassdoor
-logging.info("Table glassdoor_wwfu correctly created")
-pool.execute(create_table_glassdoor_ss)   # Table referenced in glassdoor
-logging.info("Table glassdoor_salary_salaries correctly created")
-pool.execute(create_table_glassdoor_r)    # Table referenced in glassdoor
-logging.info("Table glassdoor_reviews correctly created")
-pool.execute(create_table_glassdoor_bh)   # Table referenced in glassdoor
-logging.info("Table glassdoor_benefits_highlights correctly created")
-pool.execute(create_table_glassdoor_bc)   # Table referenced in glassdoor
-logging.info("Table glassdoor_benefits_comments correctly created")
-pool.execute(create_table_glassdoor_oc)   # Table referenced in glassdoor
-logging.info("Table glassdoor_overview_competitors correctly created")
-pool.execute(create_table_glassdoor)      # Main table
-logging.info("Table glassdoor correctly created")
-logging.info("SQL Queries execution done, database schema created")
-
-
-# Upload data to the database tables in GCP, executed in reverse order from outermost to innermost tables to allow foreign 
-# keys creation in one step
-logging.info("Uploading data to database")
-df_wvc.to_sql("glassdoor_wwfu_val_captions", pool, if_exists="append", index=False)
-logging.info("glassdoor_wwfu_val_captions data correctly uploaded")
-df_wvp.to_sql("glassdoor_wwfu_val_photos", pool, if_exists="append", index=False)
-logging.info("glassdoor_wwfu_val_photos data correctly uploaded")
-df_wvv.to_sql("glassdoor_wwfu_val_videos", pool, if_exists="append", index=False)
-logging.info("glassdoor_wwfu_val_videos data correctly uploaded")
-df_w.to_sql("glassdoor_wwfu", pool, if_exists="append", index=False)
-logging.info("glassdoor_wwfu data correctly uploaded")
-df_ss.to_sql("glassdoor_salary_salaries", pool, if_exists="append", index=False)
-logging.info("glassdoor_salary_salaries data correctly uploaded")
-df_r.to_sql("glassdoor_reviews", pool, if_exists="append", index=False)
-logging.info("glassdoor_reviews data correctly uploaded")
-df_oc.to_sql("glassdoor_overview_competitors", pool, if_exists="append", index=False)
-logging.info("glassdoor_overview_competitors data correctly uploaded")
-df_bc.to_sql("glassdoor_benefits_comments", pool, if_exists="append", index=False)
-logging.info("glassdoor_benefits_comments data correctly uploaded")
-df_bh.to_sql("glassdoor_benefits_highlights", pool, if_exists="append", index=False)
-logging.info("glassdoor_benefits_highlights data correctly uploaded")
-df_glassdoor.to_sql("glassdoor", pool, if_exists="append", index=False)
-logging.info("glassdoor data correctly uploaded")
-logging.info("All data uploaded to database")
-
-# Verify that all data has been inserted
-result_glassdoor = pd.read_sql(query_verify_glassdoor, pool)
-result_bh = pd.read_sql(query_verify_bh, pool)
-result_r = pd.read_sql(query_verify_r, pool)
-result_w = pd.read_sql(query_verify_w, pool)
-result_wvv = pd.read_sql(query_verify_wvv, pool)
-result_wvc = pd.read_sql(query_verify_wvc, pool)
-
-if (not result_glassdoor.empty and not result_bh.empty and
-    not result_r.empty and not result_w.empty and
-    not result_wvv.empty and not result_wvc.empty):
-    logging.info("Data correctly inserted.")
-else :
-    logging.info("ERROR : problem with data insertion")
-print("SQL query result : \n")
-print(f"Result glassdoor:\n{result_glassdoor}\n\n\n\n")
-print(f"Result bh:\n{result_bh}\n\n\n\n")
-print(f"Result r:\n{result_r}\n\n\n\n")
-print(f"Result w:\n{result_w}\n\n\n\n")
-print(f"Result wvv:\n{result_wvv}\n\n\n\n")
-print(f"Result wvc:\n{result_wvc}\n\n\n\n")
-
-
-# Close the connection the GCP database
-logging.info("Closing connection to database...")
-close_conn_to_sql(pool, connector)
-logging.info("Connection to database closed.")
\ No newline at end of file
+
+def main():
+    """Runs the whole pipeline, from the csv files to the verification of the data inserted in the database"""
+
+    # Command line options
+    parser = argparse.ArgumentParser(description="Clean the Glassdoor dataset and upload it to the PostgreSQL database")
+    parser.add_argument(
+        "--processing-workers", type=int, default=None,
+        help="number of processes used to process the csv files (default: number of CPU cores, 1 to run sequentially), "
+             "with --overlap number of threads cleaning the chunks, which share the GIL and only overlap the I/O",
+    )
+    parser.add_argument(
+        "--upload-workers", type=int, default=8,
+        help="maximum number of tables created or uploaded at the same time, each over its own connection (default: 8)",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="process all the csv files again instead of reading the cleaned data cached by a previous run",
+    )
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="load into a database holding a previous load, only sending the new or changed rows",
+    )
+    parser.add_argument(
+        "--fast-load", action="store_true",
+        help="create the tables without constraints and add the constraints and indexes once the data is loaded",
+    )
+    parser.add_argument(
+        "--unlogged", action="store_true",
+        help="with --fast-load, create the tables UNLOGGED (no write-ahead log) until the constraints are added",
+    )
+    parser.add_argument(
+        "--stream", action="store_true",
+        help="read, clean and upload the csv files chunk by chunk, holding only a few chunks in memory",
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=DEFAULT_CHUNKSIZE,
+        help=f"with --stream, number of rows read, cleaned and uploaded at a time (default: {DEFAULT_CHUNKSIZE})",
+    )
+    parser.add_argument(
+        "--overlap", action="store_true",
+        help="with --stream, clean the next chunks while the previous ones upload, in --processing-workers threads "
+             "(the cleaning overlaps the upload I/O, it isn't parallelized)",
+    )
+    parser.add_argument(
+        "--checkpoint", action="store_true",
+        help="record the progress of the run in a checkpoint manifest, uploading the tables in batches committed one "
+             "at a time, so a failed run can be continued with --resume",
+    )
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="resume the previous run from its checkpoint manifest, skipping the stages and the rows already done "
+             "(implies --checkpoint)",
+    )
+    parser.add_argument(
+        "--checkpoint-file", default=CHECKPOINT_FILE,
+        help=f"checkpoint manifest recording the progress of the run (default: {CHECKPOINT_FILE})",
+    )
+    parser.add_argument(
+        "--explain-report", action="store_true",
+        help="run the dashboard queries with EXPLAIN ANALYZE before and after building the indexes, and print the report",
+    )
+    parser.add_argument(
+        "--metrics-file", default="logs/metrics.jsonl",
+        help="JSON Lines file receiving the metrics of each stage (default: logs/metrics.jsonl)",
+    )
+    parser.add_argument(
+        "--trace-memory", action="store_true",
+        help="record the peak memory allocated by Python in each stage with tracemalloc (slower)",
+    )
+    parser.add_argument(
+        "--profile-stage", action="append", default=[], metavar="STAGE",
+        help="profile a stage with cProfile (e.g. 'processing glassdoor'), can be repeated. Only the thread running "
+             "the stage is profiled before Python 3.12, not the work it hands to its threads (upload, ddl, indexes), "
+             "and a stage starting while another one is profiled isn't profiled",
+    )
+    args = parser.parse_args()
+    if args.fast_load and args.incremental:
+        parser.error("--fast-load only applies to a load into an empty database, not with --incremental")
+    if args.unlogged and not args.fast_load:
+        parser.error("--unlogged requires --fast-load")
+    if args.stream and args.incremental:
+        parser.error("--stream only applies to a load into an empty database, not with --incremental")
+    if args.overlap and not args.stream:
+        parser.error("--overlap requires --stream")
+
+    # Logging configuration
+    logging.basicConfig(
+            # filename="logs/app.log",
+            handlers=[logging.FileHandler("logs/app.log"), logging.StreamHandler()],
+            format="%(asctime)s - %(levelname)s - %(message)s",
+            level=logging.INFO,
+        )
+    logging.info("SCRIPT STARTED")
+    configure_stages(
+        metrics_file=args.metrics_file, trace_memory=args.trace_memory, profile_stages=args.profile_stage,
+    )
+
+    # Checkpoint manifest of the run, a run can only be resumed with the same csv files, cleaning code and load options
+    # Without --checkpoint nor --resume, no manifest is recorded and each table is uploaded in a single transaction
+    checkpoint_options = {"incremental": args.incremental, "fast_load": args.fast_load, "unlogged": args.unlogged}
+    checkpoint = None
+    if args.resume:
+        try:
+            checkpoint = CheckpointManifest.resume(args.checkpoint_file, checkpoint_options)
+        except ValueError as error:
+            parser.error(str(error))
+    elif args.checkpoint:
+        checkpoint = CheckpointManifest.start(args.checkpoint_file, checkpoint_options)
+    else:
+        CheckpointManifest.discard(args.checkpoint_file)
+
+    def stage_done(stage_name):
+        return checkpoint is not None and checkpoint.stage_done(stage_name)
+
+    def mark_stage_done(stage_name):
+        if checkpoint is not None:
+            checkpoint.mark_stage_done(stage_name)
+
+
+    # Data processing (filtering, cleaning, validating) of 11/15 csv files containing useful data, the other files are not used.
+    # The files are independent, they are processed concurrently in a pool of processes. The cleaned data is cached, 
+    # unchanged files are not processed again when the cleaning code didn't change either.
+    # In streaming mode, the files are processed chunk by chunk during the upload.
+    if not args.stream:
+        logging.info("Data processing started")
+        with stage("processing") as metrics:
+            dataframes = run_data_processing_parallel(max_workers=args.processing_workers, use_cache=not args.no_cache)
+            metrics["rows_out"] = sum(len(df) for df in dataframes.values())
+        logging.info("All data processing done")
+
+        # Memory held by the cleaned DataFrames until the upload, compared with the default pandas dtypes
+        dataframes_memory = memory_report(dataframes)
+        logging.info(f"Memory of the cleaned data:\n{dataframes_memory.to_string(index=False)}")
+
+
+    # Connection to PostgreSQL database in GCP (or to a local PostgreSQL database with DB_BACKEND=local and DATABASE_URL), 
+    # with one pooled connection per table uploaded at the same time
+    logging.info("Connecting to GCP database")
+    pool, connector = conn_to_psql(pool_size=args.upload_workers)
+    logging.info("Connection established")
+
+
+    # Variables containing the SQL queries are initialized in sql_queries_vars.py
+    # The SQL queries are used to create the database schema, tables & data type constraints. The order is derived from 
+    # the foreign keys: a table is created once the tables it references exist, the others are created concurrently.
+    # In incremental mode, the tables already created by a previous load are kept.
+    if stage_done("ddl"):
+        logging.info("Database schema already created, skipped")
+    else:
+        logging.info("SQL Queries execution started, creating database schema...")
+        with stage("ddl"):
+            if args.incremental:
+                create_schema_if_not_exists(pool, max_workers=args.upload_workers)
+            elif args.fast_load:
+                create_unconstrained_schema(pool, unlogged=args.unlogged, max_workers=args.upload_workers)
+            else:
+                create_schema_concurrently(pool, max_workers=args.upload_workers)
+        mark_stage_done("ddl")
+        logging.info("SQL Queries execution done, database schema created")
+
+
+    # Upload data to the database tables in GCP with PostgreSQL COPY, following the same foreign keys order: the 
+    # dimension tables are loaded in parallel, then glassdoor_wwfu, then the main glassdoor table. In incremental mode,
+    # only the rows that are new or changed since the previous load are sent, and upserted. In fast-load mode, the tables
+    # don't reference each other yet and are all loaded at the same time. In streaming mode, each table is read, cleaned
+    # and uploaded chunk by chunk, in the same order.
+    # With --resume, the tables already uploaded are skipped (in streaming mode, their figures for the verification are
+    # read from the manifest) and the partially uploaded ones continue after their last committed batch. The incremental
+    # upserts are run again, the rows already upserted are not sent again.
+    expected = None
+    create_table_queries = unconstrained_create_table_queries(args.unlogged) if args.fast_load else None
+    if stage_done("upload") and not args.stream:
+        logging.info("Data already uploaded, skipped")
+    else:
+        logging.info("Uploading data to database")
+        with stage("upload") as metrics:
+            if args.overlap:
+                expected = run_overlapped_pipeline(
+                    pool, chunksize=args.chunk_size, clean_workers=args.processing_workers,
+                    upload_workers=args.upload_workers, create_table_queries=create_table_queries,
+                    checkpoint=checkpoint,
+                )
+                metrics["rows_out"] = sum(table_expected[(None, "rows")] for table_expected in expected.values())
+            elif args.stream:
+                expected = stream_concurrently(
+                    pool, chunksize=args.chunk_size, max_workers=args.upload_workers,
+                    create_table_queries=create_table_queries, checkpoint=checkpoint,
+                )
+                metrics["rows_out"] = sum(table_expected[(None, "rows")] for table_expected in expected.values())
+            elif args.incremental:
+                metrics["rows_in"] = sum(len(df) for df in dataframes.values())
+                metrics["rows_out"] = sum(
+                    upsert_concurrently(pool, dataframes, max_workers=args.upload_workers).values()
+                )
+            else:
+                metrics["rows_in"] = sum(len(df) for df in dataframes.values())
+                metrics["bytes_uploaded"] = sum(
+                    upload_concurrently(
+                        pool, dataframes, max_workers=args.upload_workers, create_table_queries=create_table_queries,
+                        checkpoint=checkpoint,
+                    ).values()
+                )
+                metrics["rows_out"] = metrics["rows_in"]
+        mark_stage_done("upload")
+        logging.info("All data uploaded to database")
+
+
+    # In fast-load mode, the primary keys, foreign keys and indexes are added now, in a single transaction rolled back
+    # if the loaded data breaks a constraint. The indexes already exist when the next step runs.
+    if args.fast_load and stage_done("constraints"):
+        logging.info("Constraints already added, skipped")
+    elif args.fast_load:
+        logging.info("Adding constraints...")
+        with stage("constraints"):
+            add_constraints(pool, unlogged=args.unlogged)
+        mark_stage_done("constraints")
+        logging.info("Constraints added")
+
+
+    # Indexes of the columns used by the dashboard queries and of the foreign keys, built once the data is loaded, which
+    # is much faster than maintaining them during the upload
+    if stage_done("indexes"):
+        logging.info("Indexes already built, skipped")
+    else:
+        logging.info("Building indexes...")
+        with stage("indexes"):
+            if args.explain_report:
+                explain_report = create_indexes_with_report(pool, max_workers=args.upload_workers)
+                print(f"EXPLAIN ANALYZE before / after indexes:\n{explain_report}\n\n\n\n")
+            else:
+                create_indexes(pool, max_workers=args.upload_workers)
+        mark_stage_done("indexes")
+    index_sizes = index_size_report(pool)
+    logging.info(f"Indexes built, {index_sizes['size_bytes'].sum() / 1024 ** 2:.1f} MB:\n{index_sizes}")
+
+
+    # Summary tables of the dashboard, aggregated once here instead of at each dashboard query, created at the first load
+    # and refreshed at the following ones
+    if stage_done("summary views"):
+        logging.info("Summary tables already built, skipped")
+    else:
+        logging.info("Building summary tables of the dashboard...")
+        with stage("summary views") as metrics:
+            metrics["rows_out"] = sum(build_summary_views(pool, max_workers=args.upload_workers).values())
+        mark_stage_done("summary views")
+        logging.info("Summary tables built")
+
+    # Verify that all data has been inserted: the row count, the missing values and a checksum of each column of all the
+    # tables are computed by PostgreSQL (only the aggregates are sent back) and compared with the cleaned DataFrames, or
+    # with the figures added chunk by chunk in streaming mode
+    with stage("verify") as metrics:
+        if args.stream:
+            reconciliation = reconcile(pool, max_workers=args.upload_workers, expected=expected)
+        else:
+            reconciliation = reconcile(pool, dataframes, max_workers=args.upload_workers)
+        mismatches = reconciliation[~reconciliation["match"]]
+        metrics["rows_out"] = len(reconciliation)
+        metrics["mismatches"] = len(mismatches)
+
+    if mismatches.empty:
+        logging.info(f"Data correctly inserted, {len(reconciliation)} checks passed.")
+    else :
+        logging.error(f"ERROR : problem with data insertion, mismatches:\n{mismatches.to_string(index=False)}")
+
+
+    # Close the connection the GCP database
+    logging.info("Closing connection to database...")
+    close_conn_to_sql(pool, connector)
+    logging.info("Connection to database closed.")
+
+
+# The data processing runs in a pool of processes, which re-import this module on platforms that spawn processes
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+""" This module runs the data processing functions of csv_files_data_processing.py concurrently in a pool of processes.
+The files are independent from each other, so each one is read, cleaned and validated in its own process, and the
+cleaned DataFrames are handed back to the main process through Parquet files instead of being pickled. The dimension
+tables of a table (glassdoor_companies) are filled by the process of its file, from the same read.
+"""
+
+import logging
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+from csv_files_data_processing import DATA_PROCESSING_FUNCTIONS, process_csv_file
+from processing_cache import cached_parquet_paths, load_or_process
+from stage_metrics import STAGE_SETTINGS, configure_stages, emit_stage_metrics, stage
+
+
+def _process_table_to_parquet(table_name, handoff_dir, use_cache, stage_settings):
+    """
+    Runs the data processing function of a csv file inside a worker process and writes the DataFrame of each table it
+    fills as a Parquet file.
+
+    Args:
+        table_name (str): name of the table filled from the file, key of DATA_PROCESSING_FUNCTIONS
+        handoff_dir (str): directory where the Parquet files are written
+        use_cache (bool): if True, the Parquet files of the processing cache are handed off instead, the data is only
+            processed if the cache has no valid entry for the tables
+        stage_settings (dict): settings of the stages of the main process, see stage_metrics.STAGE_SETTINGS
+
+    Returns:
+        tuple: table name, Parquet file path of each table filled, keyed by table name, metrics of the processing stage
+        (emitted by the main process)
+    """
+
+    configure_stages(**stage_settings)
+    with stage(f"processing {table_name}", emit=False) as metrics:
+        if use_cache:
+            parquet_paths = cached_parquet_paths(table_name)
+        else:
+            parquet_paths = {}
+            for processed_table, df in process_csv_file(table_name).items():
+                parquet_paths[processed_table] = os.path.join(handoff_dir, f"{processed_table}.parquet")
+                df.to_parquet(parquet_paths[processed_table], index=False)
+
+    return table_name, parquet_paths, metrics
+
+
+def run_data_processing_parallel(max_workers=None, table_names=None, use_cache=False):
+    """
+    Processes the csv files concurrently, one process per file.
+
+    Each worker writes its cleaned DataFrames to Parquet files in a temporary directory, which are read back by the main
+    process: the Arrow columnar format is much cheaper to transfer than pickled object columns. With max_workers=1, the
+    functions are simply called one after another in the current process.
+
+    Args:
+        max_workers (int): number of worker processes, None to use all CPU cores (capped to the number of files)
+        table_names (list): tables whose csv files are processed, all the tables of DATA_PROCESSING_FUNCTIONS by
+            default. Their dimension tables are filled from the same files.
+        use_cache (bool): if True, the cleaned DataFrames are read from the Parquet cache of processing_cache.py when
+            the csv files and the cleaning code didn't change, and cached otherwise
+
+    Returns:
+        dict: cleaned DataFrame of each table, keyed by table name, each table followed by its dimension tables
+    """
+
+    table_names = list(DATA_PROCESSING_FUNCTIONS) if table_names is None else table_names
+    max_workers = min(max_workers or os.cpu_count() or 1, len(table_names))
+    process_table = load_or_process if use_cache else process_csv_file
+    processed = {}
+
+    def count_rows(table_name, metrics):
+        metrics["rows_out"] = sum(len(df) for df in processed[table_name].values())
+        metrics["duplicates_dropped"] = processed[table_name][table_name].attrs.get("duplicates_dropped")
+
+    def log_processed(table_name, metrics):
+        rows = ", ".join(f"{len(df)} rows in {filled_table}" for filled_table, df in processed[table_name].items())
+        logging.info(
+            f"{table_name} processing done: {rows} in {metrics['wall_seconds']:.1f}s"
+            + (f" (handoff {metrics['handoff_seconds']:.1f}s)" if "handoff_seconds" in metrics else "")
+            + f", {metrics['duplicates_dropped']} duplicates dropped"
+        )
+
+    if max_workers <= 1:
+        for table_name in table_names:
+            with stage(f"processing {table_name}") as metrics:
+                processed[table_name] = process_table(table_name)
+                count_rows(table_name, metrics)
+            log_processed(table_name, metrics)
+    else:
+        with tempfile.TemporaryDirectory(prefix="glassdoor_handoff_") as handoff_dir:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                futures = [
+                    executor.submit(_process_table_to_parquet, table_name, handoff_dir, use_cache, dict(STAGE_SETTINGS))
+                    for table_name in table_names
+                ]
+                for future in as_completed(futures):
+                    table_name, parquet_paths, metrics = future.result()
+                    start_time = time.perf_counter()
+                    # The duplicates dropped are stored in the Parquet file with the data
+                    processed[table_name] = {
+                        filled_table: pd.read_parquet(parquet_path, memory_map=True)
+                        for filled_table, parquet_path in parquet_paths.items()
+                    }
+                    metrics["handoff_seconds"] = time.perf_counter() - start_time
+                    count_rows(table_name, metrics)
+                    log_processed(table_name, metrics)
+                    emit_stage_metrics(metrics)
+
+    # Same order as requested, whatever the order of completion
+    return {
+        filled_table: df
+        for table_name in table_names for filled_table, df in processed[table_name].items()
+    }
@@ -0,0 +1,142 @@
+""" This module caches the cleaned DataFrames of the data processing functions as compressed Parquet files.
+A cache entry is keyed on the hash of the source csv file and on a version of the cleaning code (the source of
+csv_files_data_processing.py), so it is invalidated as soon as either the data or the cleaning rules change. On a hit,
+the csv file is not parsed at all and the Parquet file is read memory-mapped. Each table has its own entry, the tables
+filled by the same processing function (a table and its dimension tables) are cached together.
+"""
+
+import hashlib
+import inspect
+import json
+import logging
+import os
+import pandas as pd
+import csv_files_data_processing
+import table_schemas
+from table_schemas import TABLE_SCHEMAS
+from csv_files_data_processing import CSV_FILES, process_csv_file
+
+
+CACHE_DIR = "cache"
+
+
+def file_hash(file_path, cache_dir=CACHE_DIR):
+    """
+    Computes the SHA-256 hash of a file, reusing the hash stored at the previous run if the file size and modification
+    time didn't change, so an unchanged 900 MB file isn't hashed again at each run.
+
+    Args:
+        file_path (str): path of the file
+        cache_dir (str): directory where the hashes are memoized
+
+    Returns:
+        str: hexadecimal hash of the file content
+    """
+
+    # One memo file per csv file, so the workers processing different files never write the same memo file
+    memo_path = os.path.join(cache_dir, f"{os.path.basename(file_path)}.sha256.json")
+    file_stat = os.stat(file_path)
+    memo = {"path": os.path.abspath(file_path), "size": file_stat.st_size, "mtime_ns": file_stat.st_mtime_ns}
+
+    try:
+        with open(memo_path) as memo_file:
+            stored_memo = json.load(memo_file)
+        if {key: stored_memo.get(key) for key in memo} == memo:
+            return stored_memo["sha256"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for block in iter(lambda: file.read(8 * 1024 * 1024), b""):
+            sha256.update(block)
+    memo["sha256"] = sha256.hexdigest()
+
+    os.makedirs(cache_dir, exist_ok=True)
+    temp_path = f"{memo_path}.{os.getpid()}.tmp"
+    with open(temp_path, "w") as memo_file:
+        json.dump(memo, memo_file, indent=2)
+    os.replace(temp_path, memo_path)
+
+    return memo["sha256"]
+
+
+def cleaning_code_version():
+    """
+    Hash of the cleaning code (including the table schemas, which declare the casts) and of the pandas version, any
+    change of either invalidates the whole cache
+    """
+
+    source = inspect.getsource(csv_files_data_processing) + inspect.getsource(table_schemas)
+    return hashlib.sha256(f"{source}\npandas=={pd.__version__}".encode("UTF-8")).hexdigest()
+
+
+def cache_key(table_name, cache_dir=CACHE_DIR):
+    """Key of the cache entry of a table, derived from its csv file hash and from the cleaning code version"""
+
+    key_source = f"{file_hash(CSV_FILES[table_name], cache_dir)}\n{cleaning_code_version()}"
+    return hashlib.sha256(key_source.encode("UTF-8")).hexdigest()[:16]
+
+
+def cached_parquet_paths(table_name, cache_dir=CACHE_DIR):
+    """
+    Returns the paths of the cached Parquet files of the tables filled by the processing function of a csv file,
+    running the function and writing the cache entries first if one of them isn't valid. Outdated entries of the
+    tables are removed.
+
+    Args:
+        table_name (str): name of the table filled from the csv file, key of DATA_PROCESSING_FUNCTIONS
+        cache_dir (str): directory of the cache
+
+    Returns:
+        dict: path of the Parquet file holding the cleaned DataFrame of each table, keyed by table name
+    """
+
+    parquet_paths = {
+        cached_table: os.path.join(cache_dir, f"{cached_table}-{cache_key(cached_table, cache_dir)}.parquet")
+        for cached_table in cached_tables(table_name)
+    }
+    if all(os.path.exists(parquet_path) for parquet_path in parquet_paths.values()):
+        logging.info(f"{table_name}: cleaned data found in cache")
+        return parquet_paths
+
+    os.makedirs(cache_dir, exist_ok=True)
+    for cached_table, df in process_csv_file(table_name).items():
+        parquet_path = parquet_paths[cached_table]
+        # Written under a temporary name first, an interrupted run can't leave a truncated entry behind
+        temp_path = f"{parquet_path}.{os.getpid()}.tmp"
+        df.to_parquet(temp_path, index=False, compression="zstd")
+        os.replace(temp_path, parquet_path)
+
+        for file_name in os.listdir(cache_dir):
+            if file_name.startswith(f"{cached_table}-") and file_name.endswith(".parquet"):
+                outdated_path = os.path.join(cache_dir, file_name)
+                if outdated_path != parquet_path:
+                    os.remove(outdated_path)
+
+    return parquet_paths
+
+
+def cached_tables(table_name):
+    """Tables filled by the processing function of the csv file of a table: the table and its dimension tables"""
+
+    return [table_name, *TABLE_SCHEMAS[table_name].get("dimensions", {}).values()]
+
+
+def load_or_process(table_name, cache_dir=CACHE_DIR):
+    """
+    Returns the cleaned DataFrames of the tables filled from a csv file from the cache, or processes the csv file and
+    caches the result.
+
+    Args:
+        table_name (str): name of the table filled from the csv file, key of DATA_PROCESSING_FUNCTIONS
+        cache_dir (str): directory of the cache
+
+    Returns:
+        dict: cleaned DataFrame of the table, and of its dimension tables, keyed by table name
+    """
+
+    return {
+        cached_table: pd.read_parquet(parquet_path, memory_map=True)
+        for cached_table, parquet_path in cached_parquet_paths(table_name, cache_dir).items()
+    }
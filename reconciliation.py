@@ -0,0 +1,173 @@
+""" This module verifies a load by reconciling each table of the database with the DataFrame uploaded into it. The number
+of rows, the number of missing values of each column and a checksum of each column are computed by PostgreSQL in a
+single scan of the table, and compared with the same figures computed from the DataFrame: only the aggregates cross the
+connection, no row is read back. All the tables are checked at the same time, each one over its own connection.
+
+The checksum of a column depends on its SQL type (see table_schemas.py): sum of the integers, sum of the floats
+(compared with a relative tolerance, the additions aren't made in the same order), sum of the days since 1970-01-01 of
+the dates, number of true booleans, and sum of the lengths of the texts and of the enumerated values.
+
+In incremental mode, the rows of the previous loads that are no longer in the csv files are kept in the database, they
+are reported as mismatches. In streaming mode, the figures of the DataFrames are added chunk by chunk as they are
+uploaded.
+"""
+
+import logging
+import math
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import sqlalchemy
+from table_schemas import TABLE_SCHEMAS
+
+
+# Relative (and absolute, for sums close to 0) tolerance of the comparison of the float checksums
+FLOAT_TOLERANCE = 1e-6
+
+INTEGER_TYPES = ("SMALLINT", "INTEGER", "BIGINT", "SERIAL")
+FLOAT_TYPES = ("REAL", "FLOAT")
+
+
+def column_sql_types(table_name):
+    """SQL type of each column of a table, keyed by its (lowercase) name in the database"""
+
+    return {column.lower(): sql_type for column, sql_type in TABLE_SCHEMAS[table_name]["columns"].items()}
+
+
+def checksum_expression(column, sql_type):
+    """SQL expression of the checksum of a column, 0 for an empty table"""
+
+    if sql_type in INTEGER_TYPES:
+        checksum = f"SUM({column}::NUMERIC)"
+    elif sql_type in FLOAT_TYPES:
+        checksum = f"SUM({column}::FLOAT8)"
+    elif sql_type == "DATE":
+        checksum = f"SUM({column} - DATE '1970-01-01')"
+    elif sql_type == "BOOLEAN":
+        checksum = f"COUNT(*) FILTER (WHERE {column})"
+    else:
+        checksum = f"SUM(LENGTH({column}::TEXT))"
+    return f"COALESCE({checksum}, 0)"
+
+
+def local_checksum(values, sql_type):
+    """Checksum of a column of a DataFrame, computed like checksum_expression"""
+
+    values = values.dropna()
+    if sql_type == "BIGINT":
+        # The sum of 64-bit keys overflows int64, it is made with Python integers like PostgreSQL sums NUMERIC values
+        return sum(values.astype("int64").tolist())
+    if sql_type in INTEGER_TYPES:
+        return int(values.astype("int64").sum())
+    if sql_type in FLOAT_TYPES:
+        return float(values.astype("float64").sum())
+    if sql_type == "DATE":
+        return int((values - pd.Timestamp("1970-01-01")).dt.days.sum())
+    if sql_type == "BOOLEAN":
+        return int(values.astype(bool).sum())
+    return int(values.astype(str).str.len().sum())
+
+
+def expected_values(table_name, df):
+    """
+    Computes from a DataFrame the figures compared with the table: the row count, and the missing values and the
+    checksum of each column. They are sums, the figures of the chunks of a table can be added with add_expected_values
+    when the table is loaded chunk by chunk.
+
+    Args:
+        table_name (str): name of the table, key of TABLE_SCHEMAS
+        df (pd.DataFrame): DataFrame (or chunk) uploaded into the table
+
+    Returns:
+        dict: value of each figure, keyed by (column, check) with a None column for the row count
+    """
+
+    sql_types = column_sql_types(table_name)
+    expected = {(None, "rows"): len(df)}
+    for column in df.columns:
+        expected[(column, "nulls")] = int(df[column].isna().sum())
+        expected[(column, "checksum")] = local_checksum(df[column], sql_types[column])
+    return expected
+
+
+def add_expected_values(total, expected):
+    """Adds the figures of a chunk (see expected_values) to the figures of the previous chunks, returns the sum"""
+
+    return {key: total.get(key, 0) + value for key, value in expected.items()}
+
+
+def reconcile_table(pool, table_name, expected):
+    """
+    Compares the row count, the missing values and the checksum of each column of a table with those of the data
+    uploaded into it.
+
+    Args:
+        pool (sqlalchemy.engine.Engine): engine returned by conn_to_psql
+        table_name (str): name of the table, key of TABLE_SCHEMAS
+        expected (dict): figures of the data uploaded into the table, as returned by expected_values
+
+    Returns:
+        list: one dict per check, with the value computed from the data (expected) and by PostgreSQL (actual)
+    """
+
+    sql_types = column_sql_types(table_name)
+    checks = list(expected)
+
+    expressions = [
+        "COUNT(*)" if check == "rows"
+        else f"COUNT(*) - COUNT({column})" if check == "nulls"
+        else checksum_expression(column, sql_types[column])
+        for column, check in checks
+    ]
+    with pool.connect() as connection:
+        server_values = connection.execute(
+            sqlalchemy.text(f"SELECT {', '.join(expressions)} FROM {table_name};")
+        ).fetchone()
+
+    results = []
+    for (column, check), actual in zip(checks, server_values):
+        # Float sums are compared with a tolerance
+        if check == "checksum" and sql_types[column] in FLOAT_TYPES:
+            actual = float(actual)
+            match = math.isclose(expected[(column, check)], actual, rel_tol=FLOAT_TOLERANCE, abs_tol=FLOAT_TOLERANCE)
+        else:
+            actual = int(actual)
+            match = expected[(column, check)] == actual
+        results.append({
+            "table_name": table_name,
+            "column": column,
+            "check": check,
+            "expected": expected[(column, check)],
+            "actual": actual,
+            "match": match,
+        })
+
+    return results
+
+
+def reconcile(pool, dataframes=None, max_workers=8, expected=None):
+    """
+    Reconciles all the tables with their data, several tables at a time over separate connections.
+
+    Args:
+        pool (sqlalchemy.engine.Engine): engine returned by conn_to_psql, its pool must allow max_workers connections
+        dataframes (dict): DataFrame uploaded into each table, keyed by table name
+        max_workers (int): maximum number of tables checked at the same time
+        expected (dict): instead of the DataFrames, figures of the data uploaded into each table (see expected_values),
+            keyed by table name
+
+    Returns:
+        pd.DataFrame: table name, column (None for the row count), check, expected and actual values, and whether they
+        match, for each check
+    """
+
+    if expected is None:
+        expected = {table_name: expected_values(table_name, df) for table_name, df in dataframes.items()}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        table_results = executor.map(
+            lambda table_name: reconcile_table(pool, table_name, expected[table_name]), expected
+        )
+        report = pd.DataFrame([result for results in table_results for result in results])
+
+    logging.info(f"{len(report)} checks on {len(expected)} tables, {(~report['match']).sum()} mismatches")
+    return report
@@ -0,0 +1,158 @@
+""" This module instruments the steps (stages) of the pipeline: the stage context manager records the wall time, CPU time,
+rows in and out, memory and bytes uploaded of a stage, and emits them as one JSON object per stage, in the logs and
+optionally in a JSON Lines file. Any stage can also be profiled with cProfile, one at a time: before Python 3.12, a
+profiler only records the thread that enabled it, so the work a stage hands to a pool of threads (the uploads, the DDL
+and the index builds) isn't recorded, and from Python 3.12 a second profiler can't be enabled while one is active. A
+stage starting while another one is profiled isn't profiled, which is logged.
+
+The settings are shared by all the stages of the process, see configure_stages.
+"""
+
+import cProfile
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError: # Not available on Windows, the RSS and children CPU time aren't recorded there
+    resource = None
+
+
+STAGE_SETTINGS = {
+    "metrics_file": None, # JSON Lines file receiving the metrics of each stage, in addition to the logs
+    "trace_memory": False, # Peak memory allocated by Python with tracemalloc, which slows the stages down
+    "profile_stages": set(), # Names of the stages profiled with cProfile
+    "profile_dir": "logs/profiles", # Directory of the cProfile dumps, one .prof file per profiled stage
+}
+
+# Characters of the stage names replaced in the names of the cProfile dumps
+PROFILE_NAME_PATTERN = re.compile(r"[^\w.-]+")
+
+_metrics_file_lock = threading.Lock()
+
+# Held by the stage being profiled, cProfile only supports one active profiler at a time
+_profiling_lock = threading.Lock()
+
+
+def configure_stages(**settings):
+    """
+    Updates the settings of the stages (see STAGE_SETTINGS).
+
+    Args:
+        **settings: metrics_file, trace_memory, profile_stages and/or profile_dir
+    """
+
+    unknown_settings = set(settings) - set(STAGE_SETTINGS)
+    if unknown_settings:
+        raise ValueError(f"Unknown stage settings: {sorted(unknown_settings)}")
+    if "profile_stages" in settings:
+        settings["profile_stages"] = set(settings["profile_stages"] or ())
+    STAGE_SETTINGS.update(settings)
+
+    if STAGE_SETTINGS["trace_memory"] and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def max_rss_mb():
+    """Highest resident memory of the process since it started, in MB"""
+
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes on Linux
+    return max_rss / 1024 ** 2 if sys.platform == "darwin" else max_rss / 1024
+
+
+def children_cpu_seconds():
+    """CPU time of the terminated child processes (the worker processes of the process pools)"""
+
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def emit_stage_metrics(metrics):
+    """Logs the metrics of a stage as JSON, and appends them to the metrics file if one is set"""
+
+    line = json.dumps(metrics, default=str)
+    logging.info(f"Stage metrics: {line}")
+
+    if STAGE_SETTINGS["metrics_file"]:
+        with _metrics_file_lock:
+            os.makedirs(os.path.dirname(STAGE_SETTINGS["metrics_file"]) or ".", exist_ok=True)
+            with open(STAGE_SETTINGS["metrics_file"], "a") as metrics_file:
+                metrics_file.write(line + "\n")
+
+
+@contextmanager
+def stage(name, emit=True, **fields):
+    """
+    Records the metrics of the block it wraps. The block can add its own figures to the yielded dict, like rows_out or
+    bytes_uploaded.
+
+    The CPU time of the process covers all its threads, so it includes the work of the stages running at the same time;
+    thread_cpu_seconds only covers the thread running the block. The peak tracemalloc memory is also shared by the
+    stages running at the same time, and max_rss_mb is the highest RSS of the process so far.
+
+    Args:
+        name (str): name of the stage, also used to select the stages to profile
+        emit (bool): if False, the metrics are only recorded in the yielded dict, for instance to be sent back by a
+            worker process and emitted by the main process with emit_stage_metrics
+        **fields: additional figures known before the stage, like rows_in
+
+    Yields:
+        dict: the metrics of the stage, completed when the block exits
+    """
+
+    metrics = {"stage": name, **fields}
+    profiler = cProfile.Profile() if name in STAGE_SETTINGS["profile_stages"] else None
+    if STAGE_SETTINGS["trace_memory"] and tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+
+    start_wall_time = time.perf_counter()
+    start_cpu_time = time.process_time()
+    start_thread_cpu_time = time.thread_time()
+    start_children_cpu_time = children_cpu_seconds()
+    if profiler is not None and not _profiling_lock.acquire(blocking=False):
+        logging.warning(f"Stage {name} not profiled, another stage is being profiled")
+        profiler = None
+    if profiler is not None:
+        try:
+            profiler.enable()
+        except ValueError as error: # Another profiling tool is active (Python 3.12+)
+            logging.warning(f"Stage {name} not profiled: {error}")
+            _profiling_lock.release()
+            profiler = None
+
+    metrics["status"] = "failed"
+    try:
+        yield metrics
+        metrics["status"] = "ok"
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            _profiling_lock.release()
+            os.makedirs(STAGE_SETTINGS["profile_dir"], exist_ok=True)
+            profile_path = os.path.join(STAGE_SETTINGS["profile_dir"], f"{PROFILE_NAME_PATTERN.sub('_', name)}.prof")
+            profiler.dump_stats(profile_path)
+            metrics["profile_file"] = profile_path
+
+        metrics["wall_seconds"] = time.perf_counter() - start_wall_time
+        metrics["cpu_seconds"] = time.process_time() - start_cpu_time
+        metrics["thread_cpu_seconds"] = time.thread_time() - start_thread_cpu_time
+        metrics["children_cpu_seconds"] = children_cpu_seconds() - start_children_cpu_time
+        metrics["max_rss_mb"] = max_rss_mb()
+        if STAGE_SETTINGS["trace_memory"] and tracemalloc.is_tracing():
+            metrics["peak_traced_memory_mb"] = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+
+        if emit:
+            emit_stage_metrics(metrics)
+
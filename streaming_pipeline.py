@@ -0,0 +1,92 @@
+""" This module implements the streaming mode of the pipeline: instead of cleaning all the csv files into DataFrames
+before uploading them, each table is read, cleaned and uploaded chunk by chunk, a chunk being uploaded as soon as it is
+cleaned and dropped before the next one is read (see data_processing_chunks). The memory used by the run is bounded by
+a few chunks (one per table streamed at the same time) and the fingerprints of the rows already seen, whatever the size
+of the files, and the upload starts with the first chunk instead of after the slowest file.
+
+The tables are streamed following their foreign keys, like upload_concurrently: a table is streamed once all the tables
+it references are loaded, independent tables are streamed at the same time, each one over its own connection. Each chunk
+is committed on its own, a failure leaves the chunks already uploaded in the table.
+
+The figures compared with the tables by the verification (see reconciliation.py) are added chunk by chunk, the
+DataFrames aren't kept for it.
+
+With a checkpoint manifest (see checkpoints.py), the number of rows uploaded in each table is recorded after each chunk.
+A resumed run reads and cleans a partially uploaded table from its beginning (the duplicates are dropped against the
+previous chunks), but only uploads the rows after those already in the table.
+"""
+
+from csv_files_data_processing import data_processing_chunks
+from gcp_interactions import copy_df_to_psql
+from reconciliation import add_expected_values, expected_values
+from stage_metrics import stage
+from upload_orchestrator import run_in_dependency_order, table_dependencies
+
+
+# Number of rows of the csv files read, cleaned and uploaded at a time
+DEFAULT_CHUNKSIZE = 20000
+
+
+def stream_table(pool, table_name, chunksize=DEFAULT_CHUNKSIZE, text_workers=1, checkpoint=None):
+    """
+    Reads, cleans and uploads a table chunk by chunk.
+
+    Args:
+        pool (sqlalchemy.engine.Engine): engine returned by conn_to_psql
+        table_name (str): name of the table, key of CSV_FILES
+        chunksize (int): number of rows read from the csv file at a time
+        text_workers (int): processes used to clean the text columns
+        checkpoint (CheckpointManifest): manifest recording the progress of the upload, None to not record it
+
+    Returns:
+        dict: figures of all the rows of the table to verify it, as returned by expected_values
+    """
+
+    start_row = 0 if checkpoint is None else checkpoint.resume_table(pool, table_name, require_expected=True)
+    if start_row is None:
+        return checkpoint.table_expected(table_name)
+
+    # Number of rows of the table cleaned so far, uploaded by this run or the run resumed
+    position = 0
+    expected = {(None, "rows"): 0}
+    with stage(f"stream {table_name}", rows_out=0, bytes_uploaded=0, chunks=0) as metrics:
+        for chunk in data_processing_chunks(table_name, chunksize, text_workers):
+            pending_rows = chunk.iloc[max(0, start_row - position):]
+            if len(pending_rows):
+                metrics["bytes_uploaded"] += copy_df_to_psql(pending_rows, table_name, pool)
+                metrics["rows_out"] += len(pending_rows)
+                metrics["chunks"] += 1
+            position += len(chunk)
+            expected = add_expected_values(expected, expected_values(table_name, chunk))
+            if checkpoint is not None:
+                checkpoint.record_upload(table_name, position)
+
+    if checkpoint is not None:
+        checkpoint.record_upload(table_name, position, done=True, expected=expected)
+    return expected
+
+
+def stream_concurrently(pool, chunksize=DEFAULT_CHUNKSIZE, max_workers=None, create_table_queries=None, text_workers=1,
+                        checkpoint=None):
+    """
+    Streams all the tables, a table being streamed as soon as all the tables it references are loaded.
+
+    Args:
+        pool (sqlalchemy.engine.Engine): engine returned by conn_to_psql, its pool must allow max_workers connections
+        chunksize (int): number of rows read from the csv files at a time
+        max_workers (int): maximum number of tables streamed at the same time, and so of chunks held in memory
+        create_table_queries (dict): CREATE TABLE queries the tables were created with, CREATE_TABLE_QUERIES by default.
+            Tables created without foreign keys (see fast_load.py) are all streamed at the same time.
+        text_workers (int): processes used to clean the text columns of each table
+        checkpoint (CheckpointManifest): manifest recording the progress of the upload, None to not record it
+
+    Returns:
+        dict: figures of the uploaded rows of each table, keyed by table name, to be passed to reconcile
+    """
+
+    return run_in_dependency_order(
+        table_dependencies(create_table_queries),
+        lambda table_name: stream_table(pool, table_name, chunksize, text_workers, checkpoint),
+        "Streaming of",
+        max_workers,
+    )
@@ -0,0 +1,48 @@
+""" This module builds and refreshes the summary tables of the Looker dashboard, materialized views aggregating the
+glassdoor table whose queries are stored in sql_queries_vars.py. They are created after the first load, and refreshed
+after the following (incremental) loads with REFRESH MATERIALIZED VIEW CONCURRENTLY, so the dashboard keeps reading the
+previous aggregates while they are computed again.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import sqlalchemy
+from sql_queries_vars import SUMMARY_VIEW_QUERIES
+
+
+def existing_summary_views(pool):
+    """Returns the names of the summary views that already exist in the database"""
+
+    with pool.connect() as connection:
+        rows = connection.execute(sqlalchemy.text("SELECT matviewname FROM pg_matviews;")).fetchall()
+    return {view_name for view_name, in rows} & set(SUMMARY_VIEW_QUERIES)
+
+
+def build_summary_views(pool, max_workers=4):
+    """
+    Creates the summary views that don't exist yet and refreshes the others, several views at a time.
+
+    Args:
+        pool (sqlalchemy.engine.Engine): engine returned by conn_to_psql
+        max_workers (int): maximum number of views built at the same time
+
+    Returns:
+        dict: number of rows of each view, keyed by view name
+    """
+
+    existing_views = existing_summary_views(pool)
+
+    def build_view(view_name):
+        with pool.begin() as connection:
+            if view_name in existing_views:
+                connection.execute(sqlalchemy.text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view_name};"))
+            else:
+                connection.execute(sqlalchemy.text(SUMMARY_VIEW_QUERIES[view_name]))
+            return connection.execute(sqlalchemy.text(f"SELECT COUNT(*) FROM {view_name};")).scalar()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        view_rows = dict(zip(SUMMARY_VIEW_QUERIES, executor.map(build_view, SUMMARY_VIEW_QUERIES)))
+
+    for view_name, row_count in view_rows.items():
+        logging.info(f"{view_name} {'refreshed' if view_name in existing_views else 'created'}: {row_count} rows")
+    return view_rows
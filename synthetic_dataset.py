@@ -0,0 +1,306 @@
+""" This module generates a synthetic dataset shaped like the Glassdoor Kaggle dataset, so the pipeline can be run and
+benchmarked at any scale without the real 1.47 GB dump. The ten csv files used by the pipeline are written with the
+columns of the real files (dotted names, read back by csv_files_data_processing.py), foreign key ids consistent between
+the files, and the dirty values the cleaning rules are written for: negative ratings, zero coordinates, outlier salaries
+and years, HTML text, missing values and duplicates.
+
+The output is reproducible for a given seed.
+"""
+
+import argparse
+import math
+import os
+import numpy as np
+import pandas as pd
+from csv_files_data_processing import CSV_FILES
+from table_schemas import ENUM_TYPES, TABLE_SCHEMAS, csv_columns
+
+
+# Number of distinct ids of each table, relative to the number of rows of the glassdoor table. The rows of the other
+# tables are the values of a list, there are 1 to 3 rows (with the same id and increasing index) per id.
+ID_RATIOS = {
+    "glassdoor_overview_competitors": 0.3,
+    "glassdoor_benefits_comments": 0.3,
+    "glassdoor_benefits_highlights": 0.3,
+    "glassdoor_reviews": 0.3,
+    "glassdoor_salary_salaries": 0.3,
+    "glassdoor_wwfu": 0.2,
+    "glassdoor_wwfu_val_captions": 0.1,
+    "glassdoor_wwfu_val_photos": 0.1,
+    "glassdoor_wwfu_val_videos": 0.1,
+}
+
+JOB_TITLES = [
+    "Data Scientist", "Senior Data Scientist", "Data Analyst", "Data Engineer", "Machine Learning Engineer",
+    "Business Intelligence Analyst", "Analytics Manager", "Research Scientist", "Statistician", "Data Architect",
+]
+# (location, country code, latitude, longitude)
+LOCATIONS = [
+    ("London", "GB", 51.5074, -0.1278),
+    ("Manchester", "GB", 53.4808, -2.2426),
+    ("Paris", "FR", 48.8566, 2.3522),
+    ("Berlin", "DE", 52.5200, 13.4050),
+    ("New York, NY", "US", 40.7128, -74.0060),
+    ("San Francisco, CA", "US", 37.7749, -122.4194),
+    ("Toronto, ON", "CA", 43.6532, -79.3832),
+    ("Bangalore", "IN", 12.9716, 77.5946),
+    ("Singapore", "SG", 1.3521, 103.8198),
+    ("Sydney", "AU", -33.8688, 151.2093),
+]
+INDUSTRIES = [
+    "Internet", "Computer Hardware & Software", "Banks & Credit Unions", "Consulting", "Biotech & Pharmaceuticals",
+    "Insurance Carriers", "Advertising & Marketing", "Energy", "Health Care Services & Hospitals", "Colleges & Universities",
+]
+SECTORS = ["Information Technology", "Finance", "Business Services", "Health Care", "Education", "Oil, Gas, Energy & Utilities"]
+REVENUES = [
+    "Less than $1 million (USD)", "$1 to $5 million (USD)", "$10 to $25 million (USD)", "$100 to $500 million (USD)",
+    "$1 to $2 billion (USD)", "$10+ billion (USD)", "Unknown / Non-Applicable",
+]
+SIZES = [
+    "1 to 50 Employees", "51 to 200 Employees", "201 to 500 Employees", "501 to 1000 Employees",
+    "1001 to 5000 Employees", "5001 to 10000 Employees", "10000+ Employees",
+]
+COMPANY_TYPES = ["Company - Private", "Company - Public", "Government", "Nonprofit Organization", "Subsidiary or Business Segment"]
+JOB_SOURCES = ["glassdoor", "indeed", "linkedin", "company website"]
+WORDS = [
+    "data", "team", "models", "python", "sql", "experience", "business", "insights", "analysis", "machine", "learning",
+    "cloud", "pipelines", "customers", "statistics", "product", "research", "skills", "dashboards", "stakeholders",
+]
+HTML_TAGS = ["p", "li", "b", "div", "span"]
+HTML_ENTITIES = ["&amp;", "&nbsp;", "&#39;", "&quot;"]
+
+
+def raw_column_names(table_name):
+    """
+    Returns the columns of a table as named in its csv file: the columns of its schema (see table_schemas.py) read
+    from the file, with dots instead of underscores.
+
+    Args:
+        table_name (str): name of the table
+
+    Returns:
+        list: (csv column name, SQL type) tuples
+    """
+
+    return [
+        (column.replace("_", "."), TABLE_SCHEMAS[table_name]["columns"][column]) for column in csv_columns(table_name)
+    ]
+
+
+def html_texts(rng, n, min_words=20, max_words=120):
+    """Generates n HTML texts with tags and entities, like the job descriptions and the wwfu bodies"""
+
+    word_counts = rng.integers(min_words, max_words + 1, n)
+    words = rng.choice(WORDS, word_counts.sum())
+    tags = rng.choice(HTML_TAGS, n)
+    entities = rng.choice(HTML_ENTITIES, n)
+
+    texts = []
+    start = 0
+    for word_count, tag, entity in zip(word_counts, tags, entities):
+        sentence = " ".join(words[start:start + word_count])
+        start += word_count
+        texts.append(f"<{tag}>{sentence[:len(sentence) // 2]} {entity} <b>{sentence[len(sentence) // 2:]}</b>!</{tag}>")
+    return texts
+
+
+def with_missing(rng, values, ratio):
+    """Replaces a ratio of the values with missing values"""
+
+    values = pd.Series(values)
+    return values.mask(rng.random(len(values)) < ratio)
+
+
+def nullable_ints(values):
+    """Integers written without decimals in the csv file, missing values included"""
+
+    return pd.array(values.round(), dtype="Int64") if isinstance(values, pd.Series) else pd.array(values, dtype="Int64")
+
+
+def generate_glassdoor(rng, n_rows, table_ids, extra_columns=0):
+    """
+    Generates the rows of the main glassdoor.csv file.
+
+    Args:
+        rng (np.random.Generator): random generator
+        n_rows (int): number of distinct rows, about 2% of duplicated rows are added
+        table_ids (dict): ids of each referenced table, keyed by table name
+        extra_columns (int): number of additional unused columns, the real file has 163 columns
+
+    Returns:
+        pd.DataFrame: the rows, with the csv column names
+    """
+
+    location_index = rng.integers(0, len(LOCATIONS), n_rows)
+    locations = [LOCATIONS[i] for i in location_index]
+    n_companies = max(n_rows // 20, 1)
+    company_index = rng.integers(0, n_companies, n_rows)
+    pay_med = rng.lognormal(math.log(55000), 0.4, n_rows)
+    # Hourly or monthly pays reported as yearly ones, removed by the cleaning rules
+    pay_med = np.where(rng.random(n_rows) < 0.02, rng.uniform(10, 5000, n_rows), pay_med)
+
+    def company_values(values):
+        return np.asarray(values, dtype=object)[company_index % len(values)]
+
+    def per_company(values):
+        # The company columns have the same values in all the postings of a company
+        return pd.Series(values).iloc[company_index].reset_index(drop=True)
+
+    def ratings(low, high, decimals=1, n=n_rows):
+        # -1 is used by the dataset for missing ratings
+        values = np.round(rng.uniform(low, high, n), decimals)
+        return with_missing(rng, np.where(rng.random(n) < 0.1, -1, values), 0.05)
+
+    def foreign_keys(table_name):
+        return nullable_ints(with_missing(rng, rng.choice(table_ids[table_name], n_rows), 0.2))
+
+    df = pd.DataFrame({
+        "header.easyApply": rng.random(n_rows) < 0.3,
+        "header.employerName": [f"Company {i}" for i in company_index],
+        "header.jobTitle": rng.choice(JOB_TITLES, n_rows),
+        "header.posted": pd.to_datetime("2019-06-01") - pd.to_timedelta(rng.integers(0, 60, n_rows), unit="D"),
+        "header.rating": ratings(1, 5),
+        "header.urgencyLabel": with_missing(rng, ["2019 Glassdoor Best Place to Work"] * n_rows, 0.97),
+        "header.payHigh": nullable_ints(with_missing(rng, pay_med * 1.3, 0.4)),
+        "header.payMed": nullable_ints(with_missing(rng, pay_med, 0.4)),
+        "header.payLow": nullable_ints(with_missing(rng, pay_med * 0.75, 0.4)),
+        "job.description": html_texts(rng, n_rows),
+        "job.jobSource": rng.choice(JOB_SOURCES, n_rows),
+        "map.country": [location[1] for location in locations],
+        # 0 is used by the dataset for missing coordinates
+        "map.lat": np.where(rng.random(n_rows) < 0.05, 0, [location[2] for location in locations]),
+        "map.lng": np.where(rng.random(n_rows) < 0.05, 0, [location[3] for location in locations]),
+        "map.location": with_missing(rng, [location[0] for location in locations], 0.03),
+        # 0 is used by the dataset for missing years
+        "overview.foundedYear": per_company(nullable_ints(
+            with_missing(rng, np.where(rng.random(n_companies) < 0.1, 0, rng.integers(1850, 2020, n_companies)), 0.1)
+        )),
+        "overview.hq": company_values([location[0] for location in LOCATIONS]),
+        "overview.industry": per_company(with_missing(rng, np.resize(INDUSTRIES, n_companies), 0.1)),
+        "overview.revenue": company_values(REVENUES),
+        "overview.sector": company_values(SECTORS),
+        "overview.size": company_values(SIZES),
+        "overview.stock": per_company(with_missing(rng, [f"STK{i}" for i in range(n_companies)], 0.7)),
+        "overview.type": company_values(COMPANY_TYPES),
+        "overview.description": [f"Company {i} builds data products." for i in company_index],
+        "overview.mission": per_company(with_missing(rng, [f"Company {i} mission." for i in range(n_companies)], 0.5)),
+        "overview.competitors": foreign_keys("glassdoor_overview_competitors"),
+        "rating.ceo.name": [f"CEO {i}" for i in company_index],
+        "rating.ceoApproval": per_company(ratings(0, 1, 2, n_companies)),
+        "rating.recommendToFriend": per_company(ratings(0, 1, 2, n_companies)),
+        "rating.starRating": per_company(ratings(1, 5, n=n_companies)),
+        "benefits.comments": foreign_keys("glassdoor_benefits_comments"),
+        "benefits.highlights": foreign_keys("glassdoor_benefits_highlights"),
+        "reviews": foreign_keys("glassdoor_reviews"),
+        "salary.salaries": foreign_keys("glassdoor_salary_salaries"),
+        "wwfu": foreign_keys("glassdoor_wwfu"),
+    })
+    df["header.posted"] = df["header.posted"].dt.strftime("%Y-%m-%d")
+
+    for i in range(extra_columns):
+        df[f"extra.column{i}"] = rng.integers(0, 1000, n_rows)
+
+    # Scraped twice
+    duplicates = df.sample(n=n_rows // 50, random_state=rng)
+    return pd.concat([df, duplicates], ignore_index=True).sample(frac=1, random_state=rng)
+
+
+def generate_list_table(rng, table_name, ids, table_ids):
+    """
+    Generates the rows of the csv file of a table other than glassdoor: 1 to 3 rows per id, the values of the columns
+    being generated from their SQL type.
+
+    Args:
+        rng (np.random.Generator): random generator
+        table_name (str): name of the table
+        ids (np.ndarray): ids of the table
+        table_ids (dict): ids of each referenced table, keyed by table name
+
+    Returns:
+        pd.DataFrame: the rows, with the csv column names
+    """
+
+    rows_per_id = rng.integers(1, 4, len(ids))
+    n_rows = rows_per_id.sum()
+    row_ids = np.repeat(ids, rows_per_id)
+    referenced_tables = TABLE_SCHEMAS[table_name].get("foreign_keys", {})
+
+    df = pd.DataFrame(index=range(n_rows))
+    for column, sql_type in raw_column_names(table_name):
+        underscored_column = column.replace(".", "_")
+        if column == "id":
+            df[column] = row_ids
+        elif column == "index":
+            df[column] = np.arange(n_rows) - np.repeat(np.cumsum(rows_per_id) - rows_per_id, rows_per_id)
+        elif underscored_column in referenced_tables:
+            referenced_ids = table_ids[referenced_tables[underscored_column]]
+            df[column] = nullable_ints(with_missing(rng, rng.choice(referenced_ids, n_rows), 0.3))
+        elif underscored_column == "wwfu_val_body":
+            df[column] = html_texts(rng, n_rows)
+        elif sql_type in ("SMALLINT", "INTEGER", "BIGINT"):
+            # Written with decimals in the csv file because of the missing values, like in the real files
+            df[column] = with_missing(rng, rng.integers(0, 6, n_rows), 0.05)
+        elif sql_type in ("REAL", "FLOAT"):
+            # Some rare half values are hidden in the rating columns
+            df[column] = with_missing(rng, rng.integers(1, 11, n_rows) / 2, 0.05)
+        elif sql_type == "DATE":
+            # Timestamps, of which only the date is kept
+            timestamps = pd.Timestamp("2019-06-01") - pd.to_timedelta(rng.integers(0, 365 * 86400, n_rows), unit="s")
+            df[column] = with_missing(rng, timestamps.strftime("%Y-%m-%dT%H:%M:%S"), 0.05)
+        elif sql_type == "BOOLEAN":
+            df[column] = rng.random(n_rows) < 0.5
+        elif sql_type in ENUM_TYPES:
+            df[column] = with_missing(rng, rng.choice(ENUM_TYPES[sql_type], n_rows), 0.1)
+        else:
+            df[column] = with_missing(rng, [" ".join(words) for words in rng.choice(WORDS, (n_rows, 4))], 0.1)
+
+    return df
+
+
+def generate_dataset(output_dir, n_rows=10000, seed=0, extra_columns=0):
+    """
+    Writes the ten csv files of a synthetic dataset.
+
+    Args:
+        output_dir (str): directory receiving the glassdoor_dataset directory, the pipeline reads the csv files from
+            glassdoor_dataset/ relative to its working directory
+        n_rows (int): number of distinct rows of the glassdoor table, the other tables are sized from ID_RATIOS
+        seed (int): seed of the random generator
+        extra_columns (int): number of additional unused columns in glassdoor.csv
+
+    Returns:
+        dict: number of rows written in each csv file, keyed by table name
+    """
+
+    rng = np.random.default_rng(seed)
+    table_ids = {
+        table_name: np.arange(1, max(int(n_rows * ratio), 1) + 1)
+        for table_name, ratio in ID_RATIOS.items()
+    }
+
+    dataframes = {"glassdoor": generate_glassdoor(rng, n_rows, table_ids, extra_columns)}
+    for table_name, ids in table_ids.items():
+        dataframes[table_name] = generate_list_table(rng, table_name, ids, table_ids)
+
+    written_rows = {}
+    for table_name, df in dataframes.items():
+        csv_path = os.path.join(output_dir, CSV_FILES[table_name])
+        os.makedirs(os.path.dirname(csv_path), exist_ok=True)
+        df.to_csv(csv_path, index=False)
+        written_rows[table_name] = len(df)
+
+    return written_rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic Glassdoor-shaped dataset")
+    parser.add_argument("output_dir", help="directory where glassdoor_dataset/ is written")
+    parser.add_argument("--rows", type=int, default=10000, help="number of rows of the glassdoor table (default: 10000)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random generator (default: 0)")
+    parser.add_argument(
+        "--extra-columns", type=int, default=0, help="number of additional unused columns in glassdoor.csv (default: 0)"
+    )
+    args = parser.parse_args()
+
+    for table_name, rows in generate_dataset(args.output_dir, args.rows, args.seed, args.extra_columns).items():
+        print(f"{table_name}: {rows} rows")
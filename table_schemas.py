@@ -0,0 +1,496 @@
+""" This module declares the schema of each table of the database once, and derives from it everything that depends on
+the column types: the columns and dtypes read from the csv files, the casts of the cleaned DataFrames to those types,
+and the CREATE TABLE (and CREATE TYPE) queries of sql_queries_vars.py. A column whose values don't fit its type is reported
+while its file is cleaned, instead of failing the upload.
+
+A table schema is a dict with the following keys:
+- columns: SQL type of each column, keyed by the column name of the csv file (with underscores instead of dots, and the
+  camelCase of the file, the database names being lowercase). The type is a key of SQL_TYPE_DTYPES or of ENUM_TYPES.
+- primary_key: primary key column
+- foreign_keys: table referenced (by its id) by each foreign key column
+- category_columns: text columns with few distinct values, held as categories by pandas
+- search_columns: text columns indexed for full-text search (see text_search.py), with the weight of each of them in the
+  ranking of the results, from 'A' (highest) to 'D'
+- dimensions: dimension table of each foreign key column filled by the data processing. The columns of the dimension
+  are read from the csv file of the table, in the same read, its distinct values are stored once in the dimension table
+  and replaced in the table by the foreign key to them.
+- surrogate_key: column of a dimension table keying its rows, set by the data processing and not part of the csv file:
+  a 64-bit fingerprint of the values of the row, whose collisions aren't detected (see SurrogateKeys)
+- denormalized_view: view of a table with dimensions joining them back, with the columns of its csv file
+"""
+
+import numpy as np
+import pandas as pd
+
+
+# Values of the enumerated types, stored in 4 bytes by PostgreSQL instead of repeating the text in each row, and held
+# as categories by pandas. A value missing from its list is reported by cast_columns and must be added here.
+ENUM_TYPES = {
+    "company_size": [
+        "1 to 50 Employees",
+        "51 to 200 Employees",
+        "201 to 500 Employees",
+        "501 to 1000 Employees",
+        "1001 to 5000 Employees",
+        "5001 to 10000 Employees",
+        "10000+ Employees",
+        "Unknown",
+    ],
+    "company_type": [
+        "Company - Private",
+        "Company - Public",
+        "Nonprofit Organization",
+        "Subsidiary or Business Segment",
+        "Government",
+        "College / University",
+        "Hospital",
+        "Private Practice / Firm",
+        "School / School District",
+        "Contract",
+        "Franchise",
+        "Self-employed",
+        "Other Organization",
+        "Unknown",
+    ],
+}
+
+# pandas dtype of the values of each SQL type, the enumerated types being categoricals of their values
+SQL_TYPE_DTYPES = {
+    "SERIAL": "Int32",
+    "BOOLEAN": "boolean",
+    "SMALLINT": "Int16",
+    "INTEGER": "Int32",
+    "BIGINT": "Int64",
+    "REAL": "float32",
+    "FLOAT": "float64",
+    "DATE": "datetime64[ns]",
+    "VARCHAR": "string",
+}
+
+# Generated column holding the words of the search_columns of a table, computed by PostgreSQL when a row is written, and
+# text search configuration used to split them into words and reduce the words to their stem
+SEARCH_VECTOR_COLUMN = "search_vector"
+TEXT_SEARCH_CONFIG = "english"
+
+
+TABLE_SCHEMAS = {
+    "glassdoor": {
+        # A lot of columns of the main glassdoor.csv file are HTML or URL related elements that are not very relevant
+        # for our purpose, only those columns are parsed when reading the file
+        "columns": {
+            "id": "SERIAL", # Generated by PostgreSQL, not part of the csv file
+            "header_easyApply": "BOOLEAN", # Presence of Easy Apply button on job posting
+            "header_jobTitle": "VARCHAR", # Job posting title
+            "header_posted": "DATE", # Date job was posted
+            "header_rating": "REAL", # Company rating by employees
+            "header_urgencyLabel": "VARCHAR", # Misleading column name, it actually indicates the presence of the "2019 Glassdoor Best Place to Work" award on the job posting
+            "header_payHigh": "INTEGER", # Payment at 90th percentile
+            "header_payMed": "INTEGER", # Payment at 50th percentile
+            "header_payLow": "INTEGER", # Payment at 10th percentile
+            "job_description": "VARCHAR", # Job description (html)
+            "job_jobSource": "VARCHAR", # Original website origin of job posting
+            "map_country": "VARCHAR", # do something with country_names_2_digit_codes
+            "map_lat": "FLOAT", # Geographical latitude of job posting, 0 for NaN
+            "map_lng": "FLOAT", # Geographical longitude of job posting, 0 for NaN
+            "map_location": "VARCHAR", # Location of job posting (variable, city or country), can be different from the company's headquarters
+            "company_id": "BIGINT", # Company of the job posting, foreign key to glassdoor_companies
+            "overview_competitors": "INTEGER", # id for company's competitor, foreign key to glassdoor_overview_competitors
+            "benefits_comments": "INTEGER", # Comments about company's benefits, foreign key to glassdoor_benefits_comments
+            "benefits_highlights": "INTEGER", # Highlighted comments & data about company's benefits, foreign key to glassdoor_benefits_highlights
+            "reviews": "INTEGER", # Reviews from glassdoor users, foreign key to glassdoor_reviews
+            "salary_salaries": "INTEGER", # Data about salaries reported by employees, foreign key to glassdoor_salary_salaries
+            "wwfu": "INTEGER", # Data related to company's mission, foreign key to glassdoor_wwfu
+        },
+        "primary_key": "id",
+        "foreign_keys": {
+            "company_id": "glassdoor_companies",
+            "overview_competitors": "glassdoor_overview_competitors",
+            "benefits_comments": "glassdoor_benefits_comments",
+            "benefits_highlights": "glassdoor_benefits_highlights",
+            "reviews": "glassdoor_reviews",
+            "salary_salaries": "glassdoor_salary_salaries",
+            "wwfu": "glassdoor_wwfu",
+        },
+        "dimensions": {
+            "company_id": "glassdoor_companies",
+        },
+        "category_columns": [
+            "header_urgencyLabel",
+            "job_jobSource",
+            "map_country",
+        ],
+        # The job description is the text cleaned by clean_job_description, the tags and entities are already removed
+        "search_columns": {
+            "job_description": "A",
+        },
+        "denormalized_view": "glassdoor_with_companies",
+    },
+    "glassdoor_companies": {
+        # The company columns of glassdoor.csv, repeated in each job posting of a company (long description and mission
+        # texts included), stored once per company and referenced by the postings through glassdoor.company_id
+        "columns": {
+            "id": "BIGINT", # Fingerprint of the company columns set by the data processing, not part of the csv file
+            "header_employerName": "VARCHAR", # Company's name
+            "overview_foundedYear": "SMALLINT", # Year of company's foundation, 0 for NaN
+            "overview_hq": "VARCHAR", # Company's headquarters location
+            "overview_industry": "VARCHAR", # Company's industry, sub-sector
+            "overview_revenue": "VARCHAR", # Company's revenue
+            "overview_sector": "VARCHAR", # Company's sector
+            "overview_size": "company_size", # Company's number of employees bracket
+            "overview_stock": "VARCHAR", # Company's stock
+            "overview_type": "company_type", # Public or private company
+            "overview_description": "VARCHAR", # Company's description
+            "overview_mission": "VARCHAR", # Company's mission
+            "rating_ceo_name": "VARCHAR", # Company's CEO Name
+            "rating_ceoApproval": "REAL", # Company's CEO approval rating, <0 or NaN for missing data
+            "rating_recommendToFriend": "REAL", # Rating from employees for recommendations to friends, <0 or NaN for missing data
+            "rating_starRating": "REAL", # Rating of company from glassdoor users
+        },
+        "primary_key": "id",
+        "surrogate_key": "id",
+        # The revenue and the industry stay VARCHAR, the dashboard compares them with '' and BigQuery can't read enums
+        "category_columns": [
+            "overview_industry",
+            "overview_revenue",
+            "overview_sector",
+        ],
+        "search_columns": {
+            "overview_description": "A",
+            "overview_mission": "B",
+        },
+    },
+    "glassdoor_overview_competitors": {
+        "columns": {
+            "id": "INTEGER",
+            "index": "SMALLINT",
+            "overview_competitors_val": "VARCHAR",
+        },
+        "primary_key": "id",
+    },
+    "glassdoor_benefits_comments": {
+        "columns": {
+            "id": "INTEGER",
+            "index": "SMALLINT",
+            "benefits_comments_val_city": "VARCHAR",
+            "benefits_comments_val_comment": "VARCHAR",
+            "benefits_comments_val_createdate": "VARCHAR",
+            "benefits_comments_val_currentjob": "VARCHAR",
+            "benefits_comments_val_jobtitle": "VARCHAR",
+            "benefits_comments_val_rating": "SMALLINT",
+            "benefits_comments_val_state": "VARCHAR",
+        },
+        "primary_key": "id",
+    },
+    "glassdoor_benefits_highlights": {
+        "columns": {
+            "id": "INTEGER",
+            "benefits_highlights_val_highlightphrase": "VARCHAR",
+            "benefits_highlights_val_icon": "VARCHAR",
+            "benefits_highlights_val_name": "VARCHAR",
+            "index": "SMALLINT",
+            "benefits_highlights_val_commentCount": "INTEGER",
+        },
+        "primary_key": "id",
+    },
+    "glassdoor_reviews": {
+        # I found that in some rating columns, some rare values actually contain decimals (3.5/5 rating for example), I
+        # chose to keep those columns as floats
+        "columns": {
+            "id": "INTEGER",
+            "index": "SMALLINT",
+            "reviews_val_cons": "VARCHAR",
+            "reviews_val_date": "DATE",
+            "reviews_val_featured": "VARCHAR",
+            "reviews_val_helpfulCount": "INTEGER",
+            "reviews_val_id": "INTEGER",
+            "reviews_val_pros": "VARCHAR",
+            "reviews_val_publishedon": "VARCHAR",
+            "reviews_val_publisher": "VARCHAR",
+            "reviews_val_reviewratings_careeropportunities": "REAL", # Some rare decimals are hidden in this column
+            "reviews_val_reviewratings_compbenefits": "REAL", # Some decimals are hidden in this column
+            "reviews_val_reviewRatings_cultureValues": "SMALLINT",
+            "reviews_val_reviewRatings_overall": "SMALLINT",
+            "reviews_val_reviewratings_seniormanagement": "REAL", # Some decimals are hidden in this column
+            "reviews_val_reviewratings_worklifebalance": "REAL", # Some decimals are hidden in this column
+            "reviews_val_reviewerduration": "VARCHAR",
+            "reviews_val_reviewerinformation": "VARCHAR",
+            "reviews_val_reviewerjobtitle": "VARCHAR",
+            "reviews_val_reviewerlocation": "VARCHAR",
+            "reviews_val_reviewerstatus": "VARCHAR",
+            "reviews_val_summaryPoints_ceoApproval": "SMALLINT",
+            "reviews_val_summaryPoints_outlook": "SMALLINT",
+            "reviews_val_summaryPoints_recommend": "SMALLINT",
+            "reviews_val_title": "VARCHAR",
+            "reviews_val_advicetomanagement": "VARCHAR",
+            "reviews_val_companyresponse": "VARCHAR",
+            "reviews_val_reviewResponses": "SMALLINT",
+        },
+        "primary_key": "id",
+        "search_columns": {
+            "reviews_val_pros": "A",
+            "reviews_val_cons": "A",
+        },
+    },
+    "glassdoor_salary_salaries": {
+        "columns": {
+            "id": "INTEGER",
+            "index": "SMALLINT",
+            "salary_salaries_val_basePayCount": "INTEGER",
+            "salary_salaries_val_jobtitle": "VARCHAR",
+            "salary_salaries_val_payperiod": "VARCHAR",
+            # Salaries with cents, REAL would round them
+            "salary_salaries_val_salarypercentilemap_paypercentile10": "FLOAT",
+            "salary_salaries_val_salarypercentilemap_paypercentile90": "FLOAT",
+            "salary_salaries_val_salarypercentilemap_paypercentile50": "FLOAT",
+            "salary_salaries_val_salarytype": "VARCHAR",
+        },
+        "primary_key": "id",
+    },
+    "glassdoor_wwfu": {
+        "columns": {
+            "id": "INTEGER",
+            "index": "SMALLINT",
+            "wwfu_val_body": "VARCHAR",
+            "wwfu_val_id": "INTEGER",
+            "wwfu_val_title": "VARCHAR",
+            "wwfu_val_type": "VARCHAR",
+            "wwfu_val_videos": "INTEGER",
+            "wwfu_val_photos": "INTEGER",
+            "wwfu_val_captions": "INTEGER",
+        },
+        "primary_key": "id",
+        "foreign_keys": {
+            "wwfu_val_videos": "glassdoor_wwfu_val_videos",
+            "wwfu_val_photos": "glassdoor_wwfu_val_photos",
+            "wwfu_val_captions": "glassdoor_wwfu_val_captions",
+        },
+        "search_columns": {
+            "wwfu_val_body": "A",
+        },
+    },
+    "glassdoor_wwfu_val_captions": {
+        "columns": {
+            "id": "INTEGER",
+            "index": "SMALLINT",
+            "wwfu_val_captions_val": "VARCHAR",
+        },
+        "primary_key": "id",
+    },
+    "glassdoor_wwfu_val_photos": {
+        "columns": {
+            "id": "INTEGER",
+            "index": "SMALLINT",
+            "wwfu_val_photos_val": "VARCHAR",
+        },
+        "primary_key": "id",
+    },
+    "glassdoor_wwfu_val_videos": {
+        "columns": {
+            "id": "INTEGER",
+            "index": "SMALLINT",
+            "wwfu_val_videos_val": "VARCHAR",
+        },
+        "primary_key": "id",
+    },
+}
+
+
+def csv_columns(table_name):
+    """
+    Columns of a table read from its csv file, all of them except the ones generated by PostgreSQL and the surrogate
+    key of a dimension table. The foreign key to a dimension is replaced by the columns of the dimension.
+    """
+
+    schema = TABLE_SCHEMAS[table_name]
+    columns = []
+    for column, sql_type in schema["columns"].items():
+        if column in schema.get("dimensions", {}):
+            columns += csv_columns(schema["dimensions"][column])
+        elif sql_type != "SERIAL" and column != schema.get("surrogate_key"):
+            columns.append(column)
+    return columns
+
+
+def _csv_column_schemas(table_name):
+    """Schema of the table (the table itself or one of its dimensions) declaring each column of its csv file"""
+
+    schema = TABLE_SCHEMAS[table_name]
+    column_schemas = {column: schema for column in csv_columns(table_name)}
+    for dimension in schema.get("dimensions", {}).values():
+        column_schemas.update(_csv_column_schemas(dimension))
+    return column_schemas
+
+
+def csv_column_types(table_name):
+    """SQL type of each column of a table read from its csv file, the columns of its dimensions included"""
+
+    return {column: schema["columns"][column] for column, schema in _csv_column_schemas(table_name).items()}
+
+
+def read_dtypes(table_name):
+    """
+    Dtypes of the columns of a table when its csv file is parsed. Integers are parsed as float64 whatever their SQL
+    type: a value with decimals would make pandas fail the parsing with an error not naming the column, cast_columns
+    reports it (as well as the values out of the range of the type) with examples, and narrows the column to its type.
+    Dates are parsed as text and enumerated values as categories, cast_columns checks them too.
+
+    Args:
+        table_name (str): name of the table, key of TABLE_SCHEMAS
+
+    Returns:
+        dict: dtype of each column read from the csv file
+    """
+
+    dtypes = {}
+    for column, schema in _csv_column_schemas(table_name).items():
+        sql_type = schema["columns"][column]
+        if sql_type in ENUM_TYPES or column in schema.get("category_columns", []):
+            dtypes[column] = "category"
+        elif sql_type == "DATE":
+            dtypes[column] = "string"
+        elif pd.api.types.is_integer_dtype(pd.api.types.pandas_dtype(SQL_TYPE_DTYPES[sql_type])):
+            dtypes[column] = "float64"
+        else:
+            dtypes[column] = SQL_TYPE_DTYPES[sql_type]
+
+    return dtypes
+
+
+def cast_columns(df, table_name):
+    """
+    Casts the columns of a DataFrame to the dtypes of their SQL types, checking that the values fit them: integers
+    without decimals and within the range of their type, dates in ISO format (the time of day is dropped) and values of
+    enumerated types among the values declared in ENUM_TYPES.
+
+    Args:
+        df (pd.DataFrame): DataFrame with the columns of the csv file (see csv_columns)
+        table_name (str): name of the table, key of TABLE_SCHEMAS
+
+    Raises:
+        ValueError: if some values of a column don't fit its type, with some examples of them
+
+    Returns:
+        pd.DataFrame: the DataFrame with the columns cast
+    """
+
+    column_schemas = _csv_column_schemas(table_name)
+
+    def check(column, invalid_values, sql_type):
+        if len(invalid_values):
+            examples = pd.unique(invalid_values)[:5].tolist()
+            raise ValueError(
+                f"{table_name}.{column}: {len(invalid_values)} values don't fit {sql_type}, e.g. {examples}"
+            )
+
+    dtypes = {}
+    dates = {}
+    for column in df.columns:
+        schema = column_schemas[column]
+        sql_type = schema["columns"][column]
+        values = df[column]
+
+        if sql_type in ENUM_TYPES:
+            check(column, values[values.notna() & ~values.isin(ENUM_TYPES[sql_type])], sql_type)
+            dtypes[column] = pd.CategoricalDtype(ENUM_TYPES[sql_type])
+
+        elif sql_type == "DATE":
+            # Only the date part is parsed, so dates with a time of day or a time zone are kept as written
+            dates[column] = pd.to_datetime(values.astype("string").str.slice(0, 10), format="%Y-%m-%d", errors="coerce")
+            check(column, values[values.notna() & dates[column].isna()], sql_type)
+
+        elif column in schema.get("category_columns", []):
+            dtypes[column] = "category"
+
+        else:
+            dtype = pd.api.types.pandas_dtype(SQL_TYPE_DTYPES[sql_type])
+            if pd.api.types.is_integer_dtype(dtype) and pd.api.types.is_numeric_dtype(values):
+                # Integer columns are read as float64 (see read_dtypes), where a missing value is a NaN
+                values = values.dropna()
+                int_info = np.iinfo(dtype.numpy_dtype)
+                check(column, values[(values < int_info.min) | (values > int_info.max) | (values % 1 != 0)], sql_type)
+            dtypes[column] = dtype
+
+    try:
+        df = df.astype(dtypes)
+    except (TypeError, ValueError) as error:
+        raise ValueError(f"{table_name}: the columns can't be cast to their SQL types, {error}") from error
+    for column, column_dates in dates.items():
+        df[column] = column_dates
+
+    return df
+
+
+def search_vector_expression(table_name):
+    """
+    SQL expression of the search vector of a table: the words of each of its search_columns, labelled with the weight
+    of the column. A missing value adds no word.
+    """
+
+    return " || ".join(
+        f"setweight(to_tsvector('{TEXT_SEARCH_CONFIG}', COALESCE({column.lower()}, '')), '{weight}')"
+        for column, weight in TABLE_SCHEMAS[table_name]["search_columns"].items()
+    )
+
+
+def create_table_query(table_name):
+    """
+    Generates the CREATE TABLE query of a table, with its primary key, its search vector column (if it has
+    search_columns) and its foreign keys
+    """
+
+    schema = TABLE_SCHEMAS[table_name]
+    definitions = [
+        f"{column.lower()} {sql_type}" + (" PRIMARY KEY" if column == schema["primary_key"] else "")
+        for column, sql_type in schema["columns"].items()
+    ]
+    if "search_columns" in schema:
+        definitions.append(
+            f"{SEARCH_VECTOR_COLUMN} TSVECTOR GENERATED ALWAYS AS ({search_vector_expression(table_name)}) STORED"
+        )
+    definitions += [
+        f"FOREIGN KEY ({column.lower()}) REFERENCES {referenced_table}(id)"
+        for column, referenced_table in schema.get("foreign_keys", {}).items()
+    ]
+
+    return f"\n    CREATE TABLE {table_name} (\n        " + ",\n        ".join(definitions) + "\n    );\n    "
+
+
+def create_view_query(table_name):
+    """
+    Generates the query creating (or replacing) the denormalized view of a table with dimensions: its rows with the
+    columns of its dimensions in place of their foreign keys, like the table before the extraction of the dimensions,
+    so the queries written for the denormalized table read the view unchanged. The joins are LEFT JOINs on the primary
+    key of the dimensions, PostgreSQL skips those whose columns aren't used by a query.
+    """
+
+    schema = TABLE_SCHEMAS[table_name]
+    columns = []
+    joins = []
+    for column in schema["columns"]:
+        if column in schema["dimensions"]:
+            dimension = schema["dimensions"][column]
+            columns += [f"{dimension}.{dimension_column.lower()}" for dimension_column in csv_columns(dimension)]
+            joins.append(
+                f"LEFT JOIN {dimension} ON {dimension}.{TABLE_SCHEMAS[dimension]['primary_key']} = "
+                f"{table_name}.{column.lower()}"
+            )
+        else:
+            columns.append(f"{table_name}.{column.lower()}")
+
+    return (
+        f"\n    CREATE OR REPLACE VIEW {schema['denormalized_view']} AS\n    SELECT\n        "
+        + ",\n        ".join(columns) + f"\n    FROM {table_name}\n    " + "\n    ".join(joins) + ";\n    "
+    )
+
+
+def create_enum_type_query(type_name):
+    """
+    Generates the query creating an enumerated type, which does nothing if the type already exists (CREATE TYPE has no
+    IF NOT EXISTS clause).
+    """
+
+    values = ", ".join("'" + value.replace("'", "''") + "'" for value in ENUM_TYPES[type_name])
+    return (
+        f"DO $$ BEGIN CREATE TYPE {type_name} AS ENUM ({values}); "
+        f"EXCEPTION WHEN duplicate_object THEN NULL; END $$;"
+    )
@@ -0,0 +1,40 @@
+""" Tests of the validation of the csv values against the table schemas. Run from the repository root with
+python -m pytest.
+"""
+
+import pytest
+from csv_files_data_processing import read_csv_selected
+from table_schemas import cast_columns, csv_columns, read_dtypes
+
+
+TABLE_NAME = "glassdoor_wwfu_val_videos"
+
+
+def read_csv(tmp_path, content):
+    """Reads a csv file with the given content like read_table_csv reads the file of TABLE_NAME"""
+
+    csv_path = tmp_path / f"{TABLE_NAME}.csv"
+    csv_path.write_text(content)
+    return read_csv_selected(str(csv_path), csv_columns(TABLE_NAME), read_dtypes(TABLE_NAME))
+
+
+def test_fractional_integer_is_reported_with_examples(tmp_path):
+    df = read_csv(tmp_path, "id,index,wwfu.val.videos.val\n1,0,intro\n2,1.5,tour\n3,,team\n")
+
+    with pytest.raises(ValueError, match=r"glassdoor_wwfu_val_videos\.index: 1 values don't fit SMALLINT, e\.g\. \[1\.5\]"):
+        cast_columns(df, TABLE_NAME)
+
+
+def test_out_of_range_integer_is_reported_with_examples(tmp_path):
+    df = read_csv(tmp_path, "id,index,wwfu.val.videos.val\n1,40000,intro\n")
+
+    with pytest.raises(ValueError, match=r"glassdoor_wwfu_val_videos\.index: 1 values don't fit SMALLINT"):
+        cast_columns(df, TABLE_NAME)
+
+
+def test_integers_written_with_decimals_are_cast(tmp_path):
+    df = cast_columns(read_csv(tmp_path, "id,index,wwfu.val.videos.val\n1.0,0.0,intro\n2.0,,tour\n"), TABLE_NAME)
+
+    assert str(df["id"].dtype) == "Int32"
+    assert str(df["index"].dtype) == "Int16"
+    assert df["index"].tolist()[0] == 0 and df["index"].isna().tolist() == [False, True]
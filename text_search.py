@@ -0,0 +1,124 @@
+""" This module searches the text columns of the database by keywords. Each table with search_columns (see
+table_schemas.py) has a search vector column, generated by PostgreSQL from those columns when a row is written, and
+indexed with a GIN index (see index_management.py): a search looks the words up in the index instead of scanning the text
+of every row with ILIKE. The matching rows are ranked by relevance, the words found in the columns with the highest
+weight counting the most, and returned one page at a time.
+
+The search text follows the syntax of web search engines: words are all required, "quoted words" must follow each
+other, "or" separates alternatives and -word excludes the rows containing the word. The words are reduced to their stem,
+so "engineers" finds "engineer" and "engineering".
+
+Usage: python text_search.py "spark -scala" --table glassdoor --page 2
+"""
+
+import argparse
+import pandas as pd
+import sqlalchemy
+from gcp_interactions import close_conn_to_sql, conn_to_psql
+from table_schemas import SEARCH_VECTOR_COLUMN, TABLE_SCHEMAS, TEXT_SEARCH_CONFIG
+
+
+# Columns returned for each matching row, the full text of the long columns is left in the database
+SEARCH_RESULT_COLUMNS = {
+    "glassdoor": ["id", "header_jobtitle", "company_id", "map_location", "header_posted"],
+    "glassdoor_companies": ["id", "header_employername", "overview_industry", "overview_hq"],
+    "glassdoor_reviews": ["id", "reviews_val_title", "reviews_val_pros", "reviews_val_cons", "reviews_val_date"],
+    "glassdoor_wwfu": ["id", "wwfu_val_title", "wwfu_val_body"],
+}
+
+# Normalization of the rank by the length of the text (1 + logarithm of its number of words), so long texts don't rank
+# first only because they repeat the words more often
+RANK_NORMALIZATION = 1
+
+
+def searchable_tables():
+    """Returns the names of the tables with a search vector column"""
+
+    return [table_name for table_name, schema in TABLE_SCHEMAS.items() if "search_columns" in schema]
+
+
+def _match_clause(table_name):
+    """FROM and WHERE clauses selecting the rows of a table matching the :text parameter"""
+
+    if table_name not in searchable_tables():
+        raise ValueError(f"{table_name} can't be searched, the tables with a search vector are {searchable_tables()}")
+
+    return f"""
+        FROM {table_name}, websearch_to_tsquery('{TEXT_SEARCH_CONFIG}', :text) AS query
+        WHERE {SEARCH_VECTOR_COLUMN} @@ query
+    """
+
+
+def search(pool, text, table_name="glassdoor", page=1, page_size=20, columns=None):
+    """
+    Searches the rows of a table whose search columns contain the words of a text, most relevant first.
+
+    Args:
+        pool (sqlalchemy.engine.Engine): engine returned by conn_to_psql
+        text (str): words searched, in the web search syntax described above
+        table_name (str): name of the table searched, one of searchable_tables()
+        page (int): number of the page of results returned, from 1
+        page_size (int): number of results per page
+        columns (list): columns returned for each row, SEARCH_RESULT_COLUMNS of the table by default
+
+    Returns:
+        pd.DataFrame: the columns and the rank of the matching rows of the page, ordered by decreasing rank
+    """
+
+    if page < 1 or page_size < 1:
+        raise ValueError(f"The page ({page}) and the page size ({page_size}) must be at least 1")
+    columns = SEARCH_RESULT_COLUMNS.get(table_name, ["id"]) if columns is None else columns
+
+    # The id breaks the ties between rows of the same rank, so the pages don't overlap
+    query = f"""
+        SELECT {', '.join(columns)}, ts_rank({SEARCH_VECTOR_COLUMN}, query, {RANK_NORMALIZATION}) AS rank
+        {_match_clause(table_name)}
+        ORDER BY rank DESC, id
+        LIMIT :limit OFFSET :offset;
+    """
+    with pool.connect() as connection:
+        rows = connection.execute(
+            sqlalchemy.text(query), {"text": text, "limit": page_size, "offset": (page - 1) * page_size}
+        ).fetchall()
+
+    return pd.DataFrame(rows, columns=columns + ["rank"])
+
+
+def count_matches(pool, text, table_name="glassdoor"):
+    """
+    Counts the rows of a table whose search columns contain the words of a text, to compute the number of pages.
+
+    Args:
+        pool (sqlalchemy.engine.Engine): engine returned by conn_to_psql
+        text (str): words searched, in the web search syntax described above
+        table_name (str): name of the table searched, one of searchable_tables()
+
+    Returns:
+        int: number of matching rows
+    """
+
+    with pool.connect() as connection:
+        return connection.execute(
+            sqlalchemy.text(f"SELECT COUNT(*) {_match_clause(table_name)};"), {"text": text}
+        ).scalar()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search the text columns of the database by keywords")
+    parser.add_argument("text", help='words searched, e.g. "data engineer" spark -scala')
+    parser.add_argument(
+        "--table", default="glassdoor", choices=searchable_tables(), help="table searched (default: glassdoor)",
+    )
+    parser.add_argument("--page", type=int, default=1, help="page of results (default: 1)")
+    parser.add_argument("--page-size", type=int, default=20, help="number of results per page (default: 20)")
+    args = parser.parse_args()
+
+    pool, connector = conn_to_psql()
+    try:
+        total = count_matches(pool, args.text, args.table)
+        results = search(pool, args.text, args.table, args.page, args.page_size)
+    finally:
+        close_conn_to_sql(pool, connector)
+
+    print(f"{total} matching rows, page {args.page} of {max(1, -(-total // args.page_size))}")
+    print(results.to_string(index=False))
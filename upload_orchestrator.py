@@ -0,0 +1,175 @@
+""" This module creates the database schema and uploads the data concurrently, following the foreign keys between tables.
+The dependencies are read from the FOREIGN KEY clauses of the CREATE TABLE queries stored in sql_queries_vars.py: a
+table is only created (or loaded) once all the tables it references are, independent tables are handled at the same
+time, each one over its own connection from the pool.
+"""
+
+import logging
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import sqlalchemy
+from gcp_interactions import copy_df_to_psql
+from sql_queries_vars import CREATE_ENUM_QUERIES, CREATE_TABLE_QUERIES, CREATE_VIEW_QUERIES
+from stage_metrics import stage
+
+
+CREATE_TABLE_PATTERN = re.compile(r"CREATE\s+(?:UNLOGGED\s+)?TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)", re.IGNORECASE)
+FOREIGN_KEY_PATTERN = re.compile(r"FOREIGN\s+KEY\s*\((\w+)\)\s*REFERENCES\s+(\w+)\s*\((\w+)\)", re.IGNORECASE)
+
+
+def parse_foreign_keys(create_table_query):
+    """
+    Reads the foreign keys declared in a CREATE TABLE query.
+
+    Args:
+        create_table_query (str): the CREATE TABLE query
+
+    Returns:
+        list: (column, referenced table, referenced column) tuples
+    """
+
+    return FOREIGN_KEY_PATTERN.findall(create_table_query)
+
+
+def table_dependencies(create_table_queries=None):
+    """
+    Builds the dependency graph of the tables from their foreign keys.
+
+    Args:
+        create_table_queries (dict): CREATE TABLE query of each table, CREATE_TABLE_QUERIES by default
+
+    Returns:
+        dict: set of the tables referenced by each table, keyed by table name
+    """
+
+    create_table_queries = CREATE_TABLE_QUERIES if create_table_queries is None else create_table_queries
+
+    dependencies = {}
+    for table_name, create_table_query in create_table_queries.items():
+        created_table = CREATE_TABLE_PATTERN.search(create_table_query).group(1)
+        if created_table != table_name:
+            raise ValueError(f"The query stored for {table_name} creates the table {created_table}")
+        dependencies[table_name] = {
+            referenced_table for _, referenced_table, _ in parse_foreign_keys(create_table_query)
+            if referenced_table != table_name
+        }
+
+    return dependencies
+
+
+def run_in_dependency_order(dependencies, step, step_name, max_workers=None):
+    """
+    Runs a step for each table in a pool of threads, starting the step of a table as soon as the steps of all the tables
+    it depends on are done. If a step fails, no other step is started and the exception is raised once the running steps
+    are finished.
+
+    Args:
+        dependencies (dict): set of the tables each table depends on, as returned by table_dependencies
+        step (callable): function called with the table name
+        step_name (str): description of the step for the logs
+        max_workers (int): maximum number of steps running at the same time, None for the ThreadPoolExecutor default
+
+    Returns:
+        dict: value returned by the step of each table
+    """
+
+    remaining = {table_name: set(depends_on) for table_name, depends_on in dependencies.items()}
+    unknown_tables = set().union(*remaining.values()) - set(remaining)
+    if unknown_tables:
+        raise ValueError(f"Tables referenced but not part of the run: {sorted(unknown_tables)}")
+
+    def timed_step(table_name):
+        start_time = time.perf_counter()
+        result = step(table_name)
+        logging.info(f"{step_name} {table_name} done in {time.perf_counter() - start_time:.1f}s")
+        return result
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        running = {}
+        while remaining or running:
+            for table_name in [table_name for table_name, depends_on in remaining.items() if not depends_on]:
+                del remaining[table_name]
+                running[executor.submit(timed_step, table_name)] = table_name
+
+            if not running:
+                raise ValueError(f"Circular foreign keys between the tables {sorted(remaining)}")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                table_name = running.pop(future)
+                try:
+                    results[table_name] = future.result()
+                except Exception:
+                    logging.error(f"{step_name} {table_name} failed")
+                    remaining.clear()
+                    wait(running)
+                    raise
+                for depends_on in remaining.values():
+                    depends_on.discard(table_name)
+
+    return results
+
+
+def create_schema_concurrently(pool, create_table_queries=None, max_workers=None):
+    """
+    Creates the tables of the database, independent tables being created at the same time, after the enumerated types
+    used by their columns, then the denormalized views of the tables with dimensions.
+
+    Args:
+        pool (sqlalchemy.engine.Engine): engine returned by conn_to_psql
+        create_table_queries (dict): CREATE TABLE query of each table, CREATE_TABLE_QUERIES by default
+        max_workers (int): maximum number of tables created at the same time
+    """
+
+    create_table_queries = CREATE_TABLE_QUERIES if create_table_queries is None else create_table_queries
+
+    with pool.begin() as connection:
+        for create_enum_query in CREATE_ENUM_QUERIES.values():
+            connection.execute(sqlalchemy.text(create_enum_query))
+
+    def create_table(table_name):
+        with stage(f"ddl {table_name}"), pool.begin() as connection:
+            connection.execute(sqlalchemy.text(create_table_queries[table_name]))
+
+    run_in_dependency_order(table_dependencies(create_table_queries), create_table, "Creation of table", max_workers)
+
+    with pool.begin() as connection:
+        for create_view_query in CREATE_VIEW_QUERIES.values():
+            connection.execute(sqlalchemy.text(create_view_query))
+
+
+def upload_concurrently(pool, dataframes, max_workers=None, create_table_queries=None, checkpoint=None):
+    """
+    Uploads the DataFrames into their tables with copy_df_to_psql, a table being loaded as soon as all the tables it
+    references are loaded, so the independent tables are loaded in parallel before the tables referencing them.
+
+    Args:
+        pool (sqlalchemy.engine.Engine): engine returned by conn_to_psql, its pool must allow max_workers connections
+        dataframes (dict): DataFrame to upload in each table, keyed by table name
+        max_workers (int): maximum number of tables loaded at the same time
+        create_table_queries (dict): CREATE TABLE queries the tables were created with, CREATE_TABLE_QUERIES by default.
+            Tables created without foreign keys (see fast_load.py) are all loaded at the same time.
+        checkpoint (CheckpointManifest): if set, the tables are uploaded in batches committed one at a time and recorded
+            in the manifest, and the rows uploaded by the run resumed are skipped (see checkpoints.py)
+
+    Returns:
+        dict: number of bytes uploaded in each table
+    """
+
+    dependencies = {
+        table_name: depends_on & set(dataframes)
+        for table_name, depends_on in table_dependencies(create_table_queries).items() if table_name in dataframes
+    }
+
+    def upload_table(table_name):
+        with stage(f"upload {table_name}", rows_in=len(dataframes[table_name])) as metrics:
+            if checkpoint is None:
+                metrics["bytes_uploaded"] = copy_df_to_psql(dataframes[table_name], table_name, pool)
+            else:
+                metrics["bytes_uploaded"] = checkpoint.upload_df(pool, table_name, dataframes[table_name])
+            metrics["rows_out"] = metrics["rows_in"]
+        return metrics["bytes_uploaded"]
+
+    return run_in_dependency_order(dependencies, upload_table, "Upload of", max_workers)